@@ -0,0 +1,228 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+
+from saferoute import find_safe_routes, geocode_location
+from saferoute.crime_raster import TIME_PERIODS
+from saferoute.ors import ors_scheduler
+from saferoute.ors_scheduler import PRIORITY_BATCH
+
+# Pairs queued per worker process, bounds memory for very large input files
+QUEUE_DEPTH_PER_WORKER = 4
+
+TIMES_OF_DAY = ("Current Time", *TIME_PERIODS)
+
+# Set in every worker process by _init_worker
+_worker_config = None
+
+
+class SharedRateLimiter:
+    """Spaces out ORS calls across all worker processes.
+
+    The next free time slot lives in shared memory, so the combined request rate
+    of the whole pool never exceeds `per_minute`. Installed as the scheduler's
+    limiter, it is acquired once per HTTP call actually sent: cached geocodes cost
+    nothing, and segmented routes and retries pay for every request.
+    """
+
+    def __init__(self, per_minute, next_slot, lock):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_slot = next_slot
+        self._lock = lock
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(now, self._next_slot.value)
+            self._next_slot.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _init_worker(config, per_minute, next_slot, lock):
+    global _worker_config
+    _worker_config = config
+    # Batch lookups yield to interactive requests sharing the scheduler. The shared
+    # limiter paces the whole pool, so the worker's own ORS_REQUESTS_PER_MINUTE
+    # bucket would only throttle the same calls a second time (and ignore --rate-limit 0).
+    ors_scheduler.default_priority = PRIORITY_BATCH
+    ors_scheduler.set_rate(0)
+    ors_scheduler.limiter = SharedRateLimiter(per_minute, next_slot, lock)
+
+
+def score_pair(pair):
+    """Geocode, route and score one OD pair; runs inside a worker process."""
+    config = _worker_config
+    result = {"id": pair["id"], "start": pair["start"], "end": pair["end"]}
+    started = time.time()
+    try:
+        start_coords = geocode_location(pair["start"], config["api_key"])
+        end_coords = geocode_location(pair["end"], config["api_key"])
+        if not start_coords or not end_coords:
+            result.update(status="error", error="location not found")
+            return result
+
+        _, routes, _, _ = find_safe_routes(
+            start_coords, end_coords, pair.get("profile") or config["profile"],
+            config["api_key"], pair.get("time_of_day") or config["time_of_day"],
+            config["safety_weight"], config["avoid"]
+        )
+        if not routes:
+            result.update(status="error", error="no route found")
+            return result
+
+        best = routes[0]
+        result.update(
+            status="ok",
+            start_coords=start_coords,
+            end_coords=end_coords,
+            safety_score=round(best["safety_score"], 2),
+            distance_km=round(best["summary"]["distance"] / 1000, 3),
+            duration_min=round(best["summary"]["duration"] / 60, 2),
+            alternative_scores=[round(route["safety_score"], 2) for route in routes[1:]],
+        )
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    finally:
+        result["elapsed_s"] = round(time.time() - started, 3)
+    return result
+
+
+def row_error(pair):
+    """Why a pair cannot be scored as given (checked before any work is submitted), or None."""
+    time_of_day = pair.get("time_of_day")
+    if time_of_day and time_of_day not in TIMES_OF_DAY:
+        return f"time_of_day must be one of {', '.join(TIMES_OF_DAY)}"
+    return None
+
+
+def read_pairs(path):
+    """Load OD pairs from CSV or Parquet. Requires `start` and `end` columns; `id` defaults to the row number."""
+    if path.endswith(".parquet"):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    missing = {"start", "end"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"input is missing column(s): {', '.join(sorted(missing))}")
+    if "id" not in frame.columns:
+        frame["id"] = frame.index.astype(str)
+    frame["id"] = frame["id"].astype(str)
+
+    columns = [c for c in ("id", "start", "end", "profile", "time_of_day") if c in frame.columns]
+    return frame[columns].to_dict("records")
+
+
+def read_checkpoint(output_path):
+    """Map of id -> status for pairs already in the output file, so an interrupted run can resume."""
+    statuses = {}
+    if not os.path.exists(output_path):
+        return statuses
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+                statuses[str(row["id"])] = row.get("status")
+            except (ValueError, KeyError):
+                continue  # partially written last line from a crash
+    return statuses
+
+
+def run_batch(pairs, output_path, config, workers=None, per_minute=40, retry_errors=False):
+    """Score pairs across a process pool, appending one JSON line per pair to output_path.
+
+    Each result is flushed as soon as it arrives, so the output doubles as the
+    checkpoint: pairs already written are skipped on the next run (failed pairs
+    too, unless retry_errors is set; a retried pair's newer line supersedes the old one).
+    Pairs failing row_error are written as errors without being sent to a worker.
+    """
+    checkpoint = read_checkpoint(output_path)
+    done = {row_id for row_id, status in checkpoint.items() if status == "ok" or not retry_errors}
+    todo = [pair for pair in pairs if pair["id"] not in done]
+
+    workers = workers or os.cpu_count() or 1
+    stats = {"skipped": len(pairs) - len(todo), "ok": 0, "error": 0}
+    if not todo:
+        return stats
+
+    next_slot = multiprocessing.Value("d", 0.0, lock=False)
+    lock = multiprocessing.Lock()
+    pending = set()
+    queue = iter(todo)
+    started = time.time()
+
+    with open(output_path, "a", encoding="utf-8") as out, ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(config, per_minute, next_slot, lock)
+    ) as pool:
+        def write(result):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            stats[result["status"]] += 1
+
+        def fill():
+            while len(pending) < workers * QUEUE_DEPTH_PER_WORKER:
+                pair = next(queue, None)
+                if pair is None:
+                    return
+                error = row_error(pair)
+                if error:
+                    write({"id": pair["id"], "start": pair["start"], "end": pair["end"],
+                           "status": "error", "error": error, "elapsed_s": 0.0})
+                else:
+                    pending.add(pool.submit(score_pair, pair))
+
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                pending.discard(future)
+                write(future.result())
+            fill()
+
+            processed = stats["ok"] + stats["error"]
+            rate = processed / max(time.time() - started, 1e-9)
+            print(f"\r{processed}/{len(todo)} pairs ({rate:.1f}/s)", end="", file=sys.stderr)
+
+    print(file=sys.stderr)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score origin-destination pairs for route safety in bulk.")
+    parser.add_argument("input", help="CSV or Parquet file with start and end columns (optional id, profile, time_of_day)")
+    parser.add_argument("output", help="JSON Lines results file; also used as the resume checkpoint")
+    parser.add_argument("--api-key", default=os.environ.get("ORS_API_KEY"), help="OpenRouteService API key (default: $ORS_API_KEY)")
+    parser.add_argument("--profile", default="driving-car", choices=["driving-car", "foot-walking", "cycling-regular"])
+    parser.add_argument("--time-of-day", default="Current Time", choices=TIMES_OF_DAY)
+    parser.add_argument("--safety-weight", type=int, default=5)
+    parser.add_argument("--avoid", action="append", default=[], choices=["highways", "tollways", "ferries"])
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--rate-limit", type=float, default=40, help="ORS requests per minute across all workers (0 = unlimited)")
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run pairs that failed in a previous run")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an OpenRouteService API key is required (--api-key or ORS_API_KEY)")
+
+    config = {
+        "api_key": args.api_key,
+        "profile": args.profile,
+        "time_of_day": args.time_of_day,
+        "safety_weight": args.safety_weight,
+        "avoid": args.avoid,
+    }
+    stats = run_batch(read_pairs(args.input), args.output, config, args.workers, args.rate_limit, args.retry_errors)
+    print(f"{stats['ok']} scored, {stats['error']} failed, {stats['skipped']} already done")
+
+
+if __name__ == "__main__":
+    main()
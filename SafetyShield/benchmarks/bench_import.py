@@ -0,0 +1,58 @@
+"""Cold import time of the saferoute routing core.
+
+Each sample imports the package in a fresh interpreter. The run fails if the
+median exceeds --max-ms or if importing pulled in any UI library, which would
+mean a heavy import leaked back into the core.
+
+    python benchmarks/bench_import.py --max-ms 400
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAFETY_SHIELD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UI_MODULES = ("streamlit", "folium", "branca", "streamlit_folium", "pandas")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import saferoute
+elapsed = time.perf_counter() - started
+print(json.dumps({"ms": elapsed * 1000, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (UI_MODULES,)
+
+
+def sample():
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=SAFETY_SHIELD_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, help="Fail if the median cold import is slower than this")
+    args = parser.parse_args()
+
+    samples = [sample() for _ in range(args.runs)]
+    times = sorted(s["ms"] for s in samples)
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+    median = statistics.median(times)
+
+    print(f"import saferoute: median {median:.1f} ms  min {times[0]:.1f} ms  max {times[-1]:.1f} ms  ({args.runs} runs)")
+    failed = False
+    if loaded:
+        print(f"UI modules loaded by the core: {', '.join(loaded)}")
+        failed = True
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"median import time exceeds {args.max_ms:.0f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""End-to-end benchmark of the Safe Route pipeline against a local ORS stand-in.
+
+Runs every stage (geocode_location, get_route, get_crime_data, score_route,
+find_safe_routes, display_map_with_routes) over a grid of route lengths and
+alternative counts, reporting the best wall time and the peak traced memory per
+stage. score_route is the raster scoring find_safe_routes runs for each route. Results can be saved as a
+baseline and later runs compared against it; any stage slower than the baseline
+by more than --threshold makes the run exit non-zero.
+
+    python benchmarks/bench_pipeline.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --compare benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --recordings benchmarks/recordings
+
+Recordings are refreshed by running once in record mode (see ors_stub.py):
+
+    ORS_API_KEY=... python benchmarks/bench_pipeline.py --recordings benchmarks/recordings \
+        --record https://api.openrouteservice.org --route-km 5 --repeat 1
+"""
+import argparse
+import gc
+import itertools
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from ors_stub import METERS_PER_DEGREE, ORSStub  # noqa: E402
+
+TIME_OF_DAY = "Night (8PM-6AM)"
+PROFILE = "driving-car"
+START = (-73.98, 40.75)  # [lon, lat]
+
+
+def measure(fn, repeat):
+    """Return (result, best wall seconds over repeat runs, peak traced KB of one run)."""
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return result, best, peak / 1024
+
+
+def run_scenario(stub, route_km, alternatives, repeat):
+    # Imported here, after main() has pointed ORS_BASE_URL and SAFE_ROUTE_CACHE_DIR at the stub
+    from saferoute import (display_map_with_routes, find_safe_routes, geocode_location, get_crime_data, get_route,
+                           polyline_codec)
+    from saferoute.crime import crime_raster
+    from saferoute.geocoding import geocode_cache
+    from saferoute.planner import result_cache
+    from saferoute.routing import route_cache
+
+    stub.alternatives = alternatives
+    end = (START[0] + route_km * 1000 / (METERS_PER_DEGREE * math.cos(math.radians(START[1]))), START[1])
+    stages = {}
+
+    def cold_geocode():
+        geocode_cache.clear()
+        return (geocode_location("Times Square, New York", "stub"),
+                geocode_location("Central Park, New York", "stub"))
+
+    def cold_route():
+        route_cache.clear()
+        return get_route(list(START), list(end), PROFILE, "stub", alternatives=True)
+
+    _, seconds, peak_kb = measure(cold_geocode, repeat)
+    stages["geocode_location"] = {"seconds": seconds, "peak_kb": peak_kb}
+
+    route_data, seconds, peak_kb = measure(cold_route, repeat)
+    stages["get_route"] = {"seconds": seconds, "peak_kb": peak_kb}
+
+    route = polyline_codec.decode(route_data["routes"][0]["geometry"])
+    bbox = [route[:, 1].min() - 0.02, route[:, 0].min() - 0.02, route[:, 1].max() + 0.02, route[:, 0].max() + 0.02]
+
+    get_crime_data(bbox, TIME_OF_DAY)  # build raster tiles once; lookups are what we time
+    (crime_data, _), seconds, peak_kb = measure(lambda: get_crime_data(bbox, TIME_OF_DAY), repeat)
+    stages["get_crime_data"] = {"seconds": seconds, "peak_kb": peak_kb, "points": len(crime_data)}
+
+    _, seconds, peak_kb = measure(lambda: crime_raster.score_route(route, TIME_OF_DAY), repeat)
+    stages["score_route"] = {"seconds": seconds, "peak_kb": peak_kb, "vertices": len(route)}
+
+    # Full request with a warm route cache: geocode/ORS latency is covered above. The scored
+    # result is dropped each run, or every repeat would just be a result cache hit.
+    def warm_route_request():
+        result_cache.clear()
+        return find_safe_routes(list(START), list(end), PROFILE, "stub", TIME_OF_DAY, 5, [])
+
+    (_, routes, crime_data, bbox), seconds, peak_kb = measure(warm_route_request, repeat)
+    stages["find_safe_routes"] = {"seconds": seconds, "peak_kb": peak_kb}
+
+    import folium  # noqa: F401  (keep the one-time lazy import out of the map stage numbers)
+
+    def render_map():
+        m = display_map_with_routes(routes, crime_data, bbox, True)[0]
+        return m.get_root().render()
+
+    html, seconds, peak_kb = measure(render_map, repeat)
+    stages["display_map_with_routes"] = {"seconds": seconds, "peak_kb": peak_kb, "html_kb": len(html) / 1024}
+    return stages
+
+
+def compare(results, baseline, threshold, min_delta):
+    """List of regression messages for stages slower than baseline * (1 + threshold).
+
+    Slowdowns under min_delta seconds are ignored; sub-millisecond stages are mostly noise.
+    """
+    regressions = []
+    for scenario, stages in results.items():
+        for stage, metrics in stages.items():
+            previous = baseline.get(scenario, {}).get(stage)
+            if not previous:
+                continue
+            slower = metrics["seconds"] - previous["seconds"]
+            if metrics["seconds"] > previous["seconds"] * (1 + threshold) and slower > min_delta:
+                regressions.append(f"{scenario} {stage}: {previous['seconds'] * 1000:.1f} ms -> "
+                                   f"{metrics['seconds'] * 1000:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--route-km", type=float, nargs="+", default=[5, 50])
+    parser.add_argument("--alternatives", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--vertices-per-km", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recordings", help="Directory of recorded ORS responses for the stub to replay")
+    parser.add_argument("--record", metavar="ORS_URL",
+                        help="Proxy requests missing from --recordings to this ORS server (key: $ORS_API_KEY) and record them")
+    parser.add_argument("--save-baseline", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before a stage counts as regressed")
+    parser.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    if args.record and not args.recordings:
+        parser.error("--record needs --recordings")
+
+    stub = ORSStub(recordings=args.recordings, vertices_per_km=args.vertices_per_km,
+                   upstream=args.record, upstream_key=os.environ.get("ORS_API_KEY"))
+    with tempfile.TemporaryDirectory() as cache_dir, stub:
+        # Configure before import: saferoute reads these at module load
+        os.environ["ORS_BASE_URL"] = stub.url
+        os.environ["SAFE_ROUTE_CACHE_DIR"] = cache_dir
+        os.environ["ORS_REQUESTS_PER_MINUTE"] = "0"  # the stub has no quota
+
+        results = {}
+        for route_km, alternatives in itertools.product(args.route_km, args.alternatives):
+            scenario = f"km={route_km:g} alts={alternatives}"
+            results[scenario] = run_scenario(stub, route_km, alternatives, args.repeat)
+
+            print(scenario)
+            for stage, metrics in results[scenario].items():
+                extra = "".join(f"  {k}={v:.0f}" for k, v in metrics.items() if k not in ("seconds", "peak_kb"))
+                print(f"  {stage:<24} {metrics['seconds'] * 1000:9.2f} ms  {metrics['peak_kb']:9.0f} KB peak{extra}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms / 1000)
+        if regressions:
+            print("REGRESSIONS:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
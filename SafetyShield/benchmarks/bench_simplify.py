@@ -0,0 +1,89 @@
+"""Payload size and scoring time saved by route simplification.
+
+Builds a synthetic road-like route (straight runs densely sampled, with GPS-scale
+jitter), then compares the folium map HTML and raster scoring time for the full
+geometry against the display- and scoring-simplified versions.
+
+    python benchmarks/bench_simplify.py --vertices 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import folium
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute.crime_raster import CrimeRaster  # noqa: E402
+from saferoute.route_simplify import SCORING_TOLERANCE_M, display_tolerance, fit_zoom, simplify, vertex_importance  # noqa: E402
+
+
+def synthetic_route(vertices, seed=0, start=(40.70, -74.00)):
+    """Random walk of straight legs, each sampled every few meters, with ~0.3m jitter."""
+    rng = np.random.default_rng(seed)
+    legs = [np.array([start])]
+    remaining = vertices - 1
+    while remaining > 0:
+        run = min(remaining, int(rng.integers(20, 400)))
+        heading = rng.uniform(0, 2 * np.pi)
+        step = rng.uniform(2, 8) / 111320.0
+        offsets = np.outer(np.arange(1, run + 1) * step, [np.sin(heading), np.cos(heading)])
+        legs.append(legs[-1][-1] + offsets)
+        remaining -= run
+    route = np.vstack(legs)
+    return route + rng.normal(0, 0.3 / 111320.0, route.shape)
+
+
+def map_html_bytes(coords, zoom):
+    m = folium.Map(location=coords.mean(axis=0).tolist(), zoom_start=zoom)
+    folium.PolyLine(coords.tolist(), weight=6).add_to(m)
+    return len(m.get_root().render().encode("utf-8"))
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vertices", type=int, default=50000)
+    parser.add_argument("--period", default="Night (8PM-6AM)")
+    args = parser.parse_args()
+
+    route = synthetic_route(args.vertices)
+    importance, importance_s = timed(vertex_importance, route, repeat=1)
+
+    lat = float(route[:, 0].mean())
+    bbox = [route[:, 1].min(), route[:, 0].min(), route[:, 1].max(), route[:, 0].max()]
+    zoom = fit_zoom(bbox)
+    display_route = simplify(route, display_tolerance(zoom, lat), importance)
+    scoring_route = simplify(route, SCORING_TOLERANCE_M, importance)
+
+    full_bytes = map_html_bytes(route, zoom)
+    display_bytes = map_html_bytes(display_route, zoom)
+
+    with tempfile.TemporaryDirectory() as root:
+        raster = CrimeRaster(root=root)
+        raster.score_route(route, args.period)  # warm the tile cache
+        full_score, full_s = timed(raster.score_route, route, args.period)
+        simple_score, simple_s = timed(raster.score_route, scoring_route, args.period)
+
+    print(f"vertices          full {len(route):>9}  display {len(display_route):>7}  scoring {len(scoring_route):>7}")
+    print(f"importance pass   {importance_s * 1000:9.1f} ms")
+    print(f"map html          full {full_bytes / 1024:9.0f} KB  display {display_bytes / 1024:7.0f} KB  "
+          f"({1 - display_bytes / full_bytes:.0%} smaller, zoom {zoom})")
+    print(f"raster scoring    full {full_s * 1000:9.2f} ms  scoring {simple_s * 1000:7.2f} ms  "
+          f"(score {full_score:.1f} -> {simple_score:.1f})")
+
+
+if __name__ == "__main__":
+    main()
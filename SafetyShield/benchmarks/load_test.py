@@ -0,0 +1,147 @@
+"""Load test of the route API (route_api.py) against a local ORS stand-in.
+
+Starts the ORS stub and the API server as a subprocess, then keeps --connections
+keep-alive clients posting /v1/routes requests for --duration seconds. Trips
+are drawn from --distinct origin-destination pairs, so a small pool exercises
+coalescing and the result cache and a large one the full pipeline. Reports
+requests/second, latency percentiles and the response status mix.
+
+    python benchmarks/load_test.py --connections 64 --duration 15 --distinct 200
+    python benchmarks/load_test.py --url http://127.0.0.1:8080   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from ors_stub import ORSStub  # noqa: E402
+
+CENTER = (-73.98, 40.75)  # [lon, lat], the stub's synthesized city
+TRIP_SPREAD = 0.03        # degrees around CENTER for trip endpoints
+
+
+def trip_pool(count, seed=0):
+    rng = random.Random(seed)
+    point = lambda: [round(CENTER[0] + rng.uniform(-TRIP_SPREAD, TRIP_SPREAD), 5),  # noqa: E731
+                     round(CENTER[1] + rng.uniform(-TRIP_SPREAD, TRIP_SPREAD), 5)]
+    return [json.dumps({"start": point(), "end": point(), "profile": "foot-walking",
+                        "time_of_day": "Night (8PM-6AM)", "safety_weight": rng.randint(0, 10)}).encode()
+            for _ in range(count)]
+
+
+async def client(host, port, bodies, stop_at, latencies, statuses, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.monotonic() < stop_at:
+            body = rng.choice(bodies)
+            started = time.perf_counter()
+            writer.write(b"POST /v1/routes HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (host.encode(), len(body), body))
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, bodies, connections, duration, seed=0):
+    parts = urlsplit(url)
+    latencies, statuses = [], Counter()
+    stop_at = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(parts.hostname, parts.port, bodies, stop_at, latencies, statuses, random.Random(seed + i))
+        for i in range(connections)
+    ])
+    return latencies, statuses, time.perf_counter() - started
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def wait_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/healthz", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"route API at {url} did not come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8097, help="Port for the server started here")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--distinct", type=int, default=100, help="Distinct trips in the request pool")
+    parser.add_argument("--workers", type=int, help="Server pipeline workers (default: the server's)")
+    parser.add_argument("--alternatives", type=int, default=3)
+    args = parser.parse_args()
+
+    stub = server = cache_dir = None
+    url = args.url
+    if not url:
+        cache_dir = tempfile.TemporaryDirectory()
+        stub = ORSStub(alternatives=args.alternatives).start()
+        url = f"http://127.0.0.1:{args.port}"
+        env = dict(os.environ, ORS_BASE_URL=stub.url, ORS_REQUESTS_PER_MINUTE="0", SAFE_ROUTE_METRICS_LOG="0",
+                   SAFE_ROUTE_CACHE_DIR=cache_dir.name)
+        command = [sys.executable, os.path.join(os.path.dirname(BENCH_DIR), "route_api.py"),
+                   "--port", str(args.port), "--api-key", "stub"]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        server = subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL)
+
+    try:
+        wait_ready(url)
+        latencies, statuses, elapsed = asyncio.run(
+            run_load(url, trip_pool(args.distinct), args.connections, args.duration))
+        with urllib.request.urlopen(url + "/metrics.json", timeout=5) as response:
+            counters = json.load(response)["counters"]
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        if stub:
+            stub.stop()
+            cache_dir.cleanup()
+
+    jobs = {c["labels"]["result"]: c["value"] for c in counters if c["name"] == "api_jobs"}
+    print(f"connections={args.connections} distinct={args.distinct} duration={elapsed:.1f}s")
+    print(f"  requests      {len(latencies)}  ({len(latencies) / elapsed:.1f} req/s)")
+    print("  latency ms    " + "  ".join(f"p{q}={percentile(latencies, q) * 1000:.1f}" for q in (50, 95, 99))
+          + f"  max={max(latencies, default=float('nan')) * 1000:.1f}")
+    print("  statuses      " + "  ".join(f"{status}={count}" for status, count in sorted(statuses.items())))
+    print("  server jobs   " + "  ".join(f"{name}={count}" for name, count in sorted(jobs.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Local stand-in for the OpenRouteService geocode and directions endpoints.
+
+Requests are first looked up in a recordings directory (one JSON file per
+request, named by the SHA-256 of the method, path and body/query); anything not
+recorded is synthesized deterministically so benchmarks can dial route length
+and alternative count without a network or an API key.
+
+    python benchmarks/ors_stub.py --port 8089
+    ORS_BASE_URL=http://127.0.0.1:8089 streamlit run safe_route.py
+
+In record mode requests that are not recorded yet are proxied to a real ORS
+server instead, with the key from $ORS_API_KEY, and its answers are saved into
+the recordings directory for later replays:
+
+    ORS_API_KEY=... python benchmarks/ors_stub.py --recordings benchmarks/recordings \
+        --record https://api.openrouteservice.org
+"""
+import argparse
+import collections
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import polyline
+import requests
+
+METERS_PER_DEGREE = 111320.0
+
+
+def request_key(method, path, payload):
+    """Recording file name for a request (payload is the JSON body or sorted query)."""
+    canonical = json.dumps([method, path, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _haversine_km(a, b):
+    (lon1, lat1), (lon2, lat2) = map(lambda p: map(math.radians, p), (a, b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+class ORSStub:
+    """Threaded HTTP server answering ORS-shaped geocode and directions requests.
+
+    vertices_per_km and alternatives control the synthesized routes and can be
+    changed between requests; request_count counts every request served.
+    With per_minute set, requests beyond that many in a sliding minute get a 429
+    with Retry-After, like the real quota (throttled_count counts them).
+    max_route_km and max_alternatives_km reject longer directions requests with
+    ORS's distance-limit error (straight-line distance through the coordinates).
+    With upstream set, requests missing from recordings are forwarded to that
+    ORS server (with upstream_key, if given, as the API key) and its answers
+    recorded; recorded_count counts the recordings written.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, recordings=None, vertices_per_km=50, alternatives=3,
+                 center=(40.75, -73.98), per_minute=None, max_route_km=None, max_alternatives_km=None,
+                 upstream=None, upstream_key=None):
+        if upstream and not recordings:
+            raise ValueError("recording needs a recordings directory")
+        self.recordings = recordings
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.upstream_key = upstream_key
+        self.recorded_count = 0
+        self.vertices_per_km = vertices_per_km
+        self.alternatives = alternatives
+        self.center = center
+        self.per_minute = per_minute
+        self.max_route_km = max_route_km
+        self.max_alternatives_km = max_alternatives_km
+        self.request_count = 0
+        self.throttled_count = 0
+        self._accepted = collections.deque()
+        self._count_lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, handler, method):
+        with self._count_lock:
+            self.request_count += 1
+            retry_after = self._throttle(time.monotonic())
+        if retry_after:
+            self._send(handler, 429, {"error": {"code": 429, "message": "Rate Limit Exceeded"}},
+                       {"Retry-After": f"{retry_after:.2f}"})
+            return
+
+        parsed = urlparse(handler.path)
+        if method == "POST":
+            length = int(handler.headers.get("Content-Length") or 0)
+            payload = json.loads(handler.rfile.read(length) or b"{}")
+        else:
+            payload = {k: v[0] for k, v in sorted(parse_qs(parsed.query).items())}
+
+        response = self._recorded(method, parsed.path, payload)
+        if response is None and self.upstream:
+            response = self._proxy(handler, method, payload)
+        status, body = response or self._synthesize(parsed.path, payload)
+        self._send(handler, status, body)
+
+    def _send(self, handler, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _throttle(self, now):
+        """Seconds until the sliding-minute quota frees up (0 if this request is accepted)."""
+        if not self.per_minute:
+            return 0
+        while self._accepted and now - self._accepted[0] >= 60:
+            self._accepted.popleft()
+        if len(self._accepted) >= self.per_minute:
+            self.throttled_count += 1
+            return 60 - (now - self._accepted[0])
+        self._accepted.append(now)
+        return 0
+
+    def _recorded(self, method, path, payload):
+        if not self.recordings:
+            return None
+        file_path = os.path.join(self.recordings, request_key(method, path, payload) + ".json")
+        if not os.path.exists(file_path):
+            return None
+        with open(file_path, encoding="utf-8") as f:
+            recording = json.load(f)
+        return recording.get("status", 200), recording["body"]
+
+    def _proxy(self, handler, method, payload):
+        """Forward a request to upstream and record the answer (quota and server errors are not kept)."""
+        headers = {"Accept": handler.headers.get("Accept") or "application/json",
+                   "Authorization": self.upstream_key or handler.headers.get("Authorization") or ""}
+        try:
+            if method == "POST":
+                response = requests.post(self.upstream + handler.path, json=payload, headers=headers, timeout=60)
+            else:
+                response = requests.get(self.upstream + handler.path, headers=headers, timeout=60)
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            return 502, {"error": {"code": 502, "message": f"upstream request failed: {e}"}}
+
+        if response.status_code != 429 and response.status_code < 500:
+            self._record(method, urlparse(handler.path).path, payload, response.status_code, body)
+        return response.status_code, body
+
+    def _record(self, method, path, payload, status, body):
+        os.makedirs(self.recordings, exist_ok=True)
+        file_path = os.path.join(self.recordings, request_key(method, path, payload) + ".json")
+        recording = {"request": {"method": method, "path": path, "payload": payload}, "status": status, "body": body}
+        with open(file_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(recording, f, indent=1, sort_keys=True)
+        os.replace(file_path + ".tmp", file_path)
+        with self._count_lock:
+            self.recorded_count += 1
+
+    def _synthesize(self, path, payload):
+        if path == "/geocode/search":
+            return 200, self.geocode(payload.get("text", ""))
+        if path.startswith("/v2/directions/"):
+            limit_km = self._distance_limit(payload)
+            if limit_km is not None:
+                return 400, {"error": {"code": 2004, "message": (
+                    "Request parameters exceed the server configuration limits. "
+                    f"The approximated route distance must not be greater than {limit_km * 1000:.1f} meters.")}}
+            return 200, self.directions(payload)
+        return 404, {"error": {"code": 404, "message": f"unknown endpoint {path}"}}
+
+    def _distance_limit(self, body):
+        """The limit (km) a directions request exceeds, or None if it is accepted."""
+        coords = body["coordinates"]
+        km = sum(_haversine_km(a, b) for a, b in zip(coords, coords[1:]))
+        if self.max_route_km is not None and km > self.max_route_km:
+            return self.max_route_km
+        if body.get("alternative_routes") and self.max_alternatives_km is not None and km > self.max_alternatives_km:
+            return self.max_alternatives_km
+        return None
+
+    def geocode(self, text):
+        """A stable point within ~5 km of center for any place name."""
+        h = zlib.crc32(text.casefold().encode("utf-8"))
+        lat = self.center[0] + ((h & 0xffff) / 0xffff - 0.5) * 0.1
+        lon = self.center[1] + ((h >> 16) / 0xffff - 0.5) * 0.1
+        return {"features": [{"geometry": {"type": "Point", "coordinates": [lon, lat]}, "properties": {"label": text}}]}
+
+    def directions(self, body):
+        (start_lon, start_lat), (end_lon, end_lat) = body["coordinates"][:2]
+        count = self.alternatives if body.get("alternative_routes") else 1
+        return {
+            "bbox": [min(start_lon, end_lon), min(start_lat, end_lat), max(start_lon, end_lon), max(start_lat, end_lat)],
+            "routes": [self._route((start_lat, start_lon), (end_lat, end_lon), i) for i in range(count)],
+            "metadata": {"service": "routing", "stub": True},
+        }
+
+    def _route(self, start, end, index):
+        lat0 = math.radians((start[0] + end[0]) / 2)
+        straight_km = math.hypot((end[0] - start[0]) * METERS_PER_DEGREE,
+                                 (end[1] - start[1]) * METERS_PER_DEGREE * math.cos(lat0)) / 1000
+        vertices = max(2, int(straight_km * self.vertices_per_km))
+
+        # Each alternative bows out further to one side of the straight line
+        t = np.linspace(0.0, 1.0, vertices)
+        bow = 0.15 * index * np.sin(np.pi * t)
+        rng = np.random.default_rng(index)
+        wiggle = rng.normal(0, 0.00003, (vertices, 2))
+        wiggle[[0, -1]] = 0
+        lat = start[0] + (end[0] - start[0]) * t - (end[1] - start[1]) * bow + wiggle[:, 0]
+        lon = start[1] + (end[1] - start[1]) * t + (end[0] - start[0]) * bow + wiggle[:, 1]
+        coords = np.column_stack([lat, lon])
+
+        distance = straight_km * 1000 * (1 + 0.1 * index)
+        duration = distance / 10.0
+        steps = []
+        step_count = min(10, vertices - 1)
+        bounds = np.linspace(0, vertices - 1, step_count + 1).astype(int)
+        for i in range(step_count):
+            steps.append({
+                "distance": distance / step_count,
+                "duration": duration / step_count,
+                "type": 11 if i == 0 else 1,
+                "instruction": "Head north" if i == 0 else f"Continue for segment {i + 1}",
+                "name": f"Stub Street {i + 1}",
+                "way_points": [int(bounds[i]), int(bounds[i + 1])],
+            })
+        return {
+            "summary": {"distance": distance, "duration": duration},
+            "segments": [{"distance": distance, "duration": duration, "steps": steps}],
+            "bbox": [float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())],
+            "geometry": polyline.encode(coords.tolist(), 5),
+            "way_points": [0, vertices - 1],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenRouteService stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--recordings", help="Directory of recorded responses to replay")
+    parser.add_argument("--record", metavar="ORS_URL",
+                        help="Proxy unrecorded requests to this ORS server (key: $ORS_API_KEY) and save them to --recordings")
+    parser.add_argument("--vertices-per-km", type=float, default=50)
+    parser.add_argument("--alternatives", type=int, default=3)
+    parser.add_argument("--per-minute", type=int, help="Answer 429 beyond this many requests a minute")
+    parser.add_argument("--max-route-km", type=float, help="Reject directions requests longer than this")
+    parser.add_argument("--max-alternatives-km", type=float, help="Reject alternative_routes requests longer than this")
+    args = parser.parse_args()
+    if args.record and not args.recordings:
+        parser.error("--record needs --recordings")
+
+    stub = ORSStub(args.host, args.port, args.recordings, args.vertices_per_km, args.alternatives,
+                   per_minute=args.per_minute, max_route_km=args.max_route_km,
+                   max_alternatives_km=args.max_alternatives_km,
+                   upstream=args.record, upstream_key=os.environ.get("ORS_API_KEY"))
+    print(f"ORS stub listening on {stub.url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
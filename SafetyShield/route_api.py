@@ -0,0 +1,334 @@
+"""JSON HTTP API over the Safe Route routing core, for the mobile app.
+
+    ORS_API_KEY=... python route_api.py --port 8080
+
+    POST /v1/routes   {"start": [lon, lat] | "place name", "end": ..., "profile": "foot-walking",
+                       "time_of_day": "Current Time", "safety_weight": 5, "avoid": []}
+    GET  /healthz
+    GET  /metrics     (Prometheus text; /metrics.json for JSON)
+
+The server is a single asyncio event loop. Geocoding, routing and scoring run on
+a bounded thread pool (the routing core is synchronous and shared with the
+Streamlit app), and their ORS calls go through the shared request scheduler, so
+the loop itself only ever waits on sockets.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from saferoute import geocode_location, metrics, polyline_codec
+from saferoute.crime_raster import TIME_PERIODS
+from saferoute.planner import rank_routes, score_route_options
+from saferoute.route_simplify import display_tolerance, fit_zoom, simplify
+
+logger = logging.getLogger("saferoute.api")
+
+PROFILES = ("driving-car", "foot-walking", "cycling-regular")
+AVOID_OPTIONS = ("highways", "tollways", "ferries", "high_crime_areas")
+TIMES_OF_DAY = ("Current Time", *TIME_PERIODS)
+
+MAX_API_WORKERS = 8            # pipeline runs (geocode or route + score) at once
+MAX_PENDING_JOBS = 64          # distinct jobs queued or running before new ones are refused with 503
+REQUEST_TIMEOUT = 20.0         # seconds a client waits before a 504; the job keeps running and fills the caches
+KEEPALIVE_TIMEOUT = 15.0       # idle seconds before a keep-alive connection is closed
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class RouteAPI:
+    """Asyncio HTTP server answering route requests from the shared routing core.
+
+    Concurrent identical jobs (the same geocode lookup, or the same trip for
+    scoring, whatever the safety weight) share one run. At most
+    MAX_PENDING_JOBS distinct jobs wait at a time; beyond that new work is
+    refused with 503 instead of queueing without bound, and every request is
+    answered within REQUEST_TIMEOUT.
+    """
+
+    def __init__(self, api_key, workers=MAX_API_WORKERS, max_pending=MAX_PENDING_JOBS, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="route-api")
+        self._jobs = {}       # key -> asyncio.Future of a running job
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self._server = await asyncio.start_server(self._serve_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- jobs ---------------------------------------------------------------
+
+    async def _run(self, key, fn, *args):
+        """Run fn(*args) on the pool, sharing the run with concurrent callers of the same key."""
+        future = self._jobs.get(key)
+        if future is not None:
+            metrics.increment("api_jobs", result="coalesced")
+        else:
+            if len(self._jobs) >= self.max_pending:
+                metrics.increment("api_jobs", result="rejected")
+                raise HTTPError(503, "server busy, retry shortly", {"Retry-After": "1"})
+            metrics.increment("api_jobs", result="started")
+            future = asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+            self._jobs[key] = future
+            future.add_done_callback(lambda _: self._jobs.pop(key, None))
+        # shield: a caller timing out must not cancel the job the others are waiting on
+        return await asyncio.shield(future)
+
+    async def _coords(self, value, deadline):
+        if isinstance(value, str) and value.strip():
+            place = value.strip()
+            coords = await _within(deadline, self._run(("geocode", place.lower()), geocode_location, place,
+                                                       self.api_key))
+            if not coords:
+                raise HTTPError(400, f"location not found: {place}")
+            return [float(coords[0]), float(coords[1])]
+        if (isinstance(value, (list, tuple)) and len(value) == 2
+                and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in value)):
+            lon, lat = float(value[0]), float(value[1])
+            if -180 <= lon <= 180 and -90 <= lat <= 90:
+                return [lon, lat]
+        raise HTTPError(400, "start and end must be [lon, lat] or a place name")
+
+    def _score(self, start, end, profile, time_of_day, avoid):
+        with metrics.trace("api_score", profile=profile):
+            return score_route_options(start, end, profile, self.api_key, time_of_day, avoid)
+
+    async def find_routes(self, request):
+        """Answer a /v1/routes request body (already parsed from JSON)."""
+        if not isinstance(request, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        profile = request.get("profile", "foot-walking")
+        if profile not in PROFILES:
+            raise HTTPError(400, f"profile must be one of {', '.join(PROFILES)}")
+        avoid = request.get("avoid") or []
+        if not isinstance(avoid, list) or any(a not in AVOID_OPTIONS for a in avoid):
+            raise HTTPError(400, f"avoid must be a list of {', '.join(AVOID_OPTIONS)}")
+        time_of_day = request.get("time_of_day") or "Current Time"
+        if time_of_day not in TIMES_OF_DAY:
+            raise HTTPError(400, f"time_of_day must be one of {', '.join(TIMES_OF_DAY)}")
+        safety_weight = request.get("safety_weight", 5)
+        if (not isinstance(safety_weight, (int, float)) or isinstance(safety_weight, bool)
+                or not 0 <= safety_weight <= 10):
+            raise HTTPError(400, "safety_weight must be a number from 0 to 10")
+        tolerance_m = request.get("tolerance_m")
+        if tolerance_m is not None and (not isinstance(tolerance_m, (int, float)) or tolerance_m < 0):
+            raise HTTPError(400, "tolerance_m must be a non-negative number")
+
+        deadline = time.monotonic() + self.timeout
+        start, end = await asyncio.gather(self._coords(request.get("start"), deadline),
+                                          self._coords(request.get("end"), deadline))
+
+        # Same key as the result cache, so only the ranking differs between coalesced callers
+        key = ("score", tuple(round(c, 6) for c in start), tuple(round(c, 6) for c in end), profile,
+               tuple(sorted(avoid)), time_of_day)
+        route_data, routes, _, _ = await _within(deadline, self._run(key, self._score, start, end, profile,
+                                                                     time_of_day, avoid))
+        routes = [route for route in routes or [] if len(route['decoded_route'])]  # nothing to draw or bound
+        if not routes:
+            raise HTTPError(404, "no route found between these points")
+        return route_response(rank_routes(routes, safety_weight), start, end, tolerance_m)
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    await _write_response(writer, e.status, {"error": str(e)}, False, e.headers)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                started = time.perf_counter()
+                status, payload, extra = await self._dispatch(method, path, body)
+                metrics.observe("api_request", time.perf_counter() - started)
+                metrics.increment("api_responses", status=status)
+                await _write_response(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        """Return (status, payload, extra headers); payload is a dict or pre-rendered text."""
+        try:
+            if path == "/v1/routes":
+                if method != "POST":
+                    raise HTTPError(405, "use POST", {"Allow": "POST"})
+                try:
+                    request = json.loads(body or b"{}")
+                except ValueError:
+                    raise HTTPError(400, "request body is not valid JSON")
+                return 200, await self.find_routes(request), {}
+            if method != "GET":
+                raise HTTPError(405, "use GET", {"Allow": "GET"})
+            if path == "/healthz":
+                return 200, {"status": "ok", "pending_jobs": len(self._jobs)}, {}
+            if path == "/metrics":
+                return 200, metrics.render_prometheus(), {}
+            if path == "/metrics.json":
+                return 200, metrics.snapshot(), {}
+            raise HTTPError(404, "not found")
+        except HTTPError as e:
+            return e.status, {"error": str(e)}, e.headers
+        except Exception as e:  # report, but keep the connection and the server alive
+            logger.exception("Error answering %s %s", method, path)
+            return 500, {"error": f"internal error: {e}"}, {}
+
+
+async def _within(deadline, awaitable):
+    try:
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        metrics.increment("api_jobs", result="timed_out")
+        raise HTTPError(504, "route calculation is taking too long, retry shortly", {"Retry-After": "2"})
+
+
+def route_response(routes, start, end, tolerance_m=None):
+    """JSON-ready ranked routes with polyline-encoded, display-simplified geometry."""
+    lats = [lat for route in routes for lat in (route['decoded_route'][:, 0].min(), route['decoded_route'][:, 0].max())]
+    lons = [lon for route in routes for lon in (route['decoded_route'][:, 1].min(), route['decoded_route'][:, 1].max())]
+    bbox = [float(min(lons)), float(min(lats)), float(max(lons)), float(max(lats))]
+    if tolerance_m is None:
+        tolerance_m = display_tolerance(fit_zoom(bbox), (bbox[1] + bbox[3]) / 2)
+
+    options = []
+    for rank, route in enumerate(routes, 1):
+        coords = simplify(route['decoded_route'], tolerance_m, route.get('vertex_importance'))
+        options.append({
+            "rank": rank,
+            "safety_score": round(float(route['safety_score']), 1),
+            "distance_m": round(float(route['summary']['distance']), 1),
+            "duration_s": round(float(route['summary']['duration']), 1),
+            "geometry": polyline_codec.encode(coords),
+            "points": len(coords),
+            "instructions": [
+                {"text": step.get('instruction', ''), "distance_m": round(float(step.get('distance', 0)), 1),
+                 "duration_s": round(float(step.get('duration', 0)), 1)}
+                for segment in route['segments'] for step in segment.get('steps', [])
+            ],
+        })
+    return {"start": start, "end": end, "bbox": bbox, "tolerance_m": round(tolerance_m, 2), "routes": options}
+
+
+async def _read_request(reader):
+    """Read one HTTP/1.1 request; returns (method, path, headers, body) or None at end of stream."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADER_LINES:
+            raise HTTPError(400, "too many headers")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, headers, body
+
+
+async def _write_response(writer, status, payload, keep_alive, headers=None):
+    if isinstance(payload, str):
+        data, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+    else:
+        data, content_type = json.dumps(payload, default=_json_default).encode("utf-8"), "application/json"
+    head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(data)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+    await writer.drain()
+
+
+def _json_default(value):
+    # numpy scalars from the routing core
+    if hasattr(value, "item"):
+        value = value.item()
+        if isinstance(value, float) and not math.isfinite(value):
+            return None
+        return value
+    return str(value)
+
+
+async def serve(api_key, host, port, workers, max_pending, timeout):
+    api = RouteAPI(api_key, workers, max_pending, timeout)
+    port = await api.start(host, port)
+    logger.info(f"Serving safe routes on http://{host}:{port}/v1/routes")
+    try:
+        await api.serve_forever()
+    finally:
+        await api.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve safe routes as JSON over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--api-key", default=os.environ.get("ORS_API_KEY"), help="OpenRouteService API key (default: $ORS_API_KEY)")
+    parser.add_argument("--workers", type=int, default=MAX_API_WORKERS, help="Concurrent pipeline runs")
+    parser.add_argument("--max-pending", type=int, default=MAX_PENDING_JOBS, help="Distinct jobs queued before answering 503")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Seconds before a request is answered with 504")
+    args = parser.parse_args()
+
+    if not args.api_key:
+        parser.error("an OpenRouteService API key is required (--api-key or ORS_API_KEY)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    try:
+        asyncio.run(serve(args.api_key, args.host, args.port, args.workers, args.max_pending, args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""Safe Route Finder routing core: geocoding, ORS routing, crime data and safety scoring.
+
+Importing this package has no side effects and does not load streamlit, folium
+or pandas; folium is imported only when display_map_with_routes builds a map.
+The Streamlit app in safe_route.py is a thin UI over these functions.
+"""
+from .crime import evaluate_route_safety, get_crime_data
+from .geocoding import geocode_location
+from .mapping import display_map_with_routes
+from .metrics import metrics
+from .planner import find_safe_routes
+from .routing import combine_route_segments, generate_waypoints, get_route, get_single_route, haversine_distance
+
+__all__ = [
+    "combine_route_segments",
+    "display_map_with_routes",
+    "evaluate_route_safety",
+    "find_safe_routes",
+    "generate_waypoints",
+    "geocode_location",
+    "get_crime_data",
+    "get_route",
+    "get_single_route",
+    "haversine_distance",
+    "metrics",
+]
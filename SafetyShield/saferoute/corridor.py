@@ -0,0 +1,209 @@
+import math
+
+import numpy as np
+
+METERS_PER_DEGREE = 111320.0
+
+CORRIDOR_WIDTH_M = 100.0          # crimes closer than this to any route edge count against it
+DENSE_GRID_MAX_CELLS = 1 << 22    # largest route grid given a dense cell lookup table
+
+# 3x3 neighbourhood of grid cells around a query cell
+_NEIGHBOUR_OFFSETS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+def project(coords, lat0):
+    """Project [lat, lon] degrees to [x, y] meters in an equirectangular frame centred on lat0."""
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    return np.column_stack([
+        coords[:, 1] * math.cos(math.radians(lat0)) * METERS_PER_DEGREE,
+        coords[:, 0] * METERS_PER_DEGREE,
+    ])
+
+
+def point_segment_distances(points, a, b):
+    """Distance from points[i] to segment a[i]-b[i], for equally shaped (n, 2) arrays (broadcastable)."""
+    ab = b - a
+    ap = points - a
+    length_sq = np.einsum("ij,ij->i", *np.broadcast_arrays(ab, ab))
+    t = np.einsum("ij,ij->i", *np.broadcast_arrays(ap, ab))
+    t = np.clip(np.divide(t, length_sq, out=np.zeros_like(t), where=length_sq > 0), 0.0, 1.0)
+    nearest = a + t[:, None] * ab
+    return np.hypot(points[..., 0] - nearest[:, 0], points[..., 1] - nearest[:, 1])
+
+
+class RouteCorridor:
+    """A route projected once into a local metric frame, for point-to-edge distance queries.
+
+    Route edges are registered in a hash grid of cells slightly wider than the
+    corridor, sampled along each edge, so a crime only tests the few
+    edges that pass near its cell. Cost is linear in route length and number of
+    crime points instead of their product, and long straight edges are handled
+    exactly rather than only at their end vertices.
+    """
+
+    def __init__(self, route_coords, width_m=CORRIDOR_WIDTH_M):
+        coords = np.asarray(route_coords, dtype=float).reshape(-1, 2)
+        self.coords = coords
+        self.width_m = width_m
+        self.lat0 = float(coords[:, 0].mean()) if len(coords) else 0.0
+        points = project(coords, self.lat0)
+        if len(points) == 1:
+            points = np.vstack([points, points])  # single vertex: one zero-length edge
+
+        self.a = points[:-1]
+        self.b = points[1:]
+        self.edge_lengths = np.hypot(*(self.b - self.a).T)
+        self.length_m = float(self.edge_lengths.sum())
+        self._keys = None  # edge grid, built on the first distance query
+
+    def __len__(self):
+        return len(self.a)
+
+    def _build_edge_grid(self):
+        edge_lengths = self.edge_lengths
+        self.cell_size = 1.3 * self.width_m
+        if not len(self.a):
+            self._keys = np.empty(0, dtype=np.int64)
+            self._edges = np.empty(0, dtype=np.int64)
+            self._origin = np.zeros(2, dtype=np.int64)
+            self._shape = np.ones(2, dtype=np.int64)
+            self._cell_offsets = None
+            return
+
+        # Sample every edge at most half a corridor width apart. Any point within the
+        # corridor is then within 1.25 widths (less than one cell) of a sample, i.e.
+        # in the sample's cell or one adjacent to it.
+        samples_per_edge = np.ceil(edge_lengths / (self.width_m / 2)).astype(np.int64) + 1
+        edge_ids = np.repeat(np.arange(len(self.a)), samples_per_edge)
+        starts = np.cumsum(samples_per_edge) - samples_per_edge
+        fraction = (np.arange(len(edge_ids)) - starts[edge_ids]) / np.maximum(samples_per_edge[edge_ids] - 1, 1)
+        samples = self.a[edge_ids] + fraction[:, None] * (self.b[edge_ids] - self.a[edge_ids])
+
+        cells = np.floor(samples / self.cell_size).astype(np.int64)
+        cells = (cells[:, None, :] + _NEIGHBOUR_OFFSETS[None, :, :]).reshape(-1, 2)
+        edge_ids = np.repeat(edge_ids, len(_NEIGHBOUR_OFFSETS))
+
+        self._origin = cells.min(axis=0)
+        self._shape = cells.max(axis=0) - self._origin + 1
+        keys = self._cell_keys(cells)
+
+        # Unique (cell, edge) pairs sorted by cell, packed into one int64 for a flat sort
+        pairs = np.unique(keys * len(self.a) + edge_ids)
+        self._keys = pairs // len(self.a)
+        self._edges = pairs % len(self.a)
+
+        # For routes whose grid is small enough, a dense per-cell offset table turns
+        # each lookup into a gather instead of two binary searches
+        cell_count = int(self._shape[0] * self._shape[1])
+        if cell_count <= DENSE_GRID_MAX_CELLS:
+            self._cell_offsets = np.concatenate([[0], np.cumsum(np.bincount(self._keys, minlength=cell_count))])
+        else:
+            self._cell_offsets = None
+
+    def _cell_keys(self, cells):
+        local = cells - self._origin
+        return local[:, 0] * self._shape[1] + local[:, 1]
+
+    def distances(self, coords):
+        """Distance in meters from each [lat, lon] point to the nearest route edge.
+
+        Only edges registered near each point are tested, so points further than
+        the corridor width may report inf instead of their true distance.
+        """
+        if self._keys is None:
+            self._build_edge_grid()
+        points = project(coords, self.lat0)
+        result = np.full(len(points), np.inf)
+        if not len(points) or not len(self._keys):
+            return result
+
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        local = cells - self._origin
+        valid = np.all((local >= 0) & (local < self._shape), axis=1)
+        keys = self._cell_keys(cells)
+        if self._cell_offsets is not None:
+            keys = np.where(valid, keys, 0)
+            starts = self._cell_offsets[keys]
+            ends = self._cell_offsets[keys + 1]
+        else:
+            starts = np.searchsorted(self._keys, keys, side="left")
+            ends = np.searchsorted(self._keys, keys, side="right")
+        counts = np.where(valid, ends - starts, 0)
+        total = int(counts.sum())
+        if total == 0:
+            return result
+
+        # Expand each point's candidate range into flat (point, edge) pairs
+        point_ids = np.repeat(np.arange(len(points)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        edges = self._edges[np.repeat(starts, counts) + offsets]
+
+        # Pairs are grouped by point, so the nearest edge is a reduction per group
+        pair_distances = point_segment_distances(points[point_ids], self.a[edges], self.b[edges])
+        has_candidates = counts > 0
+        group_starts = (np.cumsum(counts) - counts)[has_candidates]
+        result[has_candidates] = np.minimum.reduceat(pair_distances, group_starts)
+        return result
+
+    def resample(self, spacing_m):
+        """[lat, lon] points evenly spaced at most spacing_m apart along the route, ends included."""
+        if not len(self.coords):
+            return self.coords
+        distance = np.concatenate([[0.0], np.cumsum(self.edge_lengths)])
+        if len(distance) > len(self.coords):
+            distance = distance[:len(self.coords)]  # single vertex route
+        count = max(2, int(np.ceil(self.length_m / spacing_m)) + 1)
+        along = np.linspace(0.0, self.length_m, count)
+        return np.column_stack([np.interp(along, distance, self.coords[:, 0]),
+                                np.interp(along, distance, self.coords[:, 1])])
+
+    def crime_weight(self, crime_data):
+        """(count, weight_sum) of [lat, lon, weight] crimes within the corridor, each counted once."""
+        crimes = np.asarray(crime_data, dtype=float).reshape(-1, 3)
+        if not len(crimes):
+            return 0, 0.0
+        near = self.distances(crimes[:, :2]) < self.width_m
+        return int(near.sum()), float(crimes[near, 2].sum())
+
+    def hotspot_penalty(self, hotspots):
+        """Penalty for each (lat, lon, radius_degrees) hotspot the route passes through.
+
+        The penalty is taken at the first edge, in travel order, that enters the
+        hotspot and grows the closer that edge passes to the centre.
+        """
+        penalty = 0.0
+        if not len(self.a):
+            return penalty
+        for hotspot_lat, hotspot_lon, hotspot_radius in hotspots:
+            center = project([[hotspot_lat, hotspot_lon]], self.lat0)
+            radius_m = hotspot_radius * METERS_PER_DEGREE
+            dist = point_segment_distances(center, self.a, self.b)
+            inside = dist < radius_m
+            if inside.any():
+                first = int(np.argmax(inside))
+                penalty += (radius_m - dist[first]) / radius_m * 2
+        return penalty
+
+    def score(self, crime_data, hotspots):
+        """Safety score (0-100) from crime weight per corridor-diameter of route length."""
+        _, crime_weight_sum = self.crime_weight(crime_data)
+        return self.safety_score(crime_weight_sum + self.hotspot_penalty(hotspots))
+
+    def safety_score(self, crime_weight_sum):
+        """Safety score (0-100) from the crime weight (plus hotspot penalty) along the route.
+
+        Shared by every scorer so the same route gets the same score whichever
+        crime data source is used.
+        """
+        # Normalize by route length, in units of the corridor's diameter
+        span = 2 * self.width_m
+        normalized_crime = crime_weight_sum * span / max(self.length_m, span)
+        safety_score = 100 - min(100, normalized_crime * 100)
+        return max(0, safety_score)
+
+
+def hotspot_penalty(route_coords, hotspots):
+    """Hotspot penalty of a [lat, lon] route (see RouteCorridor.hotspot_penalty)."""
+    if not len(route_coords):
+        return 0.0
+    return RouteCorridor(route_coords).hotspot_penalty(hotspots)
@@ -0,0 +1,23 @@
+from .corridor import RouteCorridor
+from .crime_raster import CrimeRaster, resolve_time_period
+
+# Precomputed crime density tiles per time period (memory-mapped from disk)
+crime_raster = CrimeRaster()
+
+# Function to get crime data for an area from the precomputed density raster
+# (the raster itself is a synthetic model - replace with a real crime data source when available)
+def get_crime_data(bbox, time_of_day):
+    period = resolve_time_period(time_of_day)
+    return crime_raster.crime_points(bbox, period)
+
+# Function to evaluate route safety using crime data
+def evaluate_route_safety(route_coords, crime_data, hotspots):
+    if not crime_data:
+        return 95  # Default high safety if no crime data
+    
+    if not len(route_coords):
+        return 95  # Default value for empty routes
+    
+    # Measure point-to-edge distances in a local metric frame, so crimes beside
+    # a long straight edge count as much as crimes beside a vertex
+    return RouteCorridor(route_coords).score(crime_data, hotspots)
@@ -0,0 +1,292 @@
+import argparse
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from .corridor import CORRIDOR_WIDTH_M, METERS_PER_DEGREE, RouteCorridor
+from .geocode_cache import CACHE_DIR
+
+# Crime density relative to the worst period (night)
+TIME_PERIOD_DENSITY = {
+    "Morning (6AM-10AM)": 0.3,
+    "Afternoon (10AM-4PM)": 0.4,
+    "Evening (4PM-8PM)": 0.6,
+    "Night (8PM-6AM)": 1.0,
+}
+TIME_PERIODS = list(TIME_PERIOD_DENSITY)
+
+RASTER_CELL_SIZE = 0.001           # degrees per raster cell (approx 100m, the route corridor width)
+RASTER_TILE_CELLS = 100             # cells per tile side (0.1 degree tiles)
+RASTER_SEED = 20240301              # base seed of the synthetic incident model
+RASTER_FORMAT = 2                   # bump when the tile contents change, so stale tiles on disk are not reused
+RASTER_MEMORY_TILES = 512           # memory-mapped tiles kept open
+MAX_OVERLAY_TILES = 400             # largest bbox (in tiles) returned as points for the heatmap
+RASTER_SAMPLE_SPACING_M = CORRIDOR_WIDTH_M / 2   # route sampling step for raster lookups
+
+# Layers stored in every tile file
+INCIDENT_LAYER = 0   # summed incident weight per cell
+CORRIDOR_LAYER = 1   # incident weight within one cell (the route corridor) of each cell
+
+
+def resolve_time_period(time_of_day, now=None):
+    """Map a sidebar time-of-day choice onto one of TIME_PERIODS ("Current Time" uses the clock)."""
+    if time_of_day != "Current Time":
+        return time_of_day
+
+    current_hour = (now or datetime.now()).hour
+    if 6 <= current_hour < 10:
+        return "Morning (6AM-10AM)"
+    elif 10 <= current_hour < 16:
+        return "Afternoon (10AM-4PM)"
+    elif 16 <= current_hour < 20:
+        return "Evening (4PM-8PM)"
+    return "Night (8PM-6AM)"
+
+
+class CrimeRaster:
+    """Gridded crime density per time period, stored as memory-mapped .npy tiles.
+
+    The world is cut into square tiles of RASTER_TILE_CELLS cells. A tile is
+    generated deterministically from (period, tile) the first time it is needed,
+    saved under root and memory-mapped from then on, so route vertices are scored
+    by plain array indexing and scores are reproducible across runs.
+    """
+
+    def __init__(self, root=None, cell_size=RASTER_CELL_SIZE, tile_cells=RASTER_TILE_CELLS,
+                 seed=RASTER_SEED, memory_tiles=RASTER_MEMORY_TILES):
+        self.root = root or os.path.join(CACHE_DIR, "crime_raster")
+        self.cell_size = cell_size
+        self.tile_cells = tile_cells
+        self.tile_size = cell_size * tile_cells
+        self.seed = seed
+        self.memory_tiles = memory_tiles
+
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tile_path(self, period, tile_lat, tile_lon, suffix=""):
+        if period not in TIME_PERIOD_DENSITY:
+            raise ValueError(f"unknown time period {period!r}")  # never let it name a directory
+        slug = period.split(" ")[0].lower()
+        # Everything the tile contents depend on names the directory, so changing any of it
+        # generates fresh tiles instead of silently reusing ones built for other settings
+        layout = f"v{RASTER_FORMAT}-seed{self.seed}-cell{self.cell_size:g}-n{self.tile_cells}"
+        return os.path.join(self.root, layout, slug, f"{tile_lat}_{tile_lon}{suffix}.npy")
+
+    def _incidents(self, period, tile_lat, tile_lon):
+        """Synthetic incidents seeded by one tile: one hotspot plus uniform background noise.
+
+        Returns (lat, lon, weight, hotspots). Points scattered around the hotspot
+        may land in a neighbouring tile; they belong to that tile's raster.
+        """
+        period_index = TIME_PERIODS.index(period)
+        rng = np.random.default_rng([self.seed, period_index, tile_lat + 2 ** 31, tile_lon + 2 ** 31])
+        density = TIME_PERIOD_DENSITY[period]
+
+        min_lat = tile_lat * self.tile_size
+        min_lon = tile_lon * self.tile_size
+        max_lat = min_lat + self.tile_size
+        max_lon = min_lon + self.tile_size
+
+        hotspot_lat = rng.uniform(min_lat, max_lat)
+        hotspot_lon = rng.uniform(min_lon, max_lon)
+        hotspot_radius = rng.uniform(0.01, 0.05)  # Roughly 1-5 km
+        hotspots = np.array([[hotspot_lat, hotspot_lon, hotspot_radius]])
+
+        # About 50-200 incidents per tile depending on density, 70% around the hotspot
+        num_points = int(50 + (150 * density))
+        in_hotspot = rng.random(num_points) < 0.7
+        lat = np.where(in_hotspot, rng.normal(hotspot_lat, hotspot_radius / 3, num_points),
+                       rng.uniform(min_lat, max_lat, num_points))
+        lon = np.where(in_hotspot, rng.normal(hotspot_lon, hotspot_radius / 3, num_points),
+                       rng.uniform(min_lon, max_lon, num_points))
+
+        # Weight is higher for points close to hotspot center
+        dist_from_center = np.sqrt((lat - hotspot_lat) ** 2 + (lon - hotspot_lon) ** 2)
+        hotspot_weight = np.maximum(0.2, 1.0 - np.minimum(1.0, dist_from_center / hotspot_radius))
+        weight = np.where(in_hotspot, hotspot_weight, rng.uniform(0.2, 0.5, num_points))
+        return lat, lon, weight, hotspots
+
+    def _generate_tile(self, period, tile_lat, tile_lon):
+        """(layers, hotspots) of one tile.
+
+        Incidents come from this tile's model and its eight neighbours' (hotspot
+        scatter crosses tile edges; the rare point straying further is dropped).
+        They are binned into the tile plus a one-cell halo, so the corridor sums of
+        edge cells include the incidents just across the border.
+        """
+        n = self.tile_cells
+        first_row, first_col = tile_lat * n - 1, tile_lon * n - 1  # global cell index of the halo's corner
+        padded = np.zeros((n + 2, n + 2))
+        hotspots = None
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                lat, lon, weight, source_hotspots = self._incidents(period, tile_lat + dy, tile_lon + dx)
+                if dy == dx == 0:
+                    hotspots = source_hotspots
+                rows = np.floor(lat / self.cell_size).astype(np.int64) - first_row
+                cols = np.floor(lon / self.cell_size).astype(np.int64) - first_col
+                inside = (rows >= 0) & (rows < n + 2) & (cols >= 0) & (cols < n + 2)
+                np.add.at(padded, (rows[inside], cols[inside]), weight[inside])
+
+        # Box-sum each 3x3 neighbourhood: the weight within one corridor width of every cell
+        corridor = np.zeros((n, n))
+        for dy in range(3):
+            for dx in range(3):
+                corridor += padded[dy:dy + n, dx:dx + n]
+
+        layers = np.stack([padded[1:-1, 1:-1], corridor]).astype(np.float32)
+        return layers, hotspots
+
+    def _save(self, path, array):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+
+    def tile(self, period, tile_lat, tile_lon):
+        """Return (layers, hotspots) for a tile, generating and persisting it on first use."""
+        key = (period, tile_lat, tile_lon)
+        with self._lock:
+            cached = self._tiles.get(key)
+            if cached is not None:
+                self._tiles.move_to_end(key)
+                return cached
+
+        path = self._tile_path(period, tile_lat, tile_lon)
+        hotspot_path = self._tile_path(period, tile_lat, tile_lon, ".hotspots")
+        if not (os.path.exists(path) and os.path.exists(hotspot_path)):
+            layers, hotspots = self._generate_tile(period, tile_lat, tile_lon)
+            self._save(hotspot_path, hotspots)
+            self._save(path, layers)
+
+        entry = (np.load(path, mmap_mode="r"), np.load(hotspot_path))
+        with self._lock:
+            self._tiles[key] = entry
+            while len(self._tiles) > self.memory_tiles:
+                self._tiles.popitem(last=False)
+        return entry
+
+    def _tile_range(self, bbox):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        lat_range = range(int(np.floor(min_lat / self.tile_size)), int(np.floor(max_lat / self.tile_size)) + 1)
+        lon_range = range(int(np.floor(min_lon / self.tile_size)), int(np.floor(max_lon / self.tile_size)) + 1)
+        return lat_range, lon_range
+
+    def precompute(self, bbox, periods=None):
+        """Generate and persist every tile covering bbox for the given periods (default: all)."""
+        lat_range, lon_range = self._tile_range(bbox)
+        count = 0
+        for period in periods or TIME_PERIODS:
+            for tile_lat in lat_range:
+                for tile_lon in lon_range:
+                    self.tile(period, tile_lat, tile_lon)
+                    count += 1
+        return count
+
+    def _cells(self, route_coords):
+        route = np.asarray(route_coords, dtype=float).reshape(-1, 2)
+        return np.floor(route / self.cell_size).astype(np.int64)
+
+    def corridor_density(self, route_coords, period):
+        """Crime weight within the corridor of each route vertex, one lookup per vertex."""
+        cells = self._cells(route_coords)
+        density = np.zeros(len(cells))
+        if not len(cells):
+            return density
+
+        tiles = cells // self.tile_cells
+        local = cells % self.tile_cells
+        unique_tiles, tile_ids = np.unique(tiles, axis=0, return_inverse=True)
+        tile_ids = tile_ids.ravel()
+        for i, (tile_lat, tile_lon) in enumerate(unique_tiles):
+            layers, _ = self.tile(period, int(tile_lat), int(tile_lon))
+            mask = tile_ids == i
+            density[mask] = layers[CORRIDOR_LAYER, local[mask, 0], local[mask, 1]]
+        return density
+
+    def route_hotspots(self, route_coords, period):
+        """Hotspots of every tile a route touches, plus their neighbours."""
+        tiles = np.unique(self._cells(route_coords) // self.tile_cells, axis=0)
+        if not len(tiles):
+            return []
+        offsets = np.array([(dy, dx) for dy in (-1, 0, 1) for dx in (-1, 0, 1)])
+        tiles = np.unique((tiles[:, None, :] + offsets[None, :, :]).reshape(-1, 2), axis=0)
+
+        hotspots = []
+        for tile_lat, tile_lon in tiles:
+            _, tile_hotspots = self.tile(period, int(tile_lat), int(tile_lon))
+            hotspots.extend(tuple(float(v) for v in hotspot) for hotspot in tile_hotspots)
+        return hotspots
+
+    def score_route(self, route_coords, period):
+        """Safety score (0-100) of a decoded [lat, lon] route using raster lookups."""
+        if not len(route_coords):
+            return 95  # Default value for empty routes
+
+        # Look up evenly spaced samples rather than the vertices themselves, so long
+        # straight edges are scored along their whole length, not just at their ends
+        corridor = RouteCorridor(route_coords)
+        samples = corridor.resample(RASTER_SAMPLE_SPACING_M)
+        density = self.corridor_density(samples, period)
+
+        # Each sample reads the weight in a 3x3 cell box, and neighbouring samples share
+        # most of it. Scale the mean box weight by the corridor's share of the box width
+        # and the number of boxes along the route, to estimate the weight within the
+        # corridor with each incident counted once, as RouteCorridor.score does
+        box_m = 3 * self.cell_size * METERS_PER_DEGREE
+        crime_weight_sum = (float(density.mean()) * (2 * corridor.width_m / box_m)
+                            * max(corridor.length_m, box_m) / box_m)
+        crime_weight_sum += corridor.hotspot_penalty(self.route_hotspots(samples, period))
+        return corridor.safety_score(crime_weight_sum)
+
+    def crime_points(self, bbox, period):
+        """Return ([lat, lon, weight] cell centres, hotspots) inside bbox for map overlays.
+
+        Bounding boxes larger than MAX_OVERLAY_TILES tiles return nothing rather than
+        generating thousands of tiles for a continental route.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        lat_range, lon_range = self._tile_range(bbox)
+        if len(lat_range) * len(lon_range) > MAX_OVERLAY_TILES:
+            return [], []
+
+        crime_data = []
+        hotspots = []
+        for tile_lat in lat_range:
+            for tile_lon in lon_range:
+                layers, tile_hotspots = self.tile(period, tile_lat, tile_lon)
+                rows, cols = np.nonzero(layers[INCIDENT_LAYER])
+                lat = (tile_lat * self.tile_cells + rows + 0.5) * self.cell_size
+                lon = (tile_lon * self.tile_cells + cols + 0.5) * self.cell_size
+                inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+                weight = layers[INCIDENT_LAYER, rows[inside], cols[inside]]
+                crime_data.extend(np.column_stack([lat[inside], lon[inside], weight]).tolist())
+
+                for hotspot_lat, hotspot_lon, hotspot_radius in tile_hotspots:
+                    if min_lat <= hotspot_lat <= max_lat and min_lon <= hotspot_lon <= max_lon:
+                        hotspots.append((float(hotspot_lat), float(hotspot_lon), float(hotspot_radius)))
+
+        return crime_data, hotspots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute crime density raster tiles for an area.")
+    parser.add_argument("--bbox", nargs=4, type=float, required=True,
+                        metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    parser.add_argument("--period", action="append", choices=TIME_PERIODS,
+                        help="Time period to precompute (repeatable, default: all)")
+    parser.add_argument("--root", help="Directory for raster tiles")
+    args = parser.parse_args()
+
+    count = CrimeRaster(root=args.root).precompute(args.bbox, args.period)
+    print(f"{count} tiles ready")
+
+
+if __name__ == "__main__":
+    main()
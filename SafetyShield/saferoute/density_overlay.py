@@ -0,0 +1,129 @@
+import base64
+import math
+import struct
+import zlib
+
+import numpy as np
+
+from .metrics import metrics
+from .result_cache import ResultCache
+
+OVERLAY_MAX_PIXELS = 512                  # longest side of the rendered density image
+OVERLAY_BLUR_PIXELS = 1.5                 # gaussian blur sigma, in image pixels
+OVERLAY_CACHE_MAX_BYTES = 32 * 1024 * 1024
+OVERLAY_OPACITY = 0.6
+OVERLAY_PNG_LEVEL = 6                     # zlib level; 9 costs several times longer for ~5% smaller images
+
+# Same colour ramp as folium's HeatMap default, as (stop, r, g, b)
+OVERLAY_GRADIENT = np.array([
+    (0.0, 0, 0, 255),
+    (0.4, 0, 0, 255),
+    (0.6, 0, 255, 255),
+    (0.7, 0, 255, 0),
+    (0.8, 255, 255, 0),
+    (1.0, 255, 0, 0),
+], dtype=float)
+
+# Rendered overlays; crime data for a bbox only changes with the time period,
+# so in practice this holds one image per (bbox, period)
+overlay_cache = ResultCache(max_bytes=OVERLAY_CACHE_MAX_BYTES)
+metrics.register_collector("overlay_cache", overlay_cache.stats)
+
+
+def _mercator_y(lat):
+    lat = np.radians(np.clip(lat, -85.0, 85.0))
+    return np.log(np.tan(np.pi / 4 + lat / 2))
+
+
+def density_grid(crime_data, bbox, max_pixels=OVERLAY_MAX_PIXELS):
+    """Bin [lat, lon, weight] points into a blurred density grid over bbox.
+
+    Rows are spaced evenly in Web Mercator y so the image lines up with the map
+    tiles at any bbox size; row 0 is the northern edge.
+    """
+    points = np.asarray(crime_data, dtype=float).reshape(-1, 3)
+    min_lon, min_lat, max_lon, max_lat = bbox
+    top, bottom = _mercator_y(max_lat), _mercator_y(min_lat)
+    x_span = math.radians(max_lon - min_lon)
+    y_span = top - bottom
+
+    scale = max_pixels / max(x_span, y_span, 1e-12)
+    width = max(1, int(round(x_span * scale)))
+    height = max(1, int(round(y_span * scale)))
+
+    cols = ((np.radians(points[:, 1] - min_lon)) / max(x_span, 1e-12) * width).astype(np.int64)
+    rows = ((top - _mercator_y(points[:, 0])) / max(y_span, 1e-12) * height).astype(np.int64)
+    inside = (cols >= 0) & (cols < width) & (rows >= 0) & (rows < height)
+    grid = np.bincount(rows[inside] * width + cols[inside], weights=points[inside, 2],
+                       minlength=width * height).reshape(height, width)
+    return _blur(grid, OVERLAY_BLUR_PIXELS)
+
+
+def _blur(grid, sigma):
+    """Separable gaussian blur (two 1-D convolutions)."""
+    radius = max(1, int(math.ceil(3 * sigma)))
+    kernel = np.exp(-0.5 * (np.arange(-radius, radius + 1) / sigma) ** 2)
+    kernel /= kernel.sum()
+    for axis in (0, 1):
+        pad = [(0, 0), (0, 0)]
+        pad[axis] = (radius, radius)
+        padded = np.pad(grid, pad)
+        size = grid.shape[axis]
+        grid = sum(weight * np.take(padded, np.arange(i, i + size), axis=axis) for i, weight in enumerate(kernel))
+    return grid
+
+
+def colorize(grid):
+    """Map a density grid onto the heatmap gradient as an RGBA uint8 image."""
+    peak = np.percentile(grid[grid > 0], 99) if np.any(grid > 0) else 1.0
+    intensity = np.clip(grid / peak, 0.0, 1.0)
+    stops = OVERLAY_GRADIENT[:, 0]
+    rgba = np.empty(grid.shape + (4,), dtype=np.uint8)
+    for channel in range(3):
+        rgba[..., channel] = np.interp(intensity, stops, OVERLAY_GRADIENT[:, channel + 1])
+    # Fade out low densities instead of tinting the whole map blue
+    rgba[..., 3] = np.clip(intensity * 2, 0.0, 1.0) * 255
+    return rgba
+
+
+def encode_png(rgba, level=OVERLAY_PNG_LEVEL):
+    """Encode an (h, w, 4) uint8 array as PNG bytes."""
+    height, width, _ = rgba.shape
+    # Each scanline is prefixed with filter type 0 (none)
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    raw[:, 1:] = rgba.reshape(height, width * 4)
+
+    def chunk(tag, data):
+        return struct.pack("!I", len(data)) + tag + data + struct.pack("!I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        chunk(b"IHDR", struct.pack("!2I5B", width, height, 8, 6, 0, 0, 0)),
+        chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+        chunk(b"IEND", b""),
+    ])
+
+
+def density_overlay(crime_data, bbox):
+    """Return (PNG data URL, [[south, west], [north, east]]) of the crime density over bbox.
+
+    The image size is bounded by OVERLAY_MAX_PIXELS, so the map payload stays
+    roughly constant however many incidents there are.
+    """
+    points = np.ascontiguousarray(crime_data, dtype=float).reshape(-1, 3)
+    if bbox is None:
+        bbox = [points[:, 1].min(), points[:, 0].min(), points[:, 1].max(), points[:, 0].max()]
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox)
+
+    key = (round(min_lon, 5), round(min_lat, 5), round(max_lon, 5), round(max_lat, 5),
+           len(points), zlib.crc32(points.tobytes()))
+    cached = overlay_cache.get(key)
+    metrics.increment("cache_lookups", cache="overlay", result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+
+    png = encode_png(colorize(density_grid(points, (min_lon, min_lat, max_lon, max_lat))))
+    url = "data:image/png;base64," + base64.b64encode(png).decode("ascii")
+    overlay = (url, [[min_lat, min_lon], [max_lat, max_lon]])
+    overlay_cache.put(key, overlay)
+    return overlay
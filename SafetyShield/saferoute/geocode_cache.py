@@ -0,0 +1,137 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Where on-disk caches live (override with SAFE_ROUTE_CACHE_DIR)
+CACHE_DIR = os.environ.get(
+    "SAFE_ROUTE_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+)
+
+GEOCODE_TTL = 30 * 24 * 3600     # seconds a geocode result stays valid
+GEOCODE_MAX_ENTRIES = 100000     # rows kept in the SQLite store
+GEOCODE_MEMORY_ENTRIES = 2048    # entries kept in the in-process LRU
+
+
+def normalize_place(place):
+    """Canonical cache key for a free-text place ("  times square ,New York" -> "times square, new york")."""
+    place = " ".join(place.casefold().split())
+    place = re.sub(r"\s*,\s*", ", ", place)
+    return place.strip(" ,.")
+
+
+class GeocodeCache:
+    """Two-tier geocode cache: an in-process LRU in front of a SQLite store.
+
+    Both tiers honour the same TTL. The SQLite tier is capped at max_entries rows
+    and evicts least recently used rows first.
+    """
+
+    def __init__(self, path=None, ttl=GEOCODE_TTL, max_entries=GEOCODE_MAX_ENTRIES,
+                 memory_entries=GEOCODE_MEMORY_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, "geocode.sqlite3")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " place TEXT PRIMARY KEY,"
+                " lon REAL NOT NULL,"
+                " lat REAL NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS geocode_last_used ON geocode(last_used)")
+            self._db.commit()
+        return self._db
+
+    def _remember(self, key, coords, created):
+        self._memory[key] = (coords, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, place):
+        """Return cached [lon, lat] for place, or None on a miss."""
+        key = normalize_place(place)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                coords, created = entry
+                if now - created < self.ttl:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return list(coords)
+                del self._memory[key]
+
+            db = self._connect()
+            row = db.execute("SELECT lon, lat, created FROM geocode WHERE place = ?", (key,)).fetchone()
+            if row is not None:
+                lon, lat, created = row
+                if now - created < self.ttl:
+                    db.execute("UPDATE geocode SET last_used = ? WHERE place = ?", (now, key))
+                    db.commit()
+                    self._remember(key, (lon, lat), created)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return [lon, lat]
+                db.execute("DELETE FROM geocode WHERE place = ?", (key,))
+                db.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, place, coords):
+        key = normalize_place(place)
+        lon, lat = coords[0], coords[1]
+        now = time.time()
+        with self._lock:
+            self._remember(key, (lon, lat), now)
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO geocode (place, lon, lat, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, lon, lat, now, now)
+            )
+            # Enforce the size cap by dropping the least recently used rows
+            (count,) = db.execute("SELECT COUNT(*) FROM geocode").fetchone()
+            if count > self.max_entries:
+                db.execute(
+                    "DELETE FROM geocode WHERE place IN "
+                    "(SELECT place FROM geocode ORDER BY last_used LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            db.execute("DELETE FROM geocode")
+            db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
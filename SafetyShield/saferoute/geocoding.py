@@ -0,0 +1,44 @@
+import logging
+
+from .geocode_cache import GeocodeCache
+from .metrics import metrics
+from .ors import ORS_BASE_URL, SEGMENT_TIMEOUT, ors_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Shared geocode cache (in-process LRU backed by SQLite on disk)
+geocode_cache = GeocodeCache()
+metrics.register_collector("geocode_cache", geocode_cache.stats)
+
+# Helper function to get coordinates from location names
+def geocode_location(location_name, api_key):
+    # Repeat lookups skip the network entirely
+    cached = geocode_cache.get(location_name)
+    metrics.increment("cache_lookups", cache="geocode", result="hit" if cached else "miss")
+    if cached:
+        return cached
+    
+    base_url = ORS_BASE_URL + "/geocode/search"
+    headers = {
+        'Accept': 'application/json, application/geo+json, application/gpx+xml',
+        'Authorization': api_key
+    }
+    params = {
+        'text': location_name,
+        'size': 1
+    }
+    
+    try:
+        metrics.increment("ors_requests", endpoint="geocode")
+        with metrics.span("geocode"):
+            response = ors_scheduler.request("GET", base_url, headers=headers, params=params, timeout=SEGMENT_TIMEOUT)
+        data = response.json()
+        if 'features' in data and len(data['features']) > 0:
+            coordinates = data['features'][0]['geometry']['coordinates']
+            geocode_cache.put(location_name, coordinates)
+            return coordinates  # [longitude, latitude]
+        else:
+            return None
+    except Exception as e:
+        logger.error(f"Error geocoding location: {e}")
+        return None
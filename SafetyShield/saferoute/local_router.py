@@ -0,0 +1,267 @@
+import heapq
+import math
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from . import polyline_codec
+from .crime import crime_raster
+from .crime_raster import resolve_time_period
+from .road_graph import MAX_SNAP_DISTANCE_M, RoadGraph
+
+# Directory of a graph built with `python -m saferoute.road_graph extract.osm DIR`
+ROAD_GRAPH_PATH = os.environ.get("SAFE_ROUTE_GRAPH")
+
+# Edge cost is travel time * (1 + weight * corridor crime density), density capped at 1
+CRIME_COST_WEIGHT = 2.0             # default blend for a single route
+HIGH_CRIME_AVOID_WEIGHT = 8.0       # used when the user asks to avoid high crime areas
+ALTERNATIVE_CRIME_WEIGHTS = (0.0, CRIME_COST_WEIGHT, HIGH_CRIME_AVOID_WEIGHT)  # fastest, balanced, safest
+MAX_CACHED_COSTS = 6                # (profile, avoid, period, weight) cost vectors kept in memory
+
+# ORS instruction types used in generated steps
+STEP_LEFT, STEP_RIGHT, STEP_SLIGHT_LEFT, STEP_SLIGHT_RIGHT, STEP_STRAIGHT = 0, 1, 4, 5, 6
+STEP_ARRIVE, STEP_DEPART = 10, 11
+
+
+class LocalRouter:
+    """Crime-weighted A* routing over a local RoadGraph, answering in ORS response shape.
+
+    Every edge costs its travel time scaled up by the crime density of the raster
+    corridor cell at its midpoint (the same CORRIDOR_LAYER route scoring reads), so
+    the search itself steers around dangerous streets. Alternatives are the best
+    paths under increasing crime weights rather than ORS's near-duplicate variants.
+    """
+
+    def __init__(self, graph, raster=crime_raster):
+        self.graph = graph
+        self.raster = raster
+
+        self._costs = OrderedDict()
+        self._lock = threading.Lock()
+        self._adjacency = None
+
+    def _lists(self):
+        # Python lists index several times faster than numpy arrays inside the search loop
+        if self._adjacency is None:
+            g = self.graph
+            self._adjacency = (np.asarray(g.indptr).tolist(), np.asarray(g.targets).tolist(),
+                               np.radians(g.nodes[:, 0]).tolist(), np.radians(g.nodes[:, 1]).tolist())
+        return self._adjacency
+
+    def edge_density(self, period):
+        """Crime density at every edge midpoint for a time period, capped at 1."""
+        return self._cached_cost(("density", period), lambda: np.minimum(
+            self.raster.corridor_density(self.graph.edge_midpoints(), period), 1.0))
+
+    def edge_costs(self, profile, avoid, period, crime_weight):
+        """Search cost of every edge (inf where the profile may not go) as a Python list."""
+        key = ("cost", profile, tuple(sorted(avoid)), period, crime_weight)
+
+        def compute():
+            times = self.graph.travel_times(profile, avoid)
+            if crime_weight:
+                times = times * (1 + crime_weight * self.edge_density(period))
+            return times.tolist()
+
+        return self._cached_cost(key, compute)
+
+    def _cached_cost(self, key, compute):
+        with self._lock:
+            cached = self._costs.get(key)
+            if cached is not None:
+                self._costs.move_to_end(key)
+                return cached
+        value = compute()
+        with self._lock:
+            self._costs[key] = value
+            while len(self._costs) > MAX_CACHED_COSTS:
+                self._costs.popitem(last=False)
+        return value
+
+    def shortest_path(self, source, target, costs, max_speed):
+        """A* from source to target; returns the list of edge indices, or None if unreachable.
+
+        The heuristic is great-circle distance at the profile's top speed, which never
+        overestimates since crime weighting only ever makes edges more expensive.
+        """
+        indptr, targets, lat, lon = self._lists()
+        target_lat, target_lon = lat[target], lon[target]
+        cos_target = math.cos(target_lat)
+        scale = 2 * 6371000.0 / max_speed
+
+        def estimate(node):
+            a = (math.sin((target_lat - lat[node]) / 2) ** 2 +
+                 math.cos(lat[node]) * cos_target * math.sin((target_lon - lon[node]) / 2) ** 2)
+            return scale * math.asin(math.sqrt(min(1.0, a)))
+
+        best = {source: 0.0}
+        via = {}
+        heap = [(estimate(source), 0.0, source)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == target:
+                break
+            if cost > best[node]:
+                continue
+            for edge in range(indptr[node], indptr[node + 1]):
+                next_cost = cost + costs[edge]
+                neighbour = targets[edge]
+                if next_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = next_cost
+                    via[neighbour] = edge
+                    heapq.heappush(heap, (next_cost + estimate(neighbour), next_cost, neighbour))
+        else:
+            return None
+
+        edges = []
+        node = target
+        while node != source:
+            edge = via[node]
+            edges.append(edge)
+            node = int(self.graph.sources()[edge])
+        edges.reverse()
+        return edges
+
+    def route(self, start_coords, end_coords, profile, avoid=None, alternatives=False, time_of_day=None):
+        """Route between [lon, lat] points. Returns (ORS-style route_json, error_message)."""
+        avoid = list(avoid or [])
+        road_avoid = tuple(a for a in avoid if a != "high_crime_areas")
+        period = resolve_time_period(time_of_day or "Current Time")
+        graph = self.graph
+
+        try:
+            times = graph.travel_times(profile, road_avoid)
+        except ValueError as e:
+            return None, str(e)
+
+        snapped = []
+        for (lon, lat), incoming in ((start_coords, False), (end_coords, True)):
+            node, distance = graph.snap(lon, lat, profile, road_avoid, incoming=incoming)
+            if node is None or distance > MAX_SNAP_DISTANCE_M:
+                return None, f"No road within {MAX_SNAP_DISTANCE_M} m of {lat:.5f}, {lon:.5f} in the local road graph"
+            snapped.append(node)
+        source, target = snapped
+
+        if alternatives:
+            weights = ALTERNATIVE_CRIME_WEIGHTS
+        elif "high_crime_areas" in avoid:
+            weights = (HIGH_CRIME_AVOID_WEIGHT,)
+        else:
+            weights = (CRIME_COST_WEIGHT,)
+
+        routes = []
+        seen = set()
+        for weight in weights:
+            edges = self.shortest_path(source, target, self.edge_costs(profile, road_avoid, period, weight),
+                                       graph.max_speed(profile))
+            if edges is None:
+                return None, "No route found in the local road graph between these points"
+            if tuple(edges) in seen:
+                continue
+            seen.add(tuple(edges))
+            routes.append(self._route_json(source, edges, times))
+
+        lats = [lat for route in routes for lat in route["bbox"][1::2]]
+        lons = [lon for route in routes for lon in route["bbox"][0::2]]
+        return {
+            "bbox": [min(lons), min(lats), max(lons), max(lats)],
+            "routes": routes,
+            "metadata": {"service": "routing", "engine": "local", "profile": profile},
+        }, None
+
+    def _route_json(self, source, edges, times):
+        graph = self.graph
+        path = [source] + [int(graph.targets[edge]) for edge in edges]
+        coords = np.asarray(graph.nodes[path], dtype=float)
+        edge_lengths = np.asarray(graph.lengths[edges], dtype=float)
+        edge_times = np.asarray(times[edges], dtype=float)
+        distance = float(edge_lengths.sum())
+        duration = float(edge_times.sum())
+
+        return {
+            "summary": {"distance": distance, "duration": duration},
+            "segments": [{"distance": distance, "duration": duration,
+                          "steps": self._steps(coords, edges, edge_lengths, edge_times)}],
+            "bbox": [float(coords[:, 1].min()), float(coords[:, 0].min()),
+                     float(coords[:, 1].max()), float(coords[:, 0].max())],
+            "geometry": polyline_codec.encode(coords),
+            "way_points": [0, len(path) - 1],
+        }
+
+    def _steps(self, coords, edges, edge_lengths, edge_times):
+        """One step per run of edges on the same street, with a turn instruction at each change."""
+        names = self.graph.names
+        name_ids = np.asarray(self.graph.name_ids[edges])
+        starts = [0] + [i for i in range(1, len(edges)) if name_ids[i] != name_ids[i - 1]] if len(edges) else []
+
+        bearings = np.degrees(np.arctan2(
+            (coords[1:, 1] - coords[:-1, 1]) * np.cos(np.radians(coords[:-1, 0])),
+            coords[1:, 0] - coords[:-1, 0],
+        ))
+
+        steps = []
+        for i, start in enumerate(starts):
+            end = starts[i + 1] if i + 1 < len(starts) else len(edges)
+            name = names[name_ids[start]] or "unnamed road"
+            if i == 0:
+                step_type = STEP_DEPART
+                instruction = f"Head {_compass(bearings[start])} on {name}"
+            else:
+                step_type, turn = _turn(bearings[start] - bearings[start - 1])
+                instruction = f"{turn} onto {name}"
+            steps.append({
+                "distance": float(edge_lengths[start:end].sum()),
+                "duration": float(edge_times[start:end].sum()),
+                "type": step_type,
+                "instruction": instruction,
+                "name": name,
+                "way_points": [start, end],
+            })
+
+        steps.append({"distance": 0.0, "duration": 0.0, "type": STEP_ARRIVE, "instruction": "Arrive at your destination",
+                      "name": "-", "way_points": [len(edges), len(edges)]})
+        return steps
+
+
+def _compass(bearing):
+    return ["north", "northeast", "east", "southeast", "south", "southwest", "west", "northwest"][
+        int(((bearing % 360) + 22.5) // 45) % 8]
+
+
+def _turn(delta):
+    delta = (delta + 180) % 360 - 180
+    if delta < -60:
+        return STEP_LEFT, "Turn left"
+    if delta < -20:
+        return STEP_SLIGHT_LEFT, "Turn slight left"
+    if delta > 60:
+        return STEP_RIGHT, "Turn right"
+    if delta > 20:
+        return STEP_SLIGHT_RIGHT, "Turn slight right"
+    return STEP_STRAIGHT, "Continue straight"
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def local_router():
+    """Process-wide LocalRouter over the graph at SAFE_ROUTE_GRAPH, loaded on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            if not ROAD_GRAPH_PATH:
+                raise RuntimeError("SAFE_ROUTE_GRAPH must point to a road graph directory for the local routing engine")
+            _router = LocalRouter(RoadGraph.load(ROAD_GRAPH_PATH))
+        return _router
+
+
+# Function to request a route from the local engine, with the same (route_json, error) contract as request_route
+def request_local_route(start_coords, end_coords, profile, avoid=None, alternatives=False, time_of_day=None):
+    try:
+        router = local_router()
+    except (OSError, RuntimeError) as e:
+        return None, f"Local routing engine unavailable: {e}"
+    return router.route(start_coords, end_coords, profile, avoid, alternatives, time_of_day)
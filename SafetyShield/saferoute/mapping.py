@@ -0,0 +1,139 @@
+import numpy as np
+
+from .density_overlay import OVERLAY_OPACITY, density_overlay
+from .metrics import metrics
+from .route_simplify import display_tolerance, fit_zoom, simplify
+
+# Function to display the map with multiple routes
+def display_map_with_routes(routes, crime_data, bbox, crimemap_enabled):
+    with metrics.trace("display_map_with_routes"):
+        return _build_map(routes, crime_data, bbox, crimemap_enabled)
+
+def _build_map(routes, crime_data, bbox, crimemap_enabled):
+    if not routes:
+        return None, 0, 0, 0
+    
+    # Get the main route (first in the sorted list)
+    main_route = routes[0]
+    route_coords = [[lat, lng] for lat, lng in main_route['decoded_route']]
+    
+    # Calculate map center based on all routes
+    all_points = np.concatenate([np.asarray(route['decoded_route'], dtype=float).reshape(-1, 2) for route in routes])
+    center_lat, center_lng = all_points.mean(axis=0)
+    
+    # Open the map at the zoom that fits every route, and only draw the detail visible
+    # up to a couple of zoom levels past it
+    (min_lat, min_lon), (max_lat, max_lon) = all_points.min(axis=0), all_points.max(axis=0)
+    route_bbox = [min_lon, min_lat, max_lon, max_lat]
+    zoom = fit_zoom(route_bbox)
+    tolerance = display_tolerance(zoom, center_lat)
+    
+    # Imported lazily so the routing core stays cheap to import for workers and tests
+    import folium
+    
+    # Create a map
+    m = folium.Map(location=[center_lat, center_lng], zoom_start=zoom)
+    
+    # Add crime heatmap if enabled, pre-rendered server side as a single image so the
+    # page size doesn't grow with the number of incidents
+    if crimemap_enabled and len(crime_data):
+        with metrics.span("overlay"):
+            image_url, image_bounds = density_overlay(crime_data, bbox)
+        folium.raster_layers.ImageOverlay(
+            image_url,
+            image_bounds,
+            opacity=OVERLAY_OPACITY,
+            pixelated=False,
+            name="Crime density",
+        ).add_to(m)
+    
+    # Route colors based on safety score
+    def get_route_color(safety_score):
+        if safety_score >= 80:
+            return 'green'
+        elif safety_score >= 60:
+            return 'orange'
+        else:
+            return 'red'
+    
+    # Add all routes to the map
+    for i, route in enumerate(routes):
+        route_coords = simplify(route['decoded_route'], tolerance, route.get('vertex_importance')).tolist()
+        
+        # Main route is thicker, alternates are thinner
+        weight = 6 if i == 0 else 4
+        
+        # Get color based on safety score
+        color = get_route_color(route['safety_score'])
+        
+        # Add route line with popup showing safety info
+        route_line = folium.PolyLine(
+            route_coords,
+            weight=weight,
+            color=color,
+            opacity=0.8 if i == 0 else 0.6,
+            tooltip=f"Route {i+1}: {route['safety_score']:.0f}% safe, {route['summary']['duration']/60:.0f} min"
+        )
+        
+        route_line.add_to(m)
+        
+        # For the main route, add route number markers along the path
+        if i == 0:
+            # Add markers at the beginning, middle and a few key points
+            markers_count = min(len(route_coords), 5)
+            if markers_count > 0:
+                indices = [0]  # Start
+                
+                if markers_count > 1:
+                    indices.append(len(route_coords) - 1)  # End
+                    
+                # Add some points in between if there are more than 2 markers
+                if markers_count > 2:
+                    step = len(route_coords) // (markers_count - 1)
+                    indices.extend([j * step for j in range(1, markers_count - 1)])
+                    indices = sorted(list(set(indices)))
+                
+                for idx in indices[1:-1]:  # Skip start and end
+                    folium.CircleMarker(
+                        location=route_coords[idx],
+                        radius=6,
+                        color=color,
+                        fill=True,
+                        fill_color=color,
+                        fill_opacity=0.7,
+                        tooltip=f"Route {i+1}"
+                    ).add_to(m)
+    
+    # Add markers for start and end
+    folium.Marker(
+        location=route_coords[0],
+        popup="Start",
+        icon=folium.Icon(color="green", icon="play")
+    ).add_to(m)
+    
+    folium.Marker(
+        location=route_coords[-1],
+        popup="End",
+        icon=folium.Icon(color="red", icon="stop")
+    ).add_to(m)
+    
+    # Display route statistics from main route
+    distance = main_route['summary']['distance'] / 1000  # convert to km
+    duration = main_route['summary']['duration'] / 60  # convert to minutes
+    safety_score = main_route['safety_score']
+    
+    # Add a legend for safety scores
+    legend_html = '''
+    <div style="position: fixed; 
+                bottom: 50px; left: 50px; width: 170px; height: 130px; 
+                border:2px solid grey; z-index:9999; font-size:14px;
+                background-color:white; padding: 10px; border-radius: 5px;">
+      <p><b>Route Safety</b></p>
+      <p><i class="fa fa-circle" style="color:green"></i> High Safety (80-100%)</p>
+      <p><i class="fa fa-circle" style="color:orange"></i> Medium Safety (60-80%)</p>
+      <p><i class="fa fa-circle" style="color:red"></i> Lower Safety (<60%)</p>
+    </div>
+    '''
+    m.get_root().html.add_child(folium.Element(legend_html))
+    
+    return m, distance, duration, safety_score, routes
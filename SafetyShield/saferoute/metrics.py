@@ -0,0 +1,192 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket bounds for stage timings, in seconds
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# One JSON line per finished trace on this logger (set SAFE_ROUTE_METRICS_LOG=0 to silence)
+METRICS_LOG_ENABLED = os.environ.get("SAFE_ROUTE_METRICS_LOG", "1") != "0"
+
+logger = logging.getLogger(__name__)
+if not logger.handlers:
+    # Kept out of the "saferoute" handlers, which surface messages in the UI
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+_current_trace = contextvars.ContextVar("saferoute_trace", default=None)
+
+
+class Metrics:
+    """Process-wide stage timings, labelled counters and pluggable stats collectors.
+
+    span() times a stage into a histogram; increment() bumps a counter. Both also
+    accumulate into the active trace, if any, which logs one JSON line when the
+    outermost trace() exits. Collectors are callables returning a flat dict of
+    numbers (cache and scheduler stats) read only when metrics are exported, so
+    the hot path costs two clock reads and a short locked update per span.
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}       # stage -> [bucket counts..., +Inf count, sum]
+        self._counters = {}     # (name, sorted label items) -> value
+        self._collectors = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+            trace = _current_trace.get()
+            if trace is not None:
+                trace["stages"][stage] = trace["stages"].get(stage, 0.0) + seconds * 1000
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def increment(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            trace = _current_trace.get()
+            if trace is not None:
+                trace_key = ".".join([name] + [str(v) for _, v in key[1]])
+                trace["counts"][trace_key] = trace["counts"].get(trace_key, 0) + value
+
+    @contextmanager
+    def trace(self, name, **fields):
+        """Time a whole request. Nested traces only add a span to the outer one."""
+        if _current_trace.get() is not None:
+            with self.span(name):
+                yield
+            return
+
+        trace = {"event": name, **fields, "stages": {}, "counts": {}}
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+            _current_trace.reset(token)
+            if METRICS_LOG_ENABLED:
+                trace["duration_ms"] = round(trace["stages"].pop(name), 3)
+                trace["stages"] = {stage: round(ms, 3) for stage, ms in trace["stages"].items()}
+                trace["ts"] = round(time.time(), 3)
+                logger.info(json.dumps(trace, default=str))
+
+    def register_collector(self, name, collect):
+        self._collectors[name] = collect
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict."""
+        with self._lock:
+            stages = {
+                stage: {"count": sum(h[:-1]), "sum_s": h[-1],
+                        "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], h[:-1]))}
+                for stage, h in self._stages.items()
+            }
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self._counters.items()]
+        collected = {}
+        for name, collect in list(self._collectors.items()):
+            try:
+                collected[name] = collect()
+            except Exception as e:  # a broken collector must not break the exporter
+                collected[name] = {"error": str(e)}
+        return {"stages": stages, "counters": counters, "collectors": collected}
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP saferoute_stage_seconds Time spent in each request stage.",
+            "# TYPE saferoute_stage_seconds histogram",
+        ]
+        for stage, histogram in sorted(snapshot["stages"].items()):
+            cumulative = 0
+            for bound, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f'saferoute_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'saferoute_stage_seconds_sum{{stage="{stage}"}} {histogram["sum_s"]:.6f}')
+            lines.append(f'saferoute_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+
+        seen = set()
+        for counter in sorted(snapshot["counters"], key=lambda c: (c["name"], sorted(c["labels"].items()))):
+            metric = f"saferoute_{counter['name']}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            labels = ",".join(f'{k}="{v}"' for k, v in sorted(counter["labels"].items()))
+            lines.append(f"{metric}{{{labels}}} {counter['value']}" if labels else f"{metric} {counter['value']}")
+
+        for name, values in sorted(snapshot["collectors"].items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"saferoute_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve /metrics (Prometheus text) and /metrics.json from a background thread.
+
+        Idempotent: repeated calls (e.g. Streamlit reruns) return the running server.
+        """
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            metrics = self
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self):
+                    if self.path.split("?")[0] == "/metrics":
+                        body, content_type = metrics.render_prometheus(), "text/plain; version=0.0.4"
+                    elif self.path.split("?")[0] == "/metrics.json":
+                        body, content_type = json.dumps(metrics.snapshot(), default=str), "application/json"
+                    else:
+                        self.send_error(404)
+                        return
+                    data = body.encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+
+                def log_message(self, *args):
+                    pass
+
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="saferoute-metrics", daemon=True).start()
+            return self._server
+
+
+# Shared by every module in the package
+metrics = Metrics()
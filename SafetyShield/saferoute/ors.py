@@ -0,0 +1,32 @@
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import metrics
+from .ors_scheduler import RequestScheduler
+
+# OpenRouteService endpoint (override with ORS_BASE_URL, e.g. for a self-hosted instance or a local stub)
+ORS_BASE_URL = os.environ.get("ORS_BASE_URL", "https://api.openrouteservice.org").rstrip("/")
+
+# Request quota of the API key (the free plan allows 40 directions requests a minute; 0 = unlimited)
+ORS_REQUESTS_PER_MINUTE = float(os.environ.get("ORS_REQUESTS_PER_MINUTE", 40))
+ORS_MAX_RETRIES = 4  # retries after a 429, 5xx or connection error
+
+# Longest request ORS accepts, as the straight-line distance through its coordinates in km
+# (public API defaults; lowered at runtime when ORS reports a smaller limit)
+ORS_MAX_ROUTE_KM = {"driving-car": 6000, "cycling-regular": 300, "foot-walking": 300}
+ORS_MAX_ALTERNATIVES_KM = 100  # alternative_routes is refused beyond this
+
+# Concurrency and timeout settings for segmented (long-distance) routing
+MAX_SEGMENT_WORKERS = 8
+SEGMENT_TIMEOUT = 30  # seconds per ORS request
+
+# One keep-alive connection pool shared by every ORS call
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_SEGMENT_WORKERS))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=MAX_SEGMENT_WORKERS))
+
+# Every ORS request goes through this queue: quota, priorities, retries and coalescing
+ors_scheduler = RequestScheduler(http_session, ORS_REQUESTS_PER_MINUTE, MAX_SEGMENT_WORKERS, ORS_MAX_RETRIES)
+metrics.register_collector("ors_scheduler", ors_scheduler.stats)
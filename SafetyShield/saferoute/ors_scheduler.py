@@ -0,0 +1,277 @@
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import requests
+
+# Lower numbers are dispatched first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Token bucket refilled at per_minute / 60 tokens a second, holding at most burst tokens."""
+
+    def __init__(self, per_minute, burst=None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst or max(1.0, float(per_minute))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait(self, now):
+        """Seconds until a token is available (0 if one is), without taking it."""
+        if not self.rate:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now):
+        """Take a token and return 0, or return the seconds until one is available."""
+        wait = self.wait(now)
+        if not wait and self.rate:
+            self.tokens -= 1
+        return wait
+
+
+class _Job:
+    __slots__ = ("key", "method", "url", "kwargs", "api_key", "priority", "attempts",
+                 "enqueued", "dispatched", "backing_off", "future")
+
+    def __init__(self, key, method, url, kwargs, api_key, priority):
+        self.key = key
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+        self.api_key = api_key
+        self.priority = priority
+        self.attempts = 0
+        self.enqueued = time.monotonic()
+        self.dispatched = False
+        self.backing_off = False  # in _delayed rather than _ready
+        self.future = Future()
+
+
+class RequestScheduler:
+    """Process-wide queue in front of every OpenRouteService request.
+
+    - A token bucket per API key keeps the request rate within the key's quota.
+    - Waiting requests are dispatched in priority order, so interactive lookups
+      overtake queued batch work. Each API key has its own ready queue, so a key
+      that has run out of quota never holds up requests on another key.
+    - 429 and 5xx responses (and connection errors) are retried with exponential
+      backoff and full jitter, honouring Retry-After when the server sends it.
+    - Identical requests already queued or in flight share one HTTP call.
+    - An optional limiter (any object with acquire()) is called once before every
+      HTTP call, retries included, e.g. to share one quota across processes.
+
+    Callers block in request() until their response (or final error) is ready,
+    or for at most max_wait seconds.
+    """
+
+    def __init__(self, session, per_minute=40, workers=8, max_retries=4, backoff_base=0.5, backoff_cap=30.0,
+                 burst=None, max_wait=300.0, limiter=None):
+        self.session = session
+        self.per_minute = per_minute
+        self.burst = burst
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_wait = max_wait
+        self.limiter = limiter
+        self.default_priority = PRIORITY_INTERACTIVE
+
+        self._cond = threading.Condition()
+        self._ready = {}      # api_key -> heap of (priority, seq, job); stale entries skipped on pop
+        self._delayed = []    # (ready_at, seq, job) waiting out a backoff
+        self._jobs = {}       # key -> job, for coalescing identical requests
+        self._buckets = {}
+        self._seq = itertools.count()
+        self._threads = []
+
+        self._counters = dict.fromkeys(
+            ("requests", "coalesced", "dispatched", "retries", "throttled", "server_errors", "failures", "timeouts"),
+            0)
+        self._queue_wait = 0.0
+        self._max_queue_depth = 0
+
+    def request(self, method, url, priority=None, **kwargs):
+        """Send a request through the scheduler and return the requests.Response.
+
+        kwargs are passed to requests.Session.request. Raises the last exception
+        if every attempt failed without a response, and TimeoutError if there is
+        no answer within max_wait seconds.
+        """
+        priority = self.default_priority if priority is None else priority
+        api_key = (kwargs.get("headers") or {}).get("Authorization")
+        key = json.dumps([method, url, api_key, kwargs.get("params"), kwargs.get("json")],
+                         sort_keys=True, default=str)
+
+        with self._cond:
+            self._counters["requests"] += 1
+            job = self._jobs.get(key)
+            if job is not None:
+                self._counters["coalesced"] += 1
+                if priority < job.priority and not job.dispatched:
+                    job.priority = priority
+                    if not job.backing_off:
+                        # Re-queue at the better priority; the old heap entry is skipped later.
+                        # (A job backing off picks up its new priority when it becomes ready.)
+                        self._push_ready(priority, next(self._seq), job)
+                        self._cond.notify()
+            else:
+                job = _Job(key, method, url, kwargs, api_key, priority)
+                self._jobs[key] = job
+                self._push_ready(priority, next(self._seq), job)
+                self._max_queue_depth = max(self._max_queue_depth, self._queue_depth())
+                self._start_workers()
+                self._cond.notify()
+
+        try:
+            return job.future.result(timeout=self.max_wait)
+        except FutureTimeout:
+            pass
+        with self._cond:
+            self._counters["timeouts"] += 1
+            # Withdraw a job that never got sent, so it is not sent late and new callers start afresh
+            abandoned = not job.dispatched and self._jobs.get(key) is job
+            if abandoned:
+                del self._jobs[key]
+                job.dispatched = True
+        error = TimeoutError(f"no response from {url} within {self.max_wait:g}s")
+        if abandoned:
+            job.future.set_exception(error)  # also ends the wait of requests coalesced with this one
+        raise error
+
+    def set_rate(self, per_minute, burst=None):
+        """Change the per-key quota (0 = unlimited); buckets start again, full, at the new rate."""
+        with self._cond:
+            self.per_minute = per_minute
+            self.burst = burst
+            self._buckets.clear()
+            self._cond.notify_all()
+
+    def _start_workers(self):
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name="ors-scheduler", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _queue_depth(self):
+        return sum(1 for job in self._jobs.values() if not job.dispatched)
+
+    def _bucket(self, api_key):
+        bucket = self._buckets.get(api_key)
+        if bucket is None:
+            bucket = self._buckets[api_key] = TokenBucket(self.per_minute, self.burst)
+        return bucket
+
+    def _push_ready(self, priority, seq, job):
+        heapq.heappush(self._ready.setdefault(job.api_key, []), (priority, seq, job))
+
+    def _next_job(self):
+        """Block until the best waiting job that may be sent now is ready; called with the condition held."""
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, seq, job = heapq.heappop(self._delayed)
+                job.backing_off = False
+                self._push_ready(job.priority, seq, job)
+
+            # The best job of each key (dropping entries superseded by a priority upgrade),
+            # then the best of those whose key has a token to spend
+            timeout = self._delayed[0][0] - now if self._delayed else None
+            best = None
+            for api_key, ready in list(self._ready.items()):
+                while ready and (ready[0][2].dispatched or ready[0][0] != ready[0][2].priority):
+                    heapq.heappop(ready)
+                if not ready:
+                    del self._ready[api_key]
+                    continue
+                wait = self._bucket(api_key).wait(now)
+                if wait:
+                    timeout = wait if timeout is None else min(timeout, wait)
+                elif best is None or ready[0] < best:
+                    best = ready[0]
+            if best is not None:
+                job = best[2]
+                self._bucket(job.api_key).take(now)
+                heapq.heappop(self._ready[job.api_key])
+                job.dispatched = True
+                return job
+            self._cond.wait(timeout)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                self._counters["dispatched"] += 1
+                if not job.attempts:
+                    self._queue_wait += time.monotonic() - job.enqueued
+
+            response, error = None, None
+            try:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                response = self.session.request(job.method, job.url, **job.kwargs)
+            except Exception as e:  # handed to the caller; never let it kill the worker
+                error = e
+
+            status = response.status_code if response is not None else None
+            with self._cond:
+                if status == 429:
+                    self._counters["throttled"] += 1
+                elif status is not None and status >= 500:
+                    self._counters["server_errors"] += 1
+
+                retryable = isinstance(error, requests.RequestException) or status in RETRY_STATUSES
+                if retryable and job.attempts < self.max_retries:
+                    delay = self._backoff(job.attempts, response)
+                    job.attempts += 1
+                    job.dispatched = False
+                    job.backing_off = True
+                    self._counters["retries"] += 1
+                    heapq.heappush(self._delayed, (time.monotonic() + delay, next(self._seq), job))
+                    self._cond.notify()
+                    continue
+
+                del self._jobs[job.key]
+                if error is not None:
+                    self._counters["failures"] += 1
+
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(response)
+
+    def _backoff(self, attempt, response):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def stats(self):
+        with self._cond:
+            pending = [job for job in self._jobs.values() if not job.dispatched]
+            dispatched = self._counters["dispatched"] - self._counters["retries"]
+            return {
+                **self._counters,
+                "queue_depth": len(pending),
+                "queue_depth_interactive": sum(1 for job in pending if job.priority <= PRIORITY_INTERACTIVE),
+                "queue_depth_batch": sum(1 for job in pending if job.priority > PRIORITY_INTERACTIVE),
+                "backing_off": len({id(job) for _, _, job in self._delayed}),
+                "in_flight": len(self._jobs) - len(pending),
+                "max_queue_depth": self._max_queue_depth,
+                "mean_queue_wait_s": self._queue_wait / dispatched if dispatched else 0.0,
+            }
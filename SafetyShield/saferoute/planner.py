@@ -0,0 +1,129 @@
+from . import polyline_codec
+from .crime import crime_raster, get_crime_data
+from .crime_raster import resolve_time_period
+from .metrics import metrics
+from .result_cache import ResultCache
+from .route_simplify import SCORING_TOLERANCE_M, simplify, vertex_importance
+from .routing import get_route
+
+# Scored route options shared across sessions (everything but the ranking is cached)
+result_cache = ResultCache()
+metrics.register_collector("result_cache", result_cache.stats)
+
+# Function to find multiple route options and rate their safety
+def find_safe_routes(start_coords, end_coords, profile, api_key, time_of_day, safety_weight, avoid):
+    with metrics.trace("find_safe_routes", profile=profile):
+        route_data, routes, crime_data, bbox = score_route_options(start_coords, end_coords, profile, api_key, time_of_day, avoid)
+        
+        if not route_data:
+            return None, None, None, None
+        
+        with metrics.span("rank"):
+            routes = rank_routes(routes, safety_weight)
+    
+    # Return the main route data (for compatibility) along with all route options and crime data
+    return route_data, routes, crime_data, bbox
+
+# Function to get route options with safety scores, served from the result cache when possible.
+# The result does not depend on safety_weight, so re-ranking never repeats network or scoring work.
+def score_route_options(start_coords, end_coords, profile, api_key, time_of_day, avoid):
+    period = resolve_time_period(time_of_day)
+    cache_key = (
+        tuple(round(float(c), 6) for c in start_coords),
+        tuple(round(float(c), 6) for c in end_coords),
+        profile,
+        tuple(sorted(avoid or [])),
+        period,
+    )
+    cached = result_cache.get(cache_key)
+    metrics.increment("cache_lookups", cache="result", result="hit" if cached else "miss")
+    if cached:
+        return cached
+    
+    # Get route options (with alternatives if requested)
+    with metrics.span("route"):
+        route_data = get_route(start_coords, end_coords, profile, api_key, avoid, alternatives=True, time_of_day=period)
+    
+    if not route_data:
+        return None, None, None, None
+    
+    # Get bounding box of all routes for crime data
+    min_lon, min_lat, max_lon, max_lat = float('inf'), float('inf'), float('-inf'), float('-inf')
+    
+    routes = []
+    
+    # Extract geometries for all routes
+    if 'routes' in route_data:
+        with metrics.span("decode"):
+            for route in route_data['routes']:
+                route_geometry = route['geometry']
+                decoded_route = polyline_codec.decode(route_geometry)
+            
+                # Update bounding box
+                if len(decoded_route):
+                    min_lat = min(min_lat, decoded_route[:, 0].min())
+                    min_lon = min(min_lon, decoded_route[:, 1].min())
+                    max_lat = max(max_lat, decoded_route[:, 0].max())
+                    max_lon = max(max_lon, decoded_route[:, 1].max())
+            
+                routes.append({
+                    'geometry': route_geometry,
+                    'decoded_route': decoded_route,
+                    # Douglas-Peucker importance per vertex, shared by scoring and display simplification
+                    'vertex_importance': vertex_importance(decoded_route),
+                    'summary': route['summary'],
+                    'segments': route['segments']
+                })
+    
+    # Add padding to the bounding box
+    padding = 0.02  # About 2km padding
+    bbox = [
+        min_lon - padding,
+        min_lat - padding,
+        max_lon + padding,
+        max_lat + padding
+    ]
+    
+    # Get crime data for the area
+    with metrics.span("crime_data"):
+        crime_data, hotspots = get_crime_data(bbox, time_of_day)
+    
+    # Evaluate safety for each route by raster lookups along its vertices
+    # (near-collinear vertices are dropped first; they add lookups but no shape)
+    with metrics.span("scoring"):
+        for route in routes:
+            scoring_route = simplify(route['decoded_route'], SCORING_TOLERANCE_M, route['vertex_importance'])
+            route['safety_score'] = crime_raster.score_route(scoring_route, period)
+    
+    result = (route_data, routes, crime_data, bbox)
+    result_cache.put(cache_key, result)
+    return result
+
+# Function to order scored route options by the user's safety priority.
+# Works on copies so cached route options are never mutated.
+def rank_routes(routes, safety_weight):
+    routes = [dict(route) for route in routes]
+    
+    # Sort routes by safety score (if safety_weight is high) or by time (if low)
+    if safety_weight > 5:
+        routes.sort(key=lambda x: x['safety_score'], reverse=True)
+    elif safety_weight > 3:
+        # Balance between safety and time
+        for route in routes:
+            # Normalize time (lower is better)
+            time_factor = 1 - (route['summary']['duration'] / max(r['summary']['duration'] for r in routes))
+            # Normalize safety (higher is better)
+            safety_factor = route['safety_score'] / 100
+            
+            # Combined score (higher is better)
+            weight_safety = safety_weight / 10  # Convert to 0-1 scale
+            weight_time = 1 - weight_safety
+            
+            route['combined_score'] = (weight_safety * safety_factor) + (weight_time * time_factor)
+        
+        routes.sort(key=lambda x: x['combined_score'], reverse=True)
+    else:
+        # Sort primarily by time
+        routes.sort(key=lambda x: x['summary']['duration'])
+    
+    return routes
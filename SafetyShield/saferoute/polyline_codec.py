@@ -0,0 +1,61 @@
+import numpy as np
+
+# ORS returns geometries as Google encoded polylines with 5 decimal places
+POLYLINE_PRECISION = 5
+
+
+def decode_ints(encoded):
+    """Decode an encoded polyline into an (n, 2) int64 array of scaled [lat, lon] values.
+
+    Fully vectorized: bytes are grouped into varints with reduceat, zigzag-decoded
+    and prefix-summed, so the cost is linear in the string length.
+    """
+    data = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    ends = (data & 0x20) == 0
+    if not ends.any():
+        return np.empty((0, 2), dtype=np.int64)
+
+    # Drop any trailing bytes of an unterminated value
+    data = data[:np.flatnonzero(ends)[-1] + 1]
+    ends = ends[:len(data)]
+
+    group_starts = np.concatenate(([0], np.flatnonzero(ends)[:-1] + 1))
+    group_ids = np.concatenate(([0], np.cumsum(ends[:-1])))
+    shifts = 5 * (np.arange(len(data)) - group_starts[group_ids])
+    values = np.add.reduceat((data & 0x1f) << shifts, group_starts)
+
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    deltas = deltas[:len(deltas) // 2 * 2].reshape(-1, 2)
+    return np.cumsum(deltas, axis=0)
+
+
+def encode_ints(points):
+    """Encode an (n, 2) array of scaled integer [lat, lon] values as a polyline string."""
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+    if not len(points):
+        return ""
+
+    deltas = np.diff(points, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    # Number of 5-bit chunks each value needs (at least one)
+    chunk_counts = np.ones(len(values), dtype=np.int64)
+    for k in range(1, 13):
+        chunk_counts += values >= (1 << (5 * k))
+
+    value_ids = np.repeat(np.arange(len(values)), chunk_counts)
+    positions = np.arange(len(value_ids)) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+    chunks = (values[value_ids] >> (5 * positions)) & 0x1f
+    chunks |= np.where(positions < chunk_counts[value_ids] - 1, 0x20, 0)
+    return (chunks + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode(encoded, precision=POLYLINE_PRECISION):
+    """Decode an encoded polyline into an (n, 2) float array of [lat, lon]."""
+    return decode_ints(encoded) / 10 ** precision
+
+
+def encode(coords, precision=POLYLINE_PRECISION):
+    """Encode an (n, 2) array of [lat, lon] floats as a polyline string."""
+    scaled = np.round(np.asarray(coords, dtype=float).reshape(-1, 2) * 10 ** precision)
+    return encode_ints(scaled.astype(np.int64))
@@ -0,0 +1,86 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024   # approximate memory budget for cached results
+RESULT_CACHE_TTL = 3600                       # seconds before a result is recomputed
+
+
+def _approx_size(value):
+    """Rough recursive size of a scored-routes result (arrays, dicts, lists, strings)."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (list, tuple)) and value[0] and isinstance(value[0][0], float):
+            # Long lists of coordinate/crime rows: estimate from the first row
+            return sys.getsizeof(value) + len(value) * _approx_size(value[0])
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Process-wide LRU of scored route options, bounded by approximate memory use.
+
+    Shared by every Streamlit session in the process, so a rerun triggered by a
+    widget change (or another user asking for the same trip) reuses the scored
+    routes instead of geocoding, routing and scoring again.
+    """
+
+    def __init__(self, max_bytes=RESULT_CACHE_MAX_BYTES, ttl=RESULT_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, created = entry
+                if now - created < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.bytes -= size
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = _approx_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            self._entries[key] = (value, size, time.time())
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
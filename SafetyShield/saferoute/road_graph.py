@@ -0,0 +1,308 @@
+import argparse
+import json
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+MAX_SNAP_DISTANCE_M = 2000   # start/end further than this from any usable road are rejected
+
+# OSM highway classes kept in the graph; the index is stored per edge
+ROAD_CLASSES = [
+    "motorway", "motorway_link", "trunk", "trunk_link", "primary", "primary_link",
+    "secondary", "secondary_link", "tertiary", "tertiary_link", "unclassified", "residential",
+    "living_street", "service", "road", "track", "pedestrian", "footway", "path", "cycleway",
+    "steps", "ferry",
+]
+ROAD_CLASS_INDEX = {name: i for i, name in enumerate(ROAD_CLASSES)}
+MOTORWAY_CLASSES = ("motorway", "motorway_link", "trunk", "trunk_link")  # what ORS avoids as "highways"
+
+# Travel speed in km/h per road class and ORS profile (0 = not allowed)
+PROFILE_SPEEDS = {
+    "driving-car": {
+        "motorway": 100, "motorway_link": 60, "trunk": 80, "trunk_link": 50, "primary": 60,
+        "primary_link": 40, "secondary": 50, "secondary_link": 35, "tertiary": 40, "tertiary_link": 30,
+        "unclassified": 30, "residential": 25, "living_street": 10, "service": 15, "road": 25,
+        "track": 10, "ferry": 20,
+    },
+    "cycling-regular": {
+        "trunk": 16, "trunk_link": 16, "primary": 18, "primary_link": 18, "secondary": 18,
+        "secondary_link": 18, "tertiary": 18, "tertiary_link": 18, "unclassified": 16, "residential": 16,
+        "living_street": 12, "service": 14, "road": 16, "track": 12, "pedestrian": 6, "footway": 6,
+        "path": 12, "cycleway": 18, "steps": 2, "ferry": 20,
+    },
+    "foot-walking": {
+        "primary": 5, "primary_link": 5, "secondary": 5, "secondary_link": 5, "tertiary": 5,
+        "tertiary_link": 5, "unclassified": 5, "residential": 5, "living_street": 5, "service": 5,
+        "road": 5, "track": 5, "pedestrian": 5, "footway": 5, "path": 5, "cycleway": 5, "steps": 3,
+        "ferry": 20,
+    },
+}
+
+# Per-edge flag bits
+FLAG_TOLLWAY = 1
+FLAG_FERRY = 2
+FLAG_AGAINST_ONEWAY = 4   # reverse direction of a one-way road (walkable, not drivable or rideable)
+FLAG_NO_CAR = 8
+FLAG_NO_BICYCLE = 16
+FLAG_NO_FOOT = 32
+
+PROFILE_EXCLUDED_FLAGS = {
+    "driving-car": FLAG_AGAINST_ONEWAY | FLAG_NO_CAR,
+    "cycling-regular": FLAG_AGAINST_ONEWAY | FLAG_NO_BICYCLE,
+    "foot-walking": FLAG_NO_FOOT,
+}
+
+# Arrays stored in a graph directory, one memory-mapped .npy file each
+GRAPH_ARRAYS = ("nodes", "indptr", "targets", "lengths", "road_classes", "flags", "name_ids")
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters (works elementwise on arrays)."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class RoadGraph:
+    """Directed road graph in compressed sparse row form.
+
+    Edges leaving node i are indptr[i]:indptr[i + 1] of the per-edge arrays
+    (targets, lengths in meters, road class, flag bits and street name id).
+    Every OSM way is split at each of its nodes, so an edge is a straight segment
+    and a path's geometry is simply the coordinates of its nodes.
+    """
+
+    def __init__(self, nodes, indptr, targets, lengths, road_classes, flags, name_ids, names):
+        self.nodes = nodes            # (n, 2) [lat, lon]
+        self.indptr = indptr
+        self.targets = targets
+        self.lengths = lengths
+        self.road_classes = road_classes
+        self.flags = flags
+        self.name_ids = name_ids
+        self.names = names
+
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    @classmethod
+    def load(cls, path):
+        """Load a graph directory written by save(), memory-mapping the arrays."""
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in GRAPH_ARRAYS}
+        with open(os.path.join(path, "names.json"), encoding="utf-8") as f:
+            names = json.load(f)
+        return cls(names=names, **arrays)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in GRAPH_ARRAYS:
+            np.save(os.path.join(path, name + ".npy"), getattr(self, name))
+        with open(os.path.join(path, "names.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f)
+
+    def _cached(self, key, compute):
+        # Computed outside the lock: derived arrays build on each other
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+        value = compute()
+        with self._lock:
+            return self._derived.setdefault(key, value)
+
+    def sources(self):
+        """Source node of every edge."""
+        return self._cached("sources", lambda: np.repeat(np.arange(len(self.nodes)), np.diff(self.indptr)))
+
+    def edge_midpoints(self):
+        """[lat, lon] midpoint of every edge."""
+        return self._cached("midpoints", lambda: (self.nodes[self.sources()] + self.nodes[self.targets]) / 2)
+
+    def travel_times(self, profile, avoid=()):
+        """Seconds to traverse each edge with an ORS profile (inf where not allowed or avoided)."""
+        key = ("times", profile, tuple(sorted(avoid)))
+
+        def compute():
+            if profile not in PROFILE_SPEEDS:
+                raise ValueError(f"profile {profile!r} is not supported by the local routing engine")
+            speeds = np.array([PROFILE_SPEEDS[profile].get(name, 0) for name in ROAD_CLASSES], dtype=float)
+            if "highways" in avoid:
+                speeds[[ROAD_CLASS_INDEX[name] for name in MOTORWAY_CLASSES]] = 0
+
+            excluded = PROFILE_EXCLUDED_FLAGS[profile]
+            if "tollways" in avoid:
+                excluded |= FLAG_TOLLWAY
+            if "ferries" in avoid:
+                excluded |= FLAG_FERRY
+
+            edge_speed = speeds[self.road_classes] / 3.6  # m/s
+            allowed = (edge_speed > 0) & ((self.flags & excluded) == 0)
+            times = np.full(len(self.targets), np.inf)
+            times[allowed] = self.lengths[allowed] / edge_speed[allowed]
+            return times
+
+        return self._cached(key, compute)
+
+    def max_speed(self, profile):
+        """Fastest speed (m/s) any edge allows for profile, for admissible A* estimates."""
+        return max(PROFILE_SPEEDS[profile].values()) / 3.6
+
+    def snap(self, lon, lat, profile, avoid=(), incoming=False):
+        """Index of the nearest node with a usable outgoing edge, and its distance in meters.
+
+        With incoming=True the node needs a usable incoming edge instead, as a
+        destination does (the end of a one-way street can be reached but not left).
+        """
+        def compute():
+            ends = self.targets if incoming else self.sources()
+            return np.flatnonzero(np.bincount(ends[np.isfinite(self.travel_times(profile, avoid))],
+                                              minlength=len(self.nodes)) > 0)
+
+        usable = self._cached(("usable", profile, tuple(sorted(avoid)), incoming), compute)
+        if not len(usable):
+            return None, math.inf
+
+        # Equirectangular distance picks the candidate; haversine reports it
+        candidates = self.nodes[usable]
+        dx = (candidates[:, 1] - lon) * math.cos(math.radians(lat))
+        dy = candidates[:, 0] - lat
+        best = int(np.argmin(dx * dx + dy * dy))
+        node = int(usable[best])
+        return node, float(haversine_m(lat, lon, self.nodes[node, 0], self.nodes[node, 1]))
+
+    @classmethod
+    def from_osm(cls, osm_path):
+        """Build a graph from an OSM XML extract (.osm), keeping routable highways and ferries.
+
+        Convert .osm.pbf extracts first, e.g. `osmium cat city.osm.pbf -o city.osm`.
+        """
+        node_ids, node_lat, node_lon = [], [], []
+        way_refs, way_tags = [], []
+
+        tags, refs = {}, []
+        for _, element in ET.iterparse(osm_path, events=("end",)):
+            if element.tag == "tag":
+                tags[element.get("k")] = element.get("v")
+            elif element.tag == "nd":
+                refs.append(int(element.get("ref")))
+            elif element.tag == "node":
+                node_ids.append(int(element.get("id")))
+                node_lat.append(float(element.get("lat")))
+                node_lon.append(float(element.get("lon")))
+                tags = {}
+                element.clear()
+            elif element.tag == "way":
+                if _road_class(tags) is not None and len(refs) > 1 and tags.get("access") not in ("no", "private"):
+                    way_refs.append(refs)
+                    way_tags.append(tags)
+                tags, refs = {}, []
+                element.clear()
+            elif element.tag == "relation":
+                tags, refs = {}, []
+                element.clear()
+
+        return cls.from_ways(np.array(node_ids, dtype=np.int64), np.column_stack([node_lat, node_lon]),
+                             way_refs, way_tags)
+
+    @classmethod
+    def from_ways(cls, node_ids, node_coords, way_refs, way_tags):
+        """Build a graph from OSM node ids/coordinates and ways (node id lists plus tag dicts)."""
+        order = np.argsort(node_ids)
+        node_ids = np.asarray(node_ids)[order]
+        node_coords = np.asarray(node_coords, dtype=float).reshape(-1, 2)[order]
+
+        names = [""]
+        name_index = {"": 0}
+        sources, targets, classes, flags, name_ids = [], [], [], [], []
+        for refs, tags in zip(way_refs, way_tags):
+            refs = np.asarray(refs, dtype=np.int64)
+            positions = np.searchsorted(node_ids, refs)
+            if np.any(positions >= len(node_ids)) or np.any(node_ids[np.minimum(positions, len(node_ids) - 1)] != refs):
+                continue  # way references nodes outside the extract
+
+            road_class = _road_class(tags)
+            name = tags.get("name") or tags.get("ref") or ""
+            if name not in name_index:
+                name_index[name] = len(names)
+                names.append(name)
+
+            way_flags = 0
+            if tags.get("toll") == "yes":
+                way_flags |= FLAG_TOLLWAY
+            if road_class == "ferry":
+                way_flags |= FLAG_FERRY
+            if tags.get("motor_vehicle") == "no" or tags.get("motorcar") == "no":
+                way_flags |= FLAG_NO_CAR
+            if tags.get("bicycle") == "no":
+                way_flags |= FLAG_NO_BICYCLE
+            if tags.get("foot") == "no":
+                way_flags |= FLAG_NO_FOOT
+
+            oneway = tags.get("oneway")
+            if oneway is None and (road_class in ("motorway", "motorway_link") or tags.get("junction") == "roundabout"):
+                oneway = "yes"
+            forward, backward = positions[:-1], positions[1:]
+            if oneway == "-1":
+                forward, backward = backward, forward
+            against = FLAG_AGAINST_ONEWAY if oneway in ("yes", "true", "1", "-1") else 0
+
+            for edge_from, edge_to, edge_flags in ((forward, backward, way_flags), (backward, forward, way_flags | against)):
+                sources.append(edge_from)
+                targets.append(edge_to)
+                classes.append(np.full(len(edge_from), ROAD_CLASS_INDEX[road_class], dtype=np.uint8))
+                flags.append(np.full(len(edge_from), edge_flags, dtype=np.uint8))
+                name_ids.append(np.full(len(edge_from), name_index[name], dtype=np.int32))
+
+        if not sources:
+            raise ValueError("no routable ways found in the extract")
+
+        sources = np.concatenate(sources)
+        targets = np.concatenate(targets)
+
+        # Keep only nodes some edge touches, renumbered densely
+        used, inverse = np.unique(np.concatenate([sources, targets]), return_inverse=True)
+        sources, targets = inverse[:len(sources)], inverse[len(sources):]
+        nodes = node_coords[used]
+
+        order = np.argsort(sources, kind="stable")
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=len(nodes)))]).astype(np.int64)
+        targets = targets[order].astype(np.int32)
+        sources = sources[order]
+        lengths = haversine_m(nodes[sources, 0], nodes[sources, 1], nodes[targets, 0], nodes[targets, 1])
+
+        return cls(nodes, indptr, targets, lengths.astype(np.float32),
+                   np.concatenate(classes)[order], np.concatenate(flags)[order],
+                   np.concatenate(name_ids)[order], names)
+
+
+def _road_class(tags):
+    if tags.get("route") == "ferry":
+        return "ferry"
+    highway = tags.get("highway")
+    return highway if highway in ROAD_CLASS_INDEX and highway != "ferry" else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a local road graph from an OSM XML extract.")
+    parser.add_argument("osm", help="OSM XML extract (.osm)")
+    parser.add_argument("output", help="Directory to write the graph to")
+    args = parser.parse_args()
+
+    graph = RoadGraph.from_osm(args.osm)
+    graph.save(args.output)
+    print(f"{len(graph)} nodes, {graph.edge_count} edges written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
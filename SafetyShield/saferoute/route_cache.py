@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from .geocode_cache import CACHE_DIR
+
+ROUTE_TTL = 7 * 24 * 3600             # seconds a cached ORS response stays valid
+ROUTE_MAX_BYTES = 256 * 1024 * 1024   # compressed bytes kept on disk
+ROUTE_COORD_PRECISION = 4             # decimal places coordinates are snapped to (~10m)
+
+
+def route_cache_key(start_coords, end_coords, profile, avoid_features=None, alternatives=False,
+                    precision=ROUTE_COORD_PRECISION, radiuses=None):
+    """Content address of an ORS directions request.
+
+    Coordinates are snapped to `precision` decimals so requests from nearly the
+    same spot share an entry; avoid features are order-insensitive. Snap
+    radiuses change which roads the ends may snap to, so they are part of the
+    address when given (requests without them keep their existing keys).
+    """
+    request = {
+        "profile": profile,
+        "coordinates": [[round(float(c), precision) for c in point] for point in (start_coords, end_coords)],
+        "avoid_features": sorted(avoid_features or []),
+        "alternatives": bool(alternatives),
+    }
+    if radiuses:
+        request["radiuses"] = [float(r) for r in radiuses]
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RouteCache:
+    """zlib-compressed ORS responses in SQLite, bounded by total compressed size.
+
+    When the store grows past max_bytes the least recently used responses are
+    evicted until it fits again.
+    """
+
+    def __init__(self, path=None, ttl=ROUTE_TTL, max_bytes=ROUTE_MAX_BYTES, precision=ROUTE_COORD_PRECISION):
+        self.path = path or os.path.join(CACHE_DIR, "routes.sqlite3")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.precision = precision
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                " key TEXT PRIMARY KEY,"
+                " data BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS routes_last_used ON routes(last_used)")
+            self._db.commit()
+        return self._db
+
+    def key(self, start_coords, end_coords, profile, avoid_features=None, alternatives=False, radiuses=None):
+        return route_cache_key(start_coords, end_coords, profile, avoid_features, alternatives, self.precision,
+                               radiuses)
+
+    def get(self, key):
+        """Return the cached ORS JSON for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            row = db.execute("SELECT data, created FROM routes WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                data, created = row
+                if now - created < self.ttl:
+                    db.execute("UPDATE routes SET last_used = ? WHERE key = ?", (now, key))
+                    db.commit()
+                    self.hits += 1
+                    return json.loads(zlib.decompress(data))
+                db.execute("DELETE FROM routes WHERE key = ?", (key,))
+                db.commit()
+            self.misses += 1
+            return None
+
+    def put(self, key, route_json):
+        data = zlib.compress(json.dumps(route_json, separators=(",", ":")).encode("utf-8"))
+        if len(data) > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO routes (key, data, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(data), len(data), now, now)
+            )
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db):
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM routes").fetchone()
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        stale = []
+        for key, size in db.execute("SELECT key, size FROM routes ORDER BY last_used"):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM routes WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM routes")
+            db.commit()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries, size = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM routes"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
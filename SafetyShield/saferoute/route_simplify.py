@@ -0,0 +1,108 @@
+import math
+
+import numpy as np
+
+METERS_PER_DEGREE = 111320.0
+
+SCORING_TOLERANCE_M = 2.0     # drops near-collinear vertices without moving the route off its road
+DISPLAY_PIXEL_TOLERANCE = 0.5  # screen error allowed when drawing a route
+DISPLAY_ZOOM_HEADROOM = 2      # zoom levels past the initial view that should still look exact
+MIN_TOLERANCE_M = 0.5         # finest tolerance vertex importance is resolved to
+
+
+def to_local_meters(coords):
+    """Project [lat, lon] degrees into an equirectangular frame in meters around the route's mean latitude."""
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if not len(coords):
+        return coords
+    lat0 = math.radians(float(coords[:, 0].mean()))
+    return np.column_stack([
+        coords[:, 1] * math.cos(lat0) * METERS_PER_DEGREE,
+        coords[:, 0] * METERS_PER_DEGREE,
+    ])
+
+
+def _segment_distances(points, a, b):
+    """Distance from every point to the segment a-b."""
+    ab = b - a
+    length_sq = float(ab @ ab)
+    if length_sq == 0:
+        return np.hypot(points[:, 0] - a[0], points[:, 1] - a[1])
+    t = np.clip(((points - a) @ ab) / length_sq, 0.0, 1.0)
+    nearest = a + t[:, None] * ab
+    return np.hypot(points[:, 0] - nearest[:, 0], points[:, 1] - nearest[:, 1])
+
+
+def vertex_importance(coords, min_tolerance=MIN_TOLERANCE_M):
+    """Douglas-Peucker importance of every vertex, in meters.
+
+    A vertex is kept by Douglas-Peucker at tolerance t exactly when its importance
+    is greater than t, so one pass gives every level of detail. Ranges whose
+    deviation is already below min_tolerance are not split further; their
+    vertices only matter for tolerances finer than that.
+    """
+    points = to_local_meters(coords)
+    n = len(points)
+    importance = np.zeros(n)
+    if n == 0:
+        return importance
+    importance[0] = importance[-1] = np.inf
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+        dists = _segment_distances(points[first + 1:last], points[first], points[last])
+        k = int(np.argmax(dists))
+        split = first + 1 + k
+        significance = min(float(dists[k]), parent)
+        if significance < min_tolerance:
+            importance[first + 1:last] = np.minimum(dists, significance)
+            continue
+        importance[split] = significance
+        stack.append((first, split, significance))
+        stack.append((split, last, significance))
+
+    return importance
+
+
+def simplify(coords, tolerance_m, importance=None):
+    """Douglas-Peucker simplification of a [lat, lon] polyline to tolerance_m meters."""
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if importance is None:
+        importance = vertex_importance(coords, tolerance_m)
+    return coords[importance > tolerance_m]
+
+
+def meters_per_pixel(zoom, lat):
+    """Ground resolution of a 256px web mercator tile at the given zoom and latitude."""
+    return 156543.03392 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def display_tolerance(zoom, lat, headroom=DISPLAY_ZOOM_HEADROOM):
+    """Tolerance (meters) that stays under DISPLAY_PIXEL_TOLERANCE up to `headroom` levels past zoom."""
+    return DISPLAY_PIXEL_TOLERANCE * meters_per_pixel(zoom + headroom, lat)
+
+
+def fit_zoom(bbox, width_px=800, height_px=600, max_zoom=18):
+    """Largest zoom at which a [min_lon, min_lat, max_lon, max_lat] bbox fits the map viewport."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    lat = (min_lat + max_lat) / 2
+    width_m = max(max_lon - min_lon, 1e-9) * math.cos(math.radians(lat)) * METERS_PER_DEGREE
+    height_m = max(max_lat - min_lat, 1e-9) * METERS_PER_DEGREE
+    for zoom in range(max_zoom, 0, -1):
+        resolution = meters_per_pixel(zoom, lat)
+        if width_m / resolution <= width_px and height_m / resolution <= height_px:
+            return zoom
+    return 1
+
+
+def levels_of_detail(coords, zooms, lat=None, importance=None):
+    """Map each zoom level to the simplified [lat, lon] polyline suitable for drawing at it."""
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if lat is None:
+        lat = float(coords[:, 0].mean()) if len(coords) else 0.0
+    if importance is None:
+        importance = vertex_importance(coords)
+    return {zoom: coords[importance > display_tolerance(zoom, lat, headroom=0)] for zoom in zooms}
@@ -0,0 +1,350 @@
+import contextvars
+import logging
+import math
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import polyline_codec
+from .metrics import metrics
+from .ors import (MAX_SEGMENT_WORKERS, ORS_BASE_URL, ORS_MAX_ALTERNATIVES_KM, ORS_MAX_ROUTE_KM, SEGMENT_TIMEOUT,
+                  ors_scheduler)
+from .route_cache import RouteCache
+
+logger = logging.getLogger(__name__)
+
+# Shared cache of raw ORS directions responses (compressed, size-bounded)
+route_cache = RouteCache()
+metrics.register_collector("route_cache", route_cache.stats)
+
+# Routing backend: "ors" (OpenRouteService API) or "local" (crime-weighted A* over SAFE_ROUTE_GRAPH)
+ROUTING_ENGINE = os.environ.get("SAFE_ROUTE_ENGINE", "ors").lower()
+
+SEGMENT_LIMIT_MARGIN = 0.97   # plan legs a little under the limit; ORS measures on a slightly different earth model
+MAX_REPLANS = 3               # re-plans after a distance-limit error before giving up on a trip
+WAYPOINT_SNAP_RADIUS = -1     # ORS snapping radius for generated waypoints (-1: nearest road, however far)
+DEFAULT_SNAP_RADIUS = 350     # ORS's own default, kept for the user's start and end points
+DISTANCE_LIMIT_ERROR = "The route segment distance exceeds the API limit. Using automatic waypoints."
+_LIMIT_PATTERN = re.compile(r"must not be greater than ([0-9.]+) ?meters")
+
+
+class RouteLimits:
+    """Longest straight-line distance ORS accepts per request, by (profile, alternatives).
+
+    Starts from the public API limits and is lowered whenever ORS rejects a request
+    with a distance-limit error (which reports the server's real limit), so a wrong
+    default costs one round of failed requests per process, not one per trip.
+    """
+
+    def __init__(self, route_km=ORS_MAX_ROUTE_KM, alternatives_km=ORS_MAX_ALTERNATIVES_KM):
+        self.route_km = dict(route_km)
+        self.alternatives_km = alternatives_km
+        self._learned = {}
+        self._lock = threading.Lock()
+
+    def limit_km(self, profile, alternatives=False):
+        with self._lock:
+            learned = self._learned.get((profile, alternatives))
+        if learned is not None:
+            return learned
+        limit = self.route_km.get(profile, min(self.route_km.values()))
+        return min(limit, self.alternatives_km) if alternatives else limit
+
+    def learn(self, profile, alternatives, message, attempted_km):
+        """Lower the limit after ORS refused a request spanning attempted_km; returns the new limit.
+
+        The new limit is always below attempted_km, so re-planning terminates, and
+        concurrent refusals reporting the same limit agree on it.
+        """
+        match = _LIMIT_PATTERN.search(message or "")
+        limit = float(match.group(1)) / 1000 if match else attempted_km / 2
+        if limit >= attempted_km:
+            # Refused although under the reported limit: ORS measured it longer than we did
+            limit = attempted_km * SEGMENT_LIMIT_MARGIN
+        with self._lock:
+            key = (profile, alternatives)
+            previous = self._learned.get(key, math.inf)
+            self._learned[key] = min(limit, previous)
+        if limit < previous:
+            logger.info(f"ORS {profile} requests are limited to {limit:.0f} km; re-planning route segments.")
+        return min(limit, previous)
+
+
+route_limits = RouteLimits()
+
+# Function to calculate distance between two coordinates (in km)
+def haversine_distance(coord1, coord2):
+    # Convert coordinates from [lon, lat] to [lat, lon] for calculation
+    lon1, lat1 = coord1
+    lon2, lat2 = coord2
+    
+    # Convert latitude and longitude from degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    r = 6371  # Radius of earth in kilometers
+    
+    return c * r
+
+# Function to interpolate points along the great circle between two [lon, lat] coordinates
+def great_circle_points(start_coords, end_coords, fractions):
+    lon1, lat1, lon2, lat2 = map(math.radians, [*start_coords, *end_coords])
+    a = np.array([math.cos(lat1) * math.cos(lon1), math.cos(lat1) * math.sin(lon1), math.sin(lat1)])
+    b = np.array([math.cos(lat2) * math.cos(lon2), math.cos(lat2) * math.sin(lon2), math.sin(lat2)])
+    angle = math.acos(min(1.0, max(-1.0, float(a @ b))))
+    fractions = np.asarray(fractions, dtype=float)
+    if angle < 1e-12:
+        return [list(start_coords) for _ in fractions]
+    
+    # Spherical linear interpolation between the two unit vectors
+    points = (np.outer(np.sin((1 - fractions) * angle), a) + np.outer(np.sin(fractions * angle), b)) / math.sin(angle)
+    lats = np.degrees(np.arcsin(np.clip(points[:, 2], -1.0, 1.0)))
+    lons = np.degrees(np.arctan2(points[:, 1], points[:, 0]))
+    return [[float(lon), float(lat)] for lon, lat in zip(lons, lats)]
+
+# Function to generate intermediate waypoints for long routes (max_segment_distance in km)
+def generate_waypoints(start_coords, end_coords, max_segment_distance=5000):
+    total_distance = haversine_distance(start_coords, end_coords)
+    
+    if total_distance <= max_segment_distance:
+        return []  # No waypoints needed for short routes
+    
+    # The fewest equal segments that each stay under the limit, split along the great circle
+    num_segments = math.ceil(total_distance / max_segment_distance)
+    return great_circle_points(start_coords, end_coords, [i / num_segments for i in range(1, num_segments)])
+
+# Function to split a trip into the fewest legs ORS accepts for this profile
+def plan_route_legs(start_coords, end_coords, profile):
+    max_leg_distance = route_limits.limit_km(profile) * SEGMENT_LIMIT_MARGIN
+    waypoints = generate_waypoints(start_coords, end_coords, max_leg_distance)
+    return list(zip([start_coords] + waypoints, waypoints + [end_coords]))
+
+# Function to get route between two points with options for alternative routes
+def get_route(start_coords, end_coords, profile, api_key, avoid=None, alternatives=False, time_of_day=None):
+    # The local engine has no distance limit
+    if ROUTING_ENGINE == "local":
+        return get_single_route(start_coords, end_coords, profile, api_key, avoid, alternatives, time_of_day)
+    
+    approx_distance = haversine_distance(start_coords, end_coords)
+    for _ in range(MAX_REPLANS + 1):
+        legs = plan_route_legs(start_coords, end_coords, profile)
+        
+        if len(legs) == 1:
+            # Alternatives are only requested where ORS allows them
+            with_alternatives = alternatives and approx_distance <= route_limits.limit_km(profile, True) * SEGMENT_LIMIT_MARGIN
+            route_json, error = request_route(start_coords, end_coords, profile, api_key, avoid, with_alternatives)
+            if error == DISTANCE_LIMIT_ERROR:
+                continue  # the limit just learned changes the plan
+            if error:
+                logger.warning(error)
+            return route_json
+        
+        logger.info(f"Route distance is approximately {approx_distance:.0f} km. Breaking into {len(legs)} segments for routing.")
+        results = fetch_route_segments(legs, profile, api_key, avoid)
+        
+        # Report every failed segment, not just the first one
+        failed = [(i, error) for i, (segment, error) in enumerate(results) if segment is None]
+        if failed:
+            for i, error in failed:
+                logger.error(f"Could not calculate route for segment {i+1} of {len(legs)}: {error}")
+            return None
+        
+        # Combine all segments into one route
+        return combine_route_segments([segment for segment, _ in results])
+    
+    logger.error("Could not fit the route within the OpenRouteService distance limit.")
+    return None
+
+# Function to fetch route segments concurrently, preserving their order.
+# Legs ORS rejects as too long are split again (the limit has just been learned) and stitched back together.
+def fetch_route_segments(legs, profile, api_key, avoid=None, timeout=SEGMENT_TIMEOUT, replans=MAX_REPLANS,
+                         fixed_ends=(True, True)):
+    if not legs:
+        return []
+    
+    workers = min(MAX_SEGMENT_WORKERS, len(legs))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # Each leg runs in a copy of the caller's context so its timings land in the caller's trace
+        futures = [
+            pool.submit(contextvars.copy_context().run, request_route, leg_start, leg_end, profile, api_key, avoid,
+                        False, timeout, _leg_radiuses(i, len(legs), fixed_ends))
+            for i, (leg_start, leg_end) in enumerate(legs)
+        ]
+        # Results come back in leg order regardless of completion order
+        results = [future.result() for future in futures]
+    
+    for i, (segment, error) in enumerate(results):
+        if error == DISTANCE_LIMIT_ERROR and replans:
+            sub_legs = plan_route_legs(legs[i][0], legs[i][1], profile)
+            sub_ends = (i == 0 and fixed_ends[0], i == len(legs) - 1 and fixed_ends[1])
+            sub_results = fetch_route_segments(sub_legs, profile, api_key, avoid, timeout, replans - 1, sub_ends)
+            errors = [sub_error for sub_segment, sub_error in sub_results if sub_segment is None]
+            results[i] = (None, errors[0]) if errors else (combine_route_segments([r for r, _ in sub_results]), None)
+    return results
+
+# Function to pick ORS snapping radii for a leg. Generated waypoints may fall off-road (fields, water),
+# so they snap to the nearest road however far; the user's own endpoints keep the default radius.
+def _leg_radiuses(i, leg_count, fixed_ends):
+    radiuses = [
+        DEFAULT_SNAP_RADIUS if i == 0 and fixed_ends[0] else WAYPOINT_SNAP_RADIUS,
+        DEFAULT_SNAP_RADIUS if i == leg_count - 1 and fixed_ends[1] else WAYPOINT_SNAP_RADIUS,
+    ]
+    return None if radiuses == [DEFAULT_SNAP_RADIUS, DEFAULT_SNAP_RADIUS] else radiuses
+
+# Function to get a single route segment.
+# time_of_day only matters to the local engine, which weighs crime density while searching.
+def get_single_route(start_coords, end_coords, profile, api_key, avoid=None, alternatives=False, time_of_day=None):
+    if ROUTING_ENGINE == "local":
+        from .local_router import request_local_route  # loaded only when the local engine is selected
+        route_json, error = request_local_route(start_coords, end_coords, profile, avoid, alternatives, time_of_day)
+    else:
+        route_json, error = request_route(start_coords, end_coords, profile, api_key, avoid, alternatives)
+    if error:
+        logger.warning(error)
+    return route_json
+
+# Function to request a route from ORS (or the route cache).
+# Returns (route_json, error_message) and never touches the UI, so it is safe to call from worker threads.
+def request_route(start_coords, end_coords, profile, api_key, avoid=None, alternatives=False, timeout=SEGMENT_TIMEOUT,
+                  radiuses=None):
+    base_url = ORS_BASE_URL + "/v2/directions/" + profile
+    headers = {
+        'Accept': 'application/json, application/geo+json',
+        'Authorization': api_key,
+        'Content-Type': 'application/json'
+    }
+    
+    body = {
+        "coordinates": [start_coords, end_coords],
+        "instructions": True,
+    }
+    
+    avoid_features = [a for a in avoid if a != "high_crime_areas"] if avoid else []
+    if avoid_features:
+        body["options"] = {"avoid_features": avoid_features}
+    
+    if radiuses:
+        body["radiuses"] = radiuses
+    
+    if alternatives:
+        body["alternative_routes"] = {
+            "target_count": 3,
+            "weight_factor": 1.6
+        }
+    
+    # Identical requests (after snapping coordinates) are served from the route cache
+    cache_key = route_cache.key(start_coords, end_coords, profile, avoid_features, alternatives, radiuses)
+    cached = route_cache.get(cache_key)
+    metrics.increment("cache_lookups", cache="route", result="hit" if cached else "miss")
+    if cached:
+        return cached, None
+    
+    try:
+        metrics.increment("ors_requests", endpoint="directions")
+        with metrics.span("directions"):
+            response = ors_scheduler.request("POST", base_url, json=body, headers=headers, timeout=timeout)
+        if response.status_code == 200:
+            route_json = response.json()
+            route_cache.put(cache_key, route_json)
+            return route_json, None
+        else:
+            error_msg = f"Error getting route: {response.status_code}"
+            try:
+                error_data = response.json()
+                if 'error' in error_data and 'message' in error_data['error']:
+                    error_msg += f", {error_data['error']['message']}"
+                    
+                    # Handle specific distance limit error: remember the limit so the trip is re-planned to fit
+                    if "distance must not be greater than" in error_data['error']['message']:
+                        route_limits.learn(profile, alternatives, error_data['error']['message'],
+                                           haversine_distance(start_coords, end_coords))
+                        return None, DISTANCE_LIMIT_ERROR
+            except:
+                error_msg += f", {response.text}"
+                
+            return None, error_msg
+    except Exception as e:
+        return None, f"Error requesting route: {e}"
+
+# Function to combine multiple route segments into one route
+def combine_route_segments(segments):
+    if not segments:
+        return None
+    
+    if len(segments) == 1:
+        return segments[0]
+    
+    # For simplicity, we'll just use the first route from each segment
+    routes = [segment['routes'][0] for segment in segments]
+    
+    # Decode each leg once into integer polyline units. Consecutive legs share their
+    # join point, so drop the duplicate and remember where each leg now starts.
+    parts = []
+    leg_offsets = []
+    way_points = [0]
+    total_points = 0
+    last_point = None
+    for route in routes:
+        points = polyline_codec.decode_ints(route['geometry'])
+        offset = total_points
+        if last_point is not None and len(points) and np.array_equal(points[0], last_point):
+            points = points[1:]
+            offset -= 1
+        
+        parts.append(points)
+        leg_offsets.append(offset)
+        total_points += len(points)
+        if len(points):
+            last_point = points[-1]
+        way_points.append(max(total_points - 1, 0))
+    
+    merged = np.concatenate(parts)
+    
+    # Rebase step way_points from leg-local to merged vertex indices
+    steps = []
+    for route, offset in zip(routes, leg_offsets):
+        for leg_segment in route['segments']:
+            for step in leg_segment['steps']:
+                step = dict(step)
+                if 'way_points' in step:
+                    step['way_points'] = [index + offset for index in step['way_points']]
+                steps.append(step)
+    
+    total_distance = sum(route['summary']['distance'] for route in routes)
+    total_duration = sum(route['summary']['duration'] for route in routes)
+    
+    # Bounding box of the merged geometry: [min_lon, min_lat, max_lon, max_lat]
+    bbox = None
+    if len(merged):
+        scale = 10 ** polyline_codec.POLYLINE_PRECISION
+        min_lat, min_lon = merged.min(axis=0) / scale
+        max_lat, max_lon = merged.max(axis=0) / scale
+        bbox = [float(min_lon), float(min_lat), float(max_lon), float(max_lat)]
+    
+    first_route = routes[0]
+    combined_segment = dict(first_route['segments'][0])
+    combined_segment.update(distance=total_distance, duration=total_duration, steps=steps)
+    
+    combined_route = dict(first_route)
+    combined_route.update(
+        summary=dict(first_route['summary'], distance=total_distance, duration=total_duration),
+        segments=[combined_segment],
+        geometry=polyline_codec.encode_ints(merged),
+        way_points=way_points,
+    )
+    if bbox:
+        combined_route['bbox'] = bbox
+    
+    combined = dict(segments[0])
+    combined['routes'] = [combined_route]
+    if bbox:
+        combined['bbox'] = bbox
+    
+    return combined
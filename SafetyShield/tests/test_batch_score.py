@@ -0,0 +1,30 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import batch_score  # noqa: E402
+
+
+def test_bad_time_of_day_rows_fail_without_reaching_a_worker(tmp_path, monkeypatch):
+    def not_submitted(pair):
+        raise AssertionError("invalid row was sent to a worker")
+
+    monkeypatch.setattr(batch_score, "score_pair", not_submitted)
+    pairs = [{"id": "1", "start": "A", "end": "B", "time_of_day": "Midnight"},
+             {"id": "2", "start": "A", "end": "B", "time_of_day": "night"}]
+    output = tmp_path / "results.jsonl"
+
+    stats = batch_score.run_batch(pairs, str(output), {}, workers=1)
+    assert stats == {"skipped": 0, "ok": 0, "error": 2}
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row["id"] for row in rows] == ["1", "2"]
+    assert all(row["status"] == "error" and row["error"].startswith("time_of_day must be one of") for row in rows)
+
+
+def test_row_error_accepts_known_and_missing_periods():
+    assert batch_score.row_error({"time_of_day": "Night (8PM-6AM)"}) is None
+    assert batch_score.row_error({"time_of_day": "Current Time"}) is None
+    assert batch_score.row_error({"time_of_day": ""}) is None
+    assert batch_score.row_error({}) is None
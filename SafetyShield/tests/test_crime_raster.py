@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute.corridor import RouteCorridor  # noqa: E402
+from saferoute.crime_raster import CORRIDOR_LAYER, INCIDENT_LAYER, CrimeRaster  # noqa: E402
+
+PERIOD = "Night (8PM-6AM)"
+
+
+@pytest.fixture
+def raster(tmp_path):
+    return CrimeRaster(root=str(tmp_path), tile_cells=20, cell_size=0.005)  # small tiles, hotspots cross edges
+
+
+def stitched(raster, tile_lat, tile_lon, radius=2):
+    """Incident layers of the tiles around one tile, joined into a single grid."""
+    span = range(-radius, radius + 1)
+    return np.vstack([np.hstack([raster.tile(PERIOD, tile_lat + dy, tile_lon + dx)[0][INCIDENT_LAYER]
+                                 for dx in span]) for dy in span])
+
+
+def test_corridor_layer_sees_across_tile_edges(raster):
+    n = raster.tile_cells
+    grid = stitched(raster, 7, -3)
+    box = sum(np.roll(np.roll(grid, dy, 0), dx, 1) for dy in (-1, 0, 1) for dx in (-1, 0, 1))
+    centre = box[2 * n:3 * n, 2 * n:3 * n]
+    corridor = raster.tile(PERIOD, 7, -3)[0][CORRIDOR_LAYER]
+    np.testing.assert_allclose(corridor, centre, rtol=1e-5, atol=1e-5)
+    assert corridor[[0, -1]].sum() > 0
+
+
+def test_no_ridges_along_tile_borders(raster):
+    # Out-of-tile hotspot scatter used to be clipped onto the border cells
+    layers = [raster.tile(PERIOD, lat, lon)[0][INCIDENT_LAYER] for lat in range(6) for lon in range(6)]
+    border = np.mean([np.r_[layer[0], layer[-1], layer[:, 0], layer[:, -1]].mean() for layer in layers])
+    inner = np.mean([layer[1:-1, 1:-1].mean() for layer in layers])
+    assert border < 1.1 * inner
+
+
+def test_tile_settings_name_the_cache_directory(tmp_path):
+    paths = {CrimeRaster(root=str(tmp_path), **settings)._tile_path(PERIOD, 0, 0)
+             for settings in ({}, {"seed": 1}, {"cell_size": 0.002}, {"tile_cells": 50})}
+    assert len(paths) == 4
+
+
+def test_raster_and_corridor_scorers_agree(tmp_path):
+    # score_route (raster lookups) and RouteCorridor.score (exact distances over the
+    # raster's own cells) share one normalization, so they give the same route
+    # nearly the same score
+    raster = CrimeRaster(root=str(tmp_path))
+    rng = np.random.default_rng(7)
+    for _ in range(10):
+        start = rng.uniform([12.8, 80.0], [13.2, 80.4])
+        route = np.linspace(start, start + rng.uniform(-0.05, 0.05, 2), 20)
+        low, high = route.min(axis=0) - 0.01, route.max(axis=0) + 0.01
+        crimes, hotspots = raster.crime_points([low[1], low[0], high[1], high[0]], PERIOD)
+        exact = RouteCorridor(route).score(crimes, hotspots)
+        assert raster.score_route(route, PERIOD) == pytest.approx(exact, abs=10)
@@ -0,0 +1,98 @@
+import math
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute.corridor import CORRIDOR_WIDTH_M, METERS_PER_DEGREE  # noqa: E402
+from saferoute.crime import evaluate_route_safety  # noqa: E402
+
+
+def reference_safety(route_coords, crime_data, hotspots, width_m=CORRIDOR_WIDTH_M):
+    """Plain nested loops over every crime and every route edge, in the same metric frame."""
+    if not crime_data or not route_coords:
+        return 95
+    lat0 = sum(lat for lat, _ in route_coords) / len(route_coords)
+    x_scale = math.cos(math.radians(lat0)) * METERS_PER_DEGREE
+
+    def meters(lat, lon):
+        return lon * x_scale, lat * METERS_PER_DEGREE
+
+    points = [meters(lat, lon) for lat, lon in route_coords]
+    edges = list(zip(points, points[1:])) or [(points[0], points[0])]
+
+    def edge_distance(p, a, b):
+        abx, aby = b[0] - a[0], b[1] - a[1]
+        length_sq = abx * abx + aby * aby
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((p[0] - a[0]) * abx + (p[1] - a[1]) * aby) / length_sq))
+        return math.hypot(p[0] - (a[0] + t * abx), p[1] - (a[1] + t * aby))
+
+    crime_weight_sum = 0.0
+    for crime_lat, crime_lon, crime_weight in crime_data:
+        crime = meters(crime_lat, crime_lon)
+        if min(edge_distance(crime, a, b) for a, b in edges) < width_m:
+            crime_weight_sum += crime_weight
+
+    for hotspot_lat, hotspot_lon, hotspot_radius in hotspots:
+        center = meters(hotspot_lat, hotspot_lon)
+        radius_m = hotspot_radius * METERS_PER_DEGREE
+        for a, b in edges:
+            dist = edge_distance(center, a, b)
+            if dist < radius_m:
+                crime_weight_sum += (radius_m - dist) / radius_m * 2
+                break
+
+    length_m = sum(math.hypot(b[0] - a[0], b[1] - a[1]) for a, b in edges)
+    span = 2 * width_m
+    normalized_crime = crime_weight_sum * span / max(length_m, span)
+    return max(0, 100 - min(100, normalized_crime * 100))
+
+
+def random_route(rng, vertices, step_deg):
+    lat, lon = 13.0 + rng.uniform(-0.05, 0.05), 80.2 + rng.uniform(-0.05, 0.05)
+    route = [[lat, lon]]
+    for _ in range(vertices - 1):
+        lat += rng.uniform(-step_deg, step_deg)
+        lon += rng.uniform(-step_deg, step_deg)
+        route.append([lat, lon])
+    return route
+
+
+def crimes_around(rng, route, count, spread_deg=0.01):
+    crimes = []
+    for _ in range(count):
+        lat, lon = rng.choice(route)
+        crimes.append([lat + rng.gauss(0, spread_deg), lon + rng.gauss(0, spread_deg), rng.uniform(0.2, 1.0)])
+    return crimes
+
+
+CASES = [
+    # (seed, vertices, step in degrees, crimes, hotspots)
+    (1, 2, 0.05, 60, 1),         # one long straight edge: crimes beside it, far from both ends
+    (2, 40, 0.002, 40, 2),
+    (3, 400, 0.0005, 150, 3),    # dense city route
+    (4, 25, 0.02, 200, 0),
+    (5, 1, 0.0, 3, 1),           # single vertex
+]
+
+
+@pytest.mark.parametrize("seed, vertices, step_deg, crime_count, hotspot_count", CASES)
+def test_matches_nested_loop_reference(seed, vertices, step_deg, crime_count, hotspot_count):
+    rng = random.Random(seed)
+    route = random_route(rng, vertices, step_deg)
+    crimes = crimes_around(rng, route, crime_count)
+    hotspots = [[*rng.choice(route), rng.uniform(0.001, 0.01)] for _ in range(hotspot_count)]
+    hotspots.append([0.0, 0.0, 0.01])  # far from every route
+
+    expected = reference_safety(route, crimes, hotspots)
+    if vertices > 1:
+        assert 0 < expected < 100  # not two saturated scores agreeing
+    assert evaluate_route_safety(route, crimes, hotspots) == pytest.approx(expected, abs=1e-9)
+
+
+def test_defaults():
+    assert evaluate_route_safety([[13.0, 80.2], [13.01, 80.21]], [], []) == 95
+    assert evaluate_route_safety([], [[13.0, 80.2, 1.0]], []) == 95
@@ -0,0 +1,140 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute import polyline_codec  # noqa: E402
+from saferoute.local_router import LocalRouter  # noqa: E402
+from saferoute.road_graph import RoadGraph  # noqa: E402
+
+STEP = 0.001  # degrees between toy graph nodes (about 110 m)
+
+
+class FlatRaster:
+    """Stand-in crime raster: density 1 on edges whose midpoint lies on the given latitude."""
+
+    def __init__(self, dangerous_lat=None):
+        self.dangerous_lat = dangerous_lat
+
+    def corridor_density(self, coords, period):
+        coords = np.asarray(coords, dtype=float)
+        if self.dangerous_lat is None:
+            return np.zeros(len(coords))
+        return np.isclose(coords[:, 0], self.dangerous_lat).astype(float)
+
+
+def build(nodes, ways):
+    """RoadGraph from {id: (lat, lon)} and [(refs, tags)]."""
+    ids = sorted(nodes)
+    return RoadGraph.from_ways(np.array(ids), np.array([nodes[i] for i in ids]),
+                               [refs for refs, _ in ways], [tags for _, tags in ways])
+
+
+def lonlat(lat, lon):
+    return [lon, lat]
+
+
+def path_of(route_json, index=0):
+    return [tuple(np.round(point, 5)) for point in polyline_codec.decode(route_json["routes"][index]["geometry"])]
+
+
+# A square with a short direct road A-B-C and a longer road A-D-E-C above it:
+#   D ---- E
+#   |      |
+#   A - B - C
+A, B, C = (13.0, 80.0), (13.0, 80.0 + STEP), (13.0, 80.0 + 2 * STEP)
+D, E = (13.0 + 2 * STEP, 80.0), (13.0 + 2 * STEP, 80.0 + 2 * STEP)
+SQUARE = {1: A, 2: B, 3: C, 4: D, 5: E}
+
+
+def square(direct_tags=None):
+    return build(SQUARE, [
+        ([1, 2, 3], {"highway": "residential", "name": "Direct Road", **(direct_tags or {})}),
+        ([1, 4, 5, 3], {"highway": "residential", "name": "Long Road"}),
+    ])
+
+
+def test_direct_road_is_fastest():
+    result, error = LocalRouter(square(), FlatRaster()).route(lonlat(*A), lonlat(*C), "driving-car")
+    assert error is None
+    assert path_of(result) == [A, B, C]
+
+
+@pytest.mark.parametrize("tags, avoid", [({"toll": "yes"}, "tollways"), ({"route": "ferry"}, "ferries")])
+def test_avoided_roads_are_routed_around(tags, avoid):
+    router = LocalRouter(square(tags), FlatRaster())
+    result, _ = router.route(lonlat(*A), lonlat(*C), "driving-car")
+    assert path_of(result) == [A, B, C]
+
+    result, error = router.route(lonlat(*A), lonlat(*C), "driving-car", avoid=[avoid])
+    assert error is None
+    assert path_of(result) == [A, D, E, C]
+
+
+@pytest.mark.parametrize("refs, oneway", [([1, 2, 3], "yes"), ([3, 2, 1], "-1")])
+def test_oneway_roads_are_driven_one_way_only(refs, oneway):
+    # Both ways describe traffic flowing A -> B -> C on the direct road
+    graph = build(SQUARE, [
+        (refs, {"highway": "residential", "oneway": oneway}),
+        ([1, 4, 5, 3], {"highway": "residential"}),
+    ])
+    router = LocalRouter(graph, FlatRaster())
+
+    forward, _ = router.route(lonlat(*A), lonlat(*C), "driving-car")
+    backward, error = router.route(lonlat(*C), lonlat(*A), "driving-car")
+    assert error is None
+    assert path_of(forward) == [A, B, C]
+    assert path_of(backward) == [C, E, D, A]
+
+    walking, _ = router.route(lonlat(*C), lonlat(*A), "foot-walking")
+    assert path_of(walking) == [C, B, A]
+
+
+def test_destination_snaps_to_a_node_that_can_be_reached():
+    # The far end of a dead-end one-way street has no usable outgoing edge, but can
+    # still be driven to
+    graph = build({1: A, 2: B}, [([1, 2], {"highway": "residential", "oneway": "yes"})])
+    start, _ = graph.snap(B[1], B[0], "driving-car")
+    end, _ = graph.snap(B[1], B[0], "driving-car", incoming=True)
+    assert tuple(graph.nodes[start]) == A
+    assert tuple(graph.nodes[end]) == B
+
+    result, error = LocalRouter(graph, FlatRaster()).route(lonlat(*A), lonlat(*B), "driving-car")
+    assert error is None
+    assert path_of(result) == [A, B]
+
+
+def test_unreachable_target_is_an_error():
+    # Two roads a few hundred meters apart with nothing joining them
+    far = (13.0 + 5 * STEP, 80.0)
+    far_end = (13.0 + 5 * STEP, 80.0 + STEP)
+    graph = build({1: A, 2: B, 3: far, 4: far_end}, [
+        ([1, 2], {"highway": "residential"}),
+        ([3, 4], {"highway": "residential"}),
+    ])
+    result, error = LocalRouter(graph, FlatRaster()).route(lonlat(*A), lonlat(*far_end), "driving-car")
+    assert result is None
+    assert "No route found" in error
+
+
+def test_start_and_end_on_the_same_node():
+    result, error = LocalRouter(square(), FlatRaster()).route(lonlat(*B), lonlat(*B), "driving-car")
+    assert error is None
+    route = result["routes"][0]
+    assert route["summary"] == {"distance": 0.0, "duration": 0.0}
+    assert path_of(result) == [B]
+    assert route["segments"][0]["steps"][-1]["instruction"] == "Arrive at your destination"
+
+
+def test_alternatives_are_distinct():
+    # Crime on the direct road: the fastest route takes it, the safest goes around
+    router = LocalRouter(square(), FlatRaster(dangerous_lat=A[0]))
+    result, error = router.route(lonlat(*A), lonlat(*C), "driving-car", alternatives=True)
+    assert error is None
+    paths = [path_of(result, i) for i in range(len(result["routes"]))]
+    assert paths[0] == [A, B, C]
+    assert [A, D, E, C] in paths
+    assert len(set(map(tuple, paths))) == len(paths)
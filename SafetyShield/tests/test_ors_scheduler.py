@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute.ors_scheduler import (PRIORITY_BATCH, PRIORITY_INTERACTIVE, RequestScheduler,  # noqa: E402
+                                     TokenBucket)
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class FakeSession:
+    """Answers with the given statuses in turn, then 200."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append(url)
+        return Response(self.statuses.pop(0) if self.statuses else 200)
+
+
+class WatchedBucket(TokenBucket):
+    """Token bucket that sets .empty once a worker finds it out of tokens (and is about to wait)."""
+
+    def __init__(self, per_minute, burst=None):
+        super().__init__(per_minute, burst)
+        self.empty = threading.Event()
+
+    def wait(self, now):
+        seconds = super().wait(now)
+        if seconds:
+            self.empty.set()
+        return seconds
+
+
+def watch_bucket(scheduler, api_key=None):
+    bucket = scheduler._buckets[api_key] = WatchedBucket(scheduler.per_minute, scheduler.burst)
+    return bucket
+
+
+def headers(api_key):
+    return {"Authorization": api_key}
+
+
+def test_priority_upgrade_of_a_retried_job_still_runs():
+    # One request a second: after the 503 the retry is ready but must wait for a token
+    session = FakeSession(503)
+    scheduler = RequestScheduler(session, per_minute=60, burst=1, workers=2, backoff_base=0.01, max_wait=5)
+    bucket = watch_bucket(scheduler)
+    results = []
+    batch = threading.Thread(target=lambda: results.append(
+        scheduler.request("GET", "http://ors/x", priority=PRIORITY_BATCH).status_code))
+    batch.start()
+    assert bucket.empty.wait(5)  # the retried job now sits in the ready queue
+
+    assert scheduler.request("GET", "http://ors/x", priority=PRIORITY_INTERACTIVE).status_code == 200
+    batch.join(5)
+    assert results == [200]
+    assert len(session.calls) == 2
+    assert scheduler.stats()["coalesced"] == 1
+
+
+def test_a_key_out_of_quota_does_not_hold_up_other_keys():
+    session = FakeSession()
+    scheduler = RequestScheduler(session, per_minute=6, burst=1, workers=2, max_wait=2)
+    bucket = watch_bucket(scheduler, "key-a")
+    scheduler.request("GET", "http://ors/a1", headers=headers("key-a"))  # spends key A's only token
+
+    waiting = threading.Thread(target=lambda: pytest.raises(
+        TimeoutError, scheduler.request, "GET", "http://ors/a2", headers=headers("key-a")))
+    waiting.start()
+    assert bucket.empty.wait(5)  # a2 is ready, next in line, and out of quota for ten seconds
+
+    started = time.monotonic()
+    assert scheduler.request("GET", "http://ors/b1", headers=headers("key-b")).status_code == 200
+    assert time.monotonic() - started < 0.5
+    waiting.join(5)
+    assert session.calls == ["http://ors/a1", "http://ors/b1"]
+
+
+def test_request_gives_up_after_max_wait():
+    # The bucket has no token left for the second request within max_wait
+    scheduler = RequestScheduler(FakeSession(), per_minute=1, burst=1, workers=1, max_wait=0.2)
+    assert scheduler.request("GET", "http://ors/a").status_code == 200
+    with pytest.raises(TimeoutError):
+        scheduler.request("GET", "http://ors/b")
+    stats = scheduler.stats()
+    assert stats["timeouts"] == 1 and stats["queue_depth"] == 0
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import route_api  # noqa: E402
+from saferoute.crime_raster import CrimeRaster  # noqa: E402
+
+
+@pytest.mark.parametrize("time_of_day", ["Midnight", "../../tmp/x", ["Night (6PM-12AM)"]])
+def test_unknown_time_of_day_is_refused_before_any_work(monkeypatch, time_of_day):
+    def geocode(*args):
+        raise AssertionError("geocoded an invalid request")
+
+    monkeypatch.setattr(route_api, "geocode_location", geocode)
+    api = route_api.RouteAPI("key")
+    request = {"start": "Chennai", "end": "Madurai", "time_of_day": time_of_day}
+    with pytest.raises(route_api.HTTPError) as error:
+        asyncio.run(api.find_routes(request))
+    assert error.value.status == 400
+
+
+def test_raster_tiles_only_for_known_periods(tmp_path):
+    with pytest.raises(ValueError):
+        CrimeRaster(root=str(tmp_path)).tile("../outside", 0, 0)
+
+
+def route(duration, coords):
+    return {"safety_score": 80.0, "summary": {"distance": 1000.0, "duration": duration},
+            "segments": [], "decoded_route": np.array(coords, dtype=float).reshape(-1, 2)}
+
+
+def answer(monkeypatch, routes, **request):
+    monkeypatch.setattr(route_api, "score_route_options", lambda *args: (None, routes, [], None))
+    api = route_api.RouteAPI("key")
+    return asyncio.run(api.find_routes({"start": [80.2, 13.0], "end": [80.3, 13.1], **request}))
+
+
+@pytest.mark.parametrize("safety_weight", [True, False, "5", 11])
+def test_bad_safety_weight_is_refused(monkeypatch, safety_weight):
+    with pytest.raises(route_api.HTTPError) as error:
+        answer(monkeypatch, [route(60, [[13.0, 80.2], [13.1, 80.3]])], safety_weight=safety_weight)
+    assert error.value.status == 400
+
+
+def test_routes_without_geometry_are_left_out(monkeypatch):
+    response = answer(monkeypatch, [route(60, []), route(90, [[13.0, 80.2], [13.1, 80.3]])], safety_weight=0)
+    assert [option["duration_s"] for option in response["routes"]] == [90.0]
+    assert response["bbox"] == [80.2, 13.0, 80.3, 13.1]
+
+    with pytest.raises(route_api.HTTPError) as error:
+        answer(monkeypatch, [route(60, [])])
+    assert error.value.status == 404
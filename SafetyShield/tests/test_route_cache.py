@@ -0,0 +1,16 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from saferoute.route_cache import route_cache_key  # noqa: E402
+
+START, END = [80.27, 13.08], [80.25, 13.05]
+
+
+def test_snap_radiuses_are_part_of_the_key():
+    default = route_cache_key(START, END, "driving-car")
+    anywhere = route_cache_key(START, END, "driving-car", radiuses=[-1, -1])
+    start_fixed = route_cache_key(START, END, "driving-car", radiuses=[350, -1])
+    assert len({default, anywhere, start_fixed}) == 3
+    assert route_cache_key(START, END, "driving-car", radiuses=None) == default
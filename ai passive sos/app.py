@@ -1,26 +1,51 @@
+import os
 import time
 import requests
-import smtplib
 import streamlit as st
 import sounddevice as sd
-import numpy as np
-import wave
-from email.mime.text import MIMEText
-from threading import Thread
+from threading import Event, Thread
+from streamlit.runtime.scriptrunner import add_script_run_ctx
+
+from passive_sos import (Alert, AlertDispatcher, AudioRingBuffer, BufferReader, EmailChannel, MatchDeduplicator,
+                         ReloadingMatcher, SOSPipeline, TranscriptCancelled, TranscriptClient, VoiceActivityGate,
+                         WebhookChannel, WebhookReceiver, WindowSlicer, thread_encoder, tokenize)
 
 # === AssemblyAI Configuration ===
 ASSEMBLYAI_API_KEY = "your_key"  # Replace with your actual AssemblyAI API key
 ASSEMBLYAI_UPLOAD_URL = "upload_url"
 ASSEMBLYAI_TRANSCRIPT_URL = "transcript_url"
+ASSEMBLYAI_WEBHOOK_URL = ""  # public URL forwarded to WEBHOOK_PORT for completion callbacks; empty to poll instead
+WEBHOOK_PORT = 8765
+TRANSCRIPT_TIMEOUT = 60      # seconds to wait for a chunk's transcription before giving up on it
 
 # === Audio Configuration ===
 SAMPLE_RATE = 44100       # in Hz
 CHANNELS = 1              # mono audio
 CHUNK_DURATION = 5        # seconds per audio chunk
-AUDIO_FILENAME = "temp_chunk.wav"
+CHUNK_OVERLAP = 1.5       # seconds each chunk shares with the previous one, so a phrase on the boundary is heard whole
+RING_SECONDS = 60         # capture buffer length; chunks must be encoded within this long of being recorded
+AUDIO_CODEC = "flac"      # "wav", or "flac" for lossless compression (smaller uploads)
+VAD_MARGIN_DB = 9.0       # loudness above the room's noise floor that counts as voice; silent chunks are not uploaded
+
+# === Pipeline Configuration ===
+UPLOAD_WORKERS = 2        # each worker encodes into its own in-memory buffer
+TRANSCRIBE_WORKERS = 3    # transcription mostly waits on AssemblyAI, so several chunks can be in flight
+DETECT_WORKERS = 1
+
+# === Alert Configuration ===
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+ALERT_SUPPRESSION_SECONDS = 300  # the same distress keywords alert again only after this long (unless more severe)
+ALERT_WEBHOOK_URLS = []          # extra alert channels, e.g. chat incoming-webhook URLs that accept {"text": ...}
 
 # === Distress Keywords ===
 DISTRESS_KEYWORDS = {"help", "sos", "emergency", "911", "save me", "distress", "assistance", "trapped", "danger"}
+DISTRESS_KEYWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distress_keywords.txt")
+DISTRESS_ALERT_WEIGHT = 1.0  # alert once the weights of the keywords heard add up to this
+
+# Keyword file (phrases, weights, severities, variants) compiled once and reloaded when edited;
+# DISTRESS_KEYWORDS is used when the file is missing
+distress_matcher = ReloadingMatcher(DISTRESS_KEYWORDS_FILE, fallback=DISTRESS_KEYWORDS)
 
 # --- Custom CSS for Beautiful UI ---
 st.markdown(
@@ -73,139 +98,217 @@ st.markdown('<div class="section"><h3>Email Configuration</h3></div>', unsafe_al
 with st.container():
     email_username = st.text_input("📧 Enter your Email (Sender)", "")
     email_password = st.text_input("🔑 Enter your Email Password (App Password)", "", type="password")
-    recipient_email = st.text_input("📩 Enter Recipient Email for SOS Alerts:", "")
+    recipient_email = st.text_input("📩 Enter Recipient Email(s) for SOS Alerts (comma-separated):", "")
 
 # --- Global flag for continuous recording ---
 recording = False
 stop_due_to_distress = False
+recording_stopped = Event()  # set when recording ends, so pending transcription waits give up at once
+alert_dispatcher = None      # the session's background SOS alert delivery (see session_alert_dispatcher)
+match_deduplicator = MatchDeduplicator()  # keyword matches already alerted on, by capture time
+
+def encode_audio_chunk(audio_chunk):
+    """Encode a numpy audio chunk as 16-bit WAV or FLAC in memory (the buffer is reused per thread)."""
+    encoder = thread_encoder(SAMPLE_RATE, CHANNELS, max_seconds=2 * CHUNK_DURATION)
+    audio_data, _ = encoder.encode(audio_chunk, AUDIO_CODEC)
+    st.info(f"✅ Audio chunk encoded in memory ({len(audio_data) / 1024:.0f} KB {AUDIO_CODEC.upper()})")
+    return audio_data
 
-def save_audio_chunk(audio_chunk, filename=AUDIO_FILENAME):
-    """Save a numpy audio chunk to a WAV file."""
-    audio_int16 = (audio_chunk * 32767).astype(np.int16)
-    with wave.open(filename, "wb") as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(2)  # 16-bit audio = 2 bytes
-        wf.setframerate(SAMPLE_RATE)
-        wf.writeframes(audio_int16.tobytes())
-    st.info(f"✅ Audio chunk saved as {filename}")
-
-def upload_audio(file_path):
-    """Upload audio file to AssemblyAI and return the audio URL."""
+def upload_audio(audio_data):
+    """Upload encoded audio to AssemblyAI and return the audio URL."""
     headers = {"authorization": ASSEMBLYAI_API_KEY}
-    with open(file_path, "rb") as f:
-        response = requests.post(ASSEMBLYAI_UPLOAD_URL, headers=headers, data=f)
+    response = requests.post(ASSEMBLYAI_UPLOAD_URL, headers=headers, data=BufferReader(audio_data))
     response.raise_for_status()
     st.info("🔄 Audio chunk uploaded to AssemblyAI.")
     return response.json()['upload_url']
 
+@st.cache_resource
+def transcript_client():
+    """One AssemblyAI transcript client (and webhook receiver, if configured) for the app's lifetime."""
+    receiver = None
+    if ASSEMBLYAI_WEBHOOK_URL:
+        receiver = WebhookReceiver(ASSEMBLYAI_WEBHOOK_URL, port=WEBHOOK_PORT).start()
+    return TranscriptClient(ASSEMBLYAI_API_KEY, ASSEMBLYAI_TRANSCRIPT_URL, receiver=receiver, timeout=TRANSCRIPT_TIMEOUT)
+
 def request_transcription(audio_url):
     """Request transcription from AssemblyAI."""
-    headers = {"authorization": ASSEMBLYAI_API_KEY, "content-type": "application/json"}
-    json_data = {"audio_url": audio_url}
-    response = requests.post(ASSEMBLYAI_TRANSCRIPT_URL, json=json_data, headers=headers)
-    response.raise_for_status()
+    transcript_id = transcript_client().request(audio_url)
     st.info("⏳ Transcription requested...")
-    return response.json()['id']
+    return transcript_id
 
-def poll_transcription(transcript_id):
-    """Poll AssemblyAI API until transcription is complete and return the text."""
-    headers = {"authorization": ASSEMBLYAI_API_KEY}
-    polling_url = f"{ASSEMBLYAI_TRANSCRIPT_URL}/{transcript_id}"
-    while True:
-        response = requests.get(polling_url, headers=headers)
-        response.raise_for_status()
-        status = response.json()['status']
-        if status == 'completed':
-            st.info("✅ Transcription completed.")
-            return response.json()['text']
-        elif status == 'error':
-            raise Exception("Error in transcription")
-        time.sleep(3)
-
-def contains_distress(text):
-    """Check if the transcript contains any distress keywords."""
-    text_lower = text.lower()
-    for keyword in DISTRESS_KEYWORDS:
-        if keyword in text_lower:
-            st.error(f"🚨 Detected distress keyword: {keyword}")
-            return True
-    return False
-
-def send_alert_email(transcript_text):
-    """Send an SOS alert email with the transcript text."""
-    if not (email_username and email_password and recipient_email):
-        st.warning("⚠️ Please enter all email credentials before sending an alert.")
-        return
+def wait_for_transcription(transcript_id):
+    """Wait until AssemblyAI completes the transcription and return the transcript (text and word timings).
+       Polls with a short first interval and backoff, or wakes on the webhook callback; gives up after
+       TRANSCRIPT_TIMEOUT or as soon as recording stops."""
+    transcript = transcript_client().wait(transcript_id, cancel=recording_stopped)
+    st.info("✅ Transcription completed.")
+    return transcript
+
+def distress_matches(transcript):
+    """Find distress keywords in a transcript, as (match, seconds into the audio) pairs.
+       The time comes from the word timings and is None when they are missing."""
+    words = transcript.get('words')
+    if not words:
+        return [(match, None) for match in distress_matcher.find(transcript['text'] or "")]
+    tokens, starts = [], []
+    for word in words:
+        for token in tokenize(word['text']):
+            tokens.append(token)
+            starts.append(word['start'] / 1000)
+    return [(match, starts[match.start]) for match in distress_matcher.find_tokens(tokens)]
+
+def alert_recipients():
+    return [address.strip() for address in recipient_email.split(",") if address.strip()]
+
+def alert_channels():
+    """Where SOS alerts go: email to every recipient over one SMTP connection, plus any webhooks."""
+    channels = [EmailChannel(SMTP_HOST, SMTP_PORT, email_username, email_password, alert_recipients())]
+    return channels + [WebhookChannel(url) for url in ALERT_WEBHOOK_URLS]
 
-    subject = "🚨 SOS Alert: Distress Detected!"
+def session_alert_dispatcher():
+    """This session's alert dispatcher. It outlives each recording, so repeat suppression and the SMTP
+       connection carry over when recording restarts; it is replaced only when the alert settings change."""
+    settings = (email_username, email_password, tuple(alert_recipients()), tuple(ALERT_WEBHOOK_URLS))
+    dispatcher = st.session_state.get("alert_dispatcher")
+    if dispatcher is not None and st.session_state.get("alert_settings") == settings:
+        return dispatcher
+    if dispatcher is not None:
+        dispatcher.close(timeout=0)  # its queued alerts still go out in the background
+    dispatcher = AlertDispatcher(alert_channels(), suppression_seconds=ALERT_SUPPRESSION_SECONDS,
+                                 on_result=report_alert, thread_hook=add_script_run_ctx)
+    st.session_state["alert_dispatcher"] = dispatcher
+    st.session_state["alert_settings"] = settings
+    return dispatcher
+
+def send_alert(transcript_text, severity, keywords):
+    """Queue an SOS alert with the transcript text; it is delivered in the background."""
     body = f"A distress keyword was detected in a recent transcription:\n\n{transcript_text}"
-    msg = MIMEText(body)
-    msg["Subject"] = subject
-    msg["From"] = email_username
-    msg["To"] = recipient_email
-
-    try:
-        with smtplib.SMTP("smtp.gmail.com", 587) as server:
-            server.starttls()
-            server.login(email_username, email_password)
-            server.sendmail(email_username, recipient_email, msg.as_string())
-        st.success("✅ SOS Alert email sent successfully!")
-    except Exception as e:
-        st.error(f"❌ Failed to send email: {e}")
-
-def process_audio_chunk(audio_chunk):
-    """Process a single audio chunk: save, transcribe, detect distress, and send an alert if needed."""
+    alert = Alert("🚨 SOS Alert: Distress Detected!", body, severity, key=", ".join(sorted(keywords)))
+    if alert_dispatcher.dispatch(alert):
+        st.info("📨 SOS alert queued for delivery.")
+    else:
+        st.info(f"SOS alert for \"{alert.key}\" was already sent in the last {ALERT_SUPPRESSION_SECONDS // 60} minutes.")
+
+def report_alert(alert, channel, latency, error):
+    """Show the outcome of an alert delivery (runs on the dispatcher's worker)."""
+    if error is None:
+        st.success(f"✅ SOS Alert sent via {channel} ({latency:.1f}s after detection)!")
+    else:
+        st.error(f"❌ Failed to send SOS alert via {channel}: {error}")
+
+def upload_stage(window):
+    """Pipeline stage: encode an audio window and upload it, returning (window start, audio URL)."""
+    audio_data = encode_audio_chunk(window)
+    if not window.intact():
+        raise RuntimeError("audio was overwritten in the capture buffer before it was encoded")
+    return window.start_seconds, upload_audio(audio_data)
+
+def transcribe_stage(uploaded):
+    """Pipeline stage: request a transcription and wait for it."""
+    start_seconds, audio_url = uploaded
+    transcript_id = request_transcription(audio_url)
+    return start_seconds, wait_for_transcription(transcript_id)
+
+def detect_stage(transcribed):
+    """Pipeline stage: show the transcription and send an alert for distress keywords not already
+       reported from the overlapping previous chunk."""
     global stop_due_to_distress
-    save_audio_chunk(audio_chunk)
-    try:
-        audio_url = upload_audio(AUDIO_FILENAME)
-        transcript_id = request_transcription(audio_url)
-        transcript_text = poll_transcription(transcript_id)
-        st.markdown(f"### 📝 Chunk Transcription:\n{transcript_text}")
-        if contains_distress(transcript_text):
-            st.warning("🚨 Distress keywords detected! Sending SOS alert message.")
-            send_alert_email(transcript_text)
-            stop_due_to_distress = True
-    except Exception as e:
-        st.error(f"❌ Error processing audio chunk: {e}")
+    start_seconds, transcript = transcribed
+    transcript_text = transcript['text'] or ""
+    st.markdown(f"### 📝 Chunk Transcription:\n{transcript_text}")
+    matches = distress_matches(transcript)
+    new = [match for match, at in matches
+           if at is None or match_deduplicator.first_report(match.keyword.phrase, start_seconds + at)]
+    weight, severity = distress_matcher.score(new)
+    if new and weight >= DISTRESS_ALERT_WEIGHT:
+        heard = sorted({match.keyword.phrase + (" (approximate)" if match.fuzzy else "") for match in new})
+        st.error(f"🚨 Detected distress keyword ({severity}): {', '.join(heard)}")
+        st.warning("🚨 Distress keywords detected! Sending SOS alert message.")
+        send_alert(transcript_text, severity, {match.keyword.phrase for match in new})
+        stop_due_to_distress = True
+    elif new:
+        st.info(f"Possible distress keywords, below the alert weight: {', '.join(m.keyword.phrase for m in new)}")
+    elif matches:
+        st.info("Distress keywords in the overlap were already reported from the previous chunk.")
+    return transcript_text
+
+def report_latency(chunk, latency):
+    """Show how long a chunk took from the end of its capture to detection."""
+    stages = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in chunk.stage_seconds.items())
+    st.caption(f"⏱️ Chunk {chunk.seq}: {latency:.1f}s from capture to detection ({stages})")
+
+def report_error(chunk, stage, error):
+    if isinstance(error, TranscriptCancelled):
+        return  # recording stopped while the chunk was being transcribed
+    st.error(f"❌ Error processing audio chunk {chunk.seq} ({stage}): {error}")
 
 def continuous_recording():
-    """Continuously record audio in CHUNK_DURATION segments and process each chunk.
+    """Continuously record audio and hand overlapping CHUNK_DURATION windows to the processing pipeline.
+       The microphone keeps recording while earlier chunks are uploaded and transcribed.
        Automatically stop if a distress keyword is detected."""
-    global recording, stop_due_to_distress
+    global recording, stop_due_to_distress, match_deduplicator, alert_dispatcher
     st.info("🎤 Continuous Recording Started...")
     recording = True
     stop_due_to_distress = False
+    recording_stopped.clear()
+    match_deduplicator = MatchDeduplicator()
+    alert_dispatcher = session_alert_dispatcher()
+    alerts_before = alert_dispatcher.stats()
 
-    audio_buffer = []  # buffer for audio chunks
-    start_time = time.time()
+    window_frames = int(CHUNK_DURATION * SAMPLE_RATE)
+    hop_frames = int((CHUNK_DURATION - CHUNK_OVERLAP) * SAMPLE_RATE)
+    ring = AudioRingBuffer(RING_SECONDS * SAMPLE_RATE, CHANNELS, max_window=window_frames)
+    windows = WindowSlicer(ring, SAMPLE_RATE, window_frames, hop_frames)
 
-    # Callback to collect audio data
+    # Callback to collect audio data: copied straight into the preallocated ring buffer
     def audio_callback(indata, frames, time_info, status):
-        audio_buffer.append(indata.copy())
+        ring.write(indata)
+
+    # One worker, so the gate sees chunks in capture order (its noise floor and hangover carry over)
+    voice_gate = VoiceActivityGate(SAMPLE_RATE, margin_db=VAD_MARGIN_DB, hop_seconds=CHUNK_DURATION - CHUNK_OVERLAP)
+    pipeline = SOSPipeline(
+        [("vad", voice_gate, 1),
+         ("upload", upload_stage, UPLOAD_WORKERS),
+         ("transcribe", transcribe_stage, TRANSCRIBE_WORKERS),
+         ("detect", detect_stage, DETECT_WORKERS)],
+        on_result=report_latency,
+        on_error=report_error,
+        thread_hook=add_script_run_ctx,
+    )
 
     stream = sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, callback=audio_callback)
     stream.start()
 
-    while recording:
-        if time.time() - start_time >= CHUNK_DURATION:
-            stream.stop()
-            if audio_buffer:
-                chunk_data = np.concatenate(audio_buffer, axis=0)
-                st.info("Processing audio chunk...")
-                process_audio_chunk(chunk_data)
-                audio_buffer.clear()
-                start_time = time.time()
-            # If distress was detected, stop recording automatically.
-            if stop_due_to_distress:
-                st.warning("⛔ Distress detected! Stopping continuous recording.")
-                recording = False
-                break
-            stream.start()  # Resume recording
+    while recording and not stop_due_to_distress:
+        time.sleep(0.1)
+        window = windows.next_window()
+        while window is not None:
+            pipeline.submit(window, captured_at=time.monotonic())
+            window = windows.next_window()
+
+    # If distress was detected, stop recording automatically.
+    if stop_due_to_distress:
+        st.warning("⛔ Distress detected! Stopping continuous recording.")
+        recording = False
 
     stream.stop()
     stream.close()
-    st.info("🛑 Continuous Recording Stopped.")
+    recording_stopped.set()
+    pipeline.close()
+
+    stats = pipeline.stats()
+    summary = (f"{stats['completed']} chunks processed, {stats['skipped']} skipped as silence "
+               f"({voice_gate.skip_ratio:.0%} of chunks not uploaded), "
+               f"{stats['dropped'] + windows.overruns} dropped while the pipeline was backed up")
+    if "latency_s" in stats:
+        summary += (f"; capture-to-detection latency p50 {stats['latency_s']['p50']:.1f}s, "
+                    f"p95 {stats['latency_s']['p95']:.1f}s")
+    alerts = alert_dispatcher.stats()
+    queued = alerts["enqueued"] - alerts_before["enqueued"]
+    suppressed = alerts["suppressed"] - alerts_before["suppressed"]
+    if queued or suppressed:
+        summary += f"; {queued} SOS alerts queued, {suppressed} repeats suppressed"
+    st.info(f"🛑 Continuous Recording Stopped. {summary}.")
 
 # --- Button Section ---
 st.markdown('<div class="section"><h3>Control Panel</h3></div>', unsafe_allow_html=True)
@@ -213,5 +316,7 @@ if st.button("🎙️ Start Passive SOS", key="start"):
     if not (email_username and email_password and recipient_email):
         st.warning("⚠️ Please fill in all email credentials before starting.")
     else:
-        Thread(target=continuous_recording).start()
+        recording_thread = Thread(target=continuous_recording)
+        add_script_run_ctx(recording_thread)
+        recording_thread.start()
 
@@ -0,0 +1,199 @@
+"""Local stand-in for the AssemblyAI upload and transcript endpoints.
+
+Accepts uploads, queues transcription jobs that complete after a random
+processing time (log-normal around --latency seconds), answers status polls,
+and when a request names a webhook_url, calls it back on completion with the
+requested auth header, like the real service. Jobs can be made to stall
+(never complete) or fail, to exercise deadlines and error handling.
+
+    python benchmarks/assemblyai_stub.py --port 8790 --text "please help me"
+
+and point app.py's ASSEMBLYAI_UPLOAD_URL at http://127.0.0.1:8790/v2/upload and
+ASSEMBLYAI_TRANSCRIPT_URL at http://127.0.0.1:8790/v2/transcript.
+"""
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORD_SECONDS = 0.35  # spacing of the synthesized word timings
+
+
+class Job:
+    __slots__ = ("id", "audio_url", "ready_at", "outcome", "text", "webhook")
+
+    def __init__(self, id, audio_url, ready_at, outcome, text, webhook):
+        self.id = id
+        self.audio_url = audio_url
+        self.ready_at = ready_at
+        self.outcome = outcome  # "completed", "error" or "stalled"
+        self.text = text
+        self.webhook = webhook  # (url, header name, header value) or None
+
+
+class AssemblyAIStub:
+    """Threaded HTTP server answering AssemblyAI-shaped upload and transcript requests.
+
+    latency is the median processing time in seconds (spread log-normally by
+    latency_sigma); texts are handed out to jobs in turn. stall_rate and
+    error_rate are the shares of jobs that never complete or end in an error.
+    Counters: uploads, upload_bytes, transcripts, polls and callbacks.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=1.5, latency_sigma=0.4, texts=("I am fine, thanks.",),
+                 stall_rate=0.0, error_rate=0.0, callback_delay=0.0, seed=0):
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.texts = itertools.cycle(texts)
+        self.stall_rate = stall_rate
+        self.error_rate = error_rate
+        self.callback_delay = callback_delay
+        self.jobs = {}
+        self.uploads = self.upload_bytes = self.transcripts = self.polls = self.callbacks = 0
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub._handle(self, "GET")
+
+            def do_POST(self):
+                stub._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handle(self, handler, method):
+        length = int(handler.headers.get("Content-Length") or 0)
+        body = handler.rfile.read(length)
+        if not handler.headers.get("authorization"):
+            self._send(handler, 401, {"error": "Authentication error, API token missing/invalid"})
+            return
+
+        path = handler.path.split("?")[0]
+        if method == "POST" and path == "/v2/upload":
+            with self._lock:
+                self.uploads += 1
+                self.upload_bytes += len(body)
+                number = self.uploads
+            self._send(handler, 200, {"upload_url": f"{self.url}/files/{number}"})
+        elif method == "POST" and path == "/v2/transcript":
+            self._send(handler, 200, self.create(json.loads(body)))
+        elif method == "GET" and path.startswith("/v2/transcript/"):
+            with self._lock:
+                self.polls += 1
+            job = self.jobs.get(path.rsplit("/", 1)[1])
+            if job is None:
+                self._send(handler, 404, {"error": "Transcript not found"})
+            else:
+                self._send(handler, 200, self.transcript(job))
+        else:
+            self._send(handler, 404, {"error": f"unknown endpoint {method} {path}"})
+
+    def _send(self, handler, status, body):
+        data = json.dumps(body).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def create(self, request):
+        with self._lock:
+            roll = self._rng.random()
+            outcome = "stalled" if roll < self.stall_rate else "error" if roll < self.stall_rate + self.error_rate \
+                else "completed"
+            delay = self._rng.lognormvariate(0, self.latency_sigma) * self.latency
+            webhook = None
+            if request.get("webhook_url"):
+                webhook = (request["webhook_url"], request.get("webhook_auth_header_name"),
+                           request.get("webhook_auth_header_value"))
+            job = Job(f"stub-{next(self._ids)}", request["audio_url"],
+                      float("inf") if outcome == "stalled" else time.monotonic() + delay, outcome, next(self.texts),
+                      webhook)
+            self.jobs[job.id] = job
+            self.transcripts += 1
+        if job.webhook and outcome != "stalled":
+            timer = threading.Timer(delay + self.callback_delay, self._call_back, args=(job,))
+            timer.daemon = True
+            timer.start()
+        return {"id": job.id, "status": "queued", "audio_url": job.audio_url}
+
+    def transcript(self, job):
+        if time.monotonic() < job.ready_at:
+            return {"id": job.id, "status": "processing", "text": None, "words": None}
+        if job.outcome == "error":
+            return {"id": job.id, "status": "error", "error": "Transcoding failed (stub)"}
+        words = [{"text": word, "start": int(i * WORD_SECONDS * 1000), "end": int((i + 0.8) * WORD_SECONDS * 1000),
+                  "confidence": 0.95} for i, word in enumerate(job.text.split())]
+        return {"id": job.id, "status": "completed", "text": job.text, "words": words}
+
+    def _call_back(self, job):
+        url, header, value = job.webhook
+        status = "error" if job.outcome == "error" else "completed"
+        request = urllib.request.Request(url, json.dumps({"transcript_id": job.id, "status": status}).encode(),
+                                         {"Content-Type": "application/json", **({header: value} if header else {})})
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                pass
+            with self._lock:
+                self.callbacks += 1
+        except OSError:
+            pass  # like the real service, a failed callback is not retried here
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency", type=float, default=1.5, help="Median processing time in seconds")
+    parser.add_argument("--text", action="append", help="Transcript text (repeat to rotate several)")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Share of jobs that never complete")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of jobs that fail")
+    args = parser.parse_args()
+
+    stub = AssemblyAIStub(args.host, args.port, latency=args.latency, texts=args.text or ("I am fine, thanks.",),
+                          stall_rate=args.stall_rate, error_rate=args.error_rate).start()
+    print(f"AssemblyAI stub listening on {stub.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark of SOS alert delivery against the local SMTP stand-in.
+
+Compares the previous approach (a new SMTP connection and login per alert,
+on the detecting thread) with AlertDispatcher (queued, one persistent
+connection), reporting how long the caller is blocked and the
+enqueue-to-delivery latency. Then checks suppression of repeated
+detections, escalation past it, and reconnecting after the server hangs up.
+
+    python benchmarks/bench_alerts.py --alerts 30 --reply-delay 0.02
+"""
+import argparse
+import os
+import smtplib
+import sys
+import time
+from email.mime.text import MIMEText
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from passive_sos.alerts import Alert, AlertDispatcher, EmailChannel  # noqa: E402
+from smtp_stub import SMTPStub  # noqa: E402
+
+USERNAME, PASSWORD = "sos@example.com", "app-password"
+RECIPIENTS = ["first@example.com", "second@example.com", "third@example.com"]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))] if values else float("nan")
+
+
+def summary(name, blocked, latencies, stub):
+    return (f"{name:<24} caller blocked p50 {percentile(blocked, 50) * 1000:7.2f} ms   "
+            f"delivered p50 {percentile(latencies, 50) * 1000:7.1f} ms  p95 {percentile(latencies, 95) * 1000:7.1f} ms   "
+            f"connections {stub.connections}  logins {stub.logins}")
+
+
+def legacy(stub, count):
+    """The previous send_alert_email: connect, log in and send on the caller's thread, per alert."""
+    host, port = stub.address
+    blocked, latencies = [], []
+    for i in range(count):
+        started = time.monotonic()
+        message = MIMEText(f"alert-{i:04d}")
+        message["Subject"], message["From"], message["To"] = "SOS", USERNAME, ", ".join(RECIPIENTS)
+        with smtplib.SMTP(host, port) as server:
+            server.login(USERNAME, PASSWORD)
+            server.sendmail(USERNAME, RECIPIENTS, message.as_string())
+        blocked.append(time.monotonic() - started)
+        latencies.append(stub.messages[-1].received_at - started)
+    return blocked, latencies
+
+
+def dispatched(stub, count, interval, suppression=0):
+    channel = EmailChannel(*stub.address, USERNAME, PASSWORD, RECIPIENTS, starttls=False)
+    dispatcher = AlertDispatcher([channel], suppression_seconds=suppression)
+    first = len(stub.messages)
+    blocked, alerts = [], []
+    for i in range(count):
+        alert = Alert("SOS", f"alert-{i:04d}", key=f"alert {i}")
+        started = time.monotonic()
+        dispatcher.dispatch(alert)
+        blocked.append(time.monotonic() - started)
+        alerts.append(alert)
+        time.sleep(interval)
+    dispatcher.close(timeout=30)
+    latencies = [next(m.received_at for m in stub.messages[first:] if a.body in m.data) - a.created_at
+                 for a in alerts]
+    return blocked, latencies, dispatcher.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--alerts", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.25, help="Seconds between alerts")
+    parser.add_argument("--reply-delay", type=float, default=0.02, help="Stand-in server round trip, seconds")
+    args = parser.parse_args()
+
+    print(f"{args.alerts} alerts to {len(RECIPIENTS)} recipients, server round trip {args.reply_delay * 1000:.0f} ms")
+    with SMTPStub(username=USERNAME, password=PASSWORD, reply_delay=args.reply_delay) as stub:
+        print(summary("new connection per alert", *legacy(stub, args.alerts), stub))
+    with SMTPStub(username=USERNAME, password=PASSWORD, reply_delay=args.reply_delay) as stub:
+        blocked, latencies, _ = dispatched(stub, args.alerts, args.interval)
+        print(summary(f"dispatcher, every {args.interval}s", blocked, latencies, stub))
+    with SMTPStub(username=USERNAME, password=PASSWORD, reply_delay=args.reply_delay) as stub:
+        blocked, latencies, stats = dispatched(stub, args.alerts, 0)
+        print(summary("dispatcher, burst", blocked, latencies, stub) + f"   emails {len(stub.messages)}")
+
+    with SMTPStub(username=USERNAME, password=PASSWORD) as stub:
+        channel = EmailChannel(*stub.address, USERNAME, PASSWORD, RECIPIENTS, starttls=False)
+        dispatcher = AlertDispatcher([channel], suppression_seconds=60)
+        for severity in ["high"] * 10 + ["critical"] * 5:
+            dispatcher.dispatch(Alert("SOS", "help", severity, key="help"))
+        dispatcher.close(timeout=10)
+        stats = dispatcher.stats()
+        print(f"15 repeated detections (10 high, then 5 critical): {stats['enqueued']} alerts sent "
+              f"in {len(stub.messages)} emails, {stats['suppressed']} suppressed")
+
+    with SMTPStub(username=USERNAME, password=PASSWORD, drop_after=3) as stub:
+        _, latencies, stats = dispatched(stub, 10, 0.05)
+        print(f"server hanging up every 3 messages: {stats['delivered']}/10 delivered, {stats['failed']} failed, "
+              f"{stub.connections} connections")
+
+
+if __name__ == "__main__":
+    main()
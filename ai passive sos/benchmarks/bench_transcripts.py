@@ -0,0 +1,81 @@
+"""Benchmark of transcript completion: fixed polling vs adaptive polling vs webhook callbacks.
+
+Runs transcription jobs against the local AssemblyAI stand-in and measures
+how long after a transcript is ready each mode notices it (the detection
+latency the waiting adds) and how many status requests it makes. Also
+checks that a stalled job hits the deadline and that cancellation is prompt.
+
+    python benchmarks/bench_transcripts.py --jobs 60 --concurrency 6 --latency 1.5
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from assemblyai_stub import AssemblyAIStub  # noqa: E402
+from passive_sos.transcripts import (TranscriptCancelled, TranscriptClient, TranscriptTimeout,  # noqa: E402
+                                     WebhookReceiver)
+
+
+def run_jobs(stub, client, jobs, concurrency):
+    def one(i):
+        transcript_id = client.request(f"{stub.url}/files/{i}")
+        client.wait(transcript_id)
+        return time.monotonic() - stub.jobs[transcript_id].ready_at
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return sorted(pool.map(one, range(jobs)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=1.5, help="Median stub processing time in seconds")
+    args = parser.parse_args()
+
+    with AssemblyAIStub(latency=args.latency) as stub:
+        receiver = WebhookReceiver(host="127.0.0.1").start()
+        transcript_url = stub.url + "/v2/transcript"
+        modes = [
+            ("fixed 3s (previous)", TranscriptClient("stub", transcript_url, initial_interval=3, backoff=1)),
+            ("adaptive polling", TranscriptClient("stub", transcript_url)),
+            ("webhook", TranscriptClient("stub", transcript_url, receiver=receiver)),
+        ]
+
+        print(f"{args.jobs} jobs, {args.concurrency} at a time, median processing {args.latency}s")
+        print(f"{'mode':<20} {'added latency mean':>19} {'p50':>7} {'p95':>7} {'max':>7} {'GETs/job':>9}")
+        for name, client in modes:
+            polls_before = stub.polls
+            added = run_jobs(stub, client, args.jobs, args.concurrency)
+            print(f"{name:<20} {statistics.mean(added):>18.3f}s {added[len(added) // 2]:>6.3f}s "
+                  f"{added[int(0.95 * (len(added) - 1))]:>6.3f}s {added[-1]:>6.3f}s "
+                  f"{(stub.polls - polls_before) / args.jobs:>9.1f}")
+
+        stub.stall_rate = 1.0
+        for name, client in modes[1:]:
+            started = time.monotonic()
+            try:
+                client.wait(client.request(f"{stub.url}/files/stalled"), timeout=2)
+            except TranscriptTimeout:
+                print(f"{name}: stalled job timed out after {time.monotonic() - started:.2f}s (deadline 2s)")
+
+            cancel = threading.Event()
+            threading.Timer(0.5, cancel.set).start()
+            started = time.monotonic()
+            try:
+                client.wait(client.request(f"{stub.url}/files/stalled"), cancel=cancel)
+            except TranscriptCancelled:
+                print(f"{name}: cancelled {time.monotonic() - started - 0.5:.3f}s after the stop was requested")
+        receiver.stop()
+
+
+if __name__ == "__main__":
+    main()
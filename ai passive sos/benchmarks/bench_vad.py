@@ -0,0 +1,195 @@
+"""Replay benchmark of the voice activity gate: upload bandwidth saved versus detection recall.
+
+Replays audio through VoiceActivityGate in overlapping chunks, as the app cuts
+them (CHUNK_DURATION long, every CHUNK_DURATION - CHUNK_OVERLAP seconds), for a
+sweep of margins, and reports the share of chunks (and encoded bytes) that
+would not be uploaded against the share of speech chunks, and of chunks with a
+distress call, that still reach transcription.
+
+By default the audio is a synthetic, labelled recording of a room: drifting
+background noise, a fan, knocks, and speech-like bursts at levels from
+mumbling to shouting, some of them marked as distress calls. Real recordings
+can be replayed instead, with Audacity label tracks (start, end, text per
+line; text containing "distress" or "help" marks a distress call):
+
+    python benchmarks/bench_vad.py --minutes 30
+    python benchmarks/bench_vad.py --wav night.wav --labels night.txt
+"""
+import argparse
+import math
+import os
+import sys
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passive_sos import AudioEncoder, VoiceActivityGate  # noqa: E402
+
+SAMPLE_RATE = 44100
+CHUNK_DURATION = 5             # seconds, as in app.py
+CHUNK_OVERLAP = 1.5            # seconds each chunk shares with the previous one, as in app.py
+HOP_SECONDS = CHUNK_DURATION - CHUNK_OVERLAP
+SPEECH_CHUNK_SECONDS = 0.3     # a chunk with at least this much labelled speech should be transcribed
+MARGINS_DB = (3, 6, 9, 12, 15)
+DISTRESS_LABELS = ("distress", "help")
+
+
+def synthetic_events(minutes, rng):
+    """Labelled (start_s, end_s, level_dbfs, distress) speech events, talking about a seventh of the time."""
+    events = []
+    t = rng.uniform(5, 40)
+    while t < minutes * 60:
+        duration = rng.uniform(0.8, 12)
+        distress = rng.random() < 0.25
+        level = rng.uniform(-44, -12) if distress else rng.uniform(-56, -18)
+        events.append((t, t + duration, level, distress))
+        t += duration + rng.exponential(40)
+    return events
+
+
+def noise_level_db(t):
+    """Background level drifting over ten minutes, with a louder stretch (a TV) every half hour."""
+    level = -58 + 5 * math.sin(2 * math.pi * t / 600)
+    return level + (10 if (t % 1800) > 1500 else 0)
+
+
+def render_block(start, events, knocks, rng):
+    """CHUNK_DURATION seconds of synthetic room audio starting at start seconds."""
+    n = int(SAMPLE_RATE * CHUNK_DURATION)
+    t = start + np.arange(n) / SAMPLE_RATE
+
+    white = rng.standard_normal(n)
+    brown = np.cumsum(white) * 0.02
+    brown -= np.convolve(brown, np.ones(256) / 256, mode="same")  # drop the drift, keep the low rumble
+    noise = 0.7 * white + brown
+    noise *= 10 ** (noise_level_db(start) / 20) / max(noise.std(), 1e-9)
+    audio = noise + 10 ** (-62 / 20) * np.sin(2 * np.pi * 120 * t)  # fan hum
+
+    for at in knocks[(knocks >= start - 0.5) & (knocks < start + CHUNK_DURATION)]:
+        i = int((at - start) * SAMPLE_RATE)
+        if 0 <= i < n:
+            tail = min(n - i, SAMPLE_RATE // 20)
+            audio[i:i + tail] += 0.3 * rng.standard_normal(tail) * np.exp(-np.arange(tail) / (SAMPLE_RATE * 0.008))
+
+    for begin, end, level, _ in events:
+        if end <= start or begin >= start + CHUNK_DURATION:
+            continue
+        sl = slice(max(0, int((begin - start) * SAMPLE_RATE)), min(n, int((end - start) * SAMPLE_RATE)))
+        ts = t[sl]
+        f0 = 110 + 90 * ((begin * 7.3) % 1)
+        phase = 2 * np.pi * (f0 * ts - 8 / (2 * np.pi * 5) * np.cos(2 * np.pi * 5 * ts))  # 8 Hz vibrato
+        voiced = sum(np.sin(h * phase) / h for h in range(1, int(3500 / f0)))
+        syllables = np.clip(np.sin(2 * np.pi * 4.1 * (ts - begin)), 0, 1) ** 0.7
+        fricative = np.diff(rng.standard_normal(len(ts) + 1)) * (syllables < 0.15) * 0.25
+        speech = voiced * syllables + fricative
+        speech *= 10 ** (level / 20) / max(np.sqrt(np.mean(speech ** 2)), 1e-9)
+        audio[sl] += speech
+
+    return np.clip(audio, -1, 1).astype(np.float32)
+
+
+def synthetic_recording(minutes, seed):
+    """(mono float audio, labels) of a synthetic room recording."""
+    rng = np.random.default_rng(seed)
+    events = synthetic_events(minutes, rng)
+    knocks = np.sort(rng.uniform(0, minutes * 60, int(minutes * 2)))
+    blocks = [render_block(index * CHUNK_DURATION, events, knocks, rng)
+              for index in range(int(minutes * 60 // CHUNK_DURATION))]
+    return np.concatenate(blocks), [(begin, end, distress) for begin, end, _, distress in events]
+
+
+def overlapping_chunks(audio, sample_rate):
+    """CHUNK_DURATION windows every HOP_SECONDS, as the app's WindowSlicer cuts them (views, no copies)."""
+    size, hop = int(sample_rate * CHUNK_DURATION), int(sample_rate * HOP_SECONDS)
+    return [audio[i:i + size] for i in range(0, len(audio) - size + 1, hop)]
+
+
+def read_wav(path):
+    """Mono float audio of a 16-bit PCM WAV file, and its sample rate."""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise SystemExit(f"{path}: only 16-bit PCM WAV files are supported")
+        rate, channels = f.getframerate(), f.getnchannels()
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2").reshape(-1, channels).mean(axis=1) / 32768
+    return audio.astype(np.float32), rate
+
+
+def read_labels(path):
+    labels = []
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2 and not line.startswith("\\"):
+                text = fields[2].lower() if len(fields) > 2 else ""
+                labels.append((float(fields[0]), float(fields[1]), any(word in text for word in DISTRESS_LABELS)))
+    return labels
+
+
+def chunk_truth(count, labels):
+    """Per chunk: (has speech, has a distress call)."""
+    truth = []
+    for index in range(count):
+        start = index * HOP_SECONDS
+        end = start + CHUNK_DURATION
+        overlap = [(min(end, e) - max(start, b), distress) for b, e, distress in labels if b < end and e > start]
+        truth.append((sum(seconds for seconds, _ in overlap) >= SPEECH_CHUNK_SECONDS,
+                      any(distress and seconds >= SPEECH_CHUNK_SECONDS for seconds, distress in overlap)))
+    return truth
+
+
+def replay(chunks, sample_rate, margin_db):
+    gate = VoiceActivityGate(sample_rate, margin_db=margin_db, hop_seconds=HOP_SECONDS)
+    started = time.perf_counter()
+    passed = [gate.is_voice(chunk) for chunk in chunks]
+    return passed, (time.perf_counter() - started) / max(1, len(chunks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=30, help="Length of the synthetic recording")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--wav", help="Replay this 16-bit WAV recording instead")
+    parser.add_argument("--labels", help="Audacity label track of the speech in --wav")
+    parser.add_argument("--codec", choices=("wav", "flac"), default="flac", help="Upload encoding for byte counts")
+    args = parser.parse_args()
+
+    if args.wav:
+        audio, sample_rate = read_wav(args.wav)
+        labels = read_labels(args.labels) if args.labels else None
+    else:
+        sample_rate = SAMPLE_RATE
+        audio, labels = synthetic_recording(args.minutes, args.seed)
+    chunks = overlapping_chunks(audio, sample_rate)
+    truth = chunk_truth(len(chunks), labels) if labels is not None else None
+
+    encoder = AudioEncoder(sample_rate, max_seconds=CHUNK_DURATION + 1)
+    sizes = np.array([len(encoder.encode(chunk, args.codec)[0]) for chunk in chunks])
+
+    print(f"{len(chunks)} chunks of {CHUNK_DURATION}s every {HOP_SECONDS:g}s at {sample_rate} Hz, "
+          f"{sizes.sum() / 1e6:.1f} MB as {args.codec}")
+    if truth:
+        print(f"  labelled: {sum(s for s, _ in truth)} speech chunks, {sum(d for _, d in truth)} with a distress call")
+    print(f"{'margin dB':>9} {'skipped':>8} {'MB sent':>8} {'saved':>6} {'speech recall':>14} "
+          f"{'distress recall':>16} {'silence sent':>13} {'ms/chunk':>9}")
+
+    for margin in MARGINS_DB:
+        passed, seconds_per_chunk = replay(chunks, sample_rate, margin)
+        passed = np.array(passed)
+        sent = sizes[passed].sum()
+        line = (f"{margin:>9} {1 - passed.mean():>8.1%} {sent / 1e6:>8.1f} {1 - sent / sizes.sum():>6.1%}")
+        if truth:
+            speech = np.array([s for s, _ in truth])
+            distress = np.array([d for _, d in truth])
+            recall = lambda mask: passed[mask].mean() if mask.any() else float("nan")  # noqa: E731
+            line += (f" {recall(speech):>14.1%} {recall(distress):>16.1%}"
+                     f" {passed[~speech].mean() if (~speech).any() else float('nan'):>13.1%}")
+        else:
+            line += f" {'-':>14} {'-':>16} {'-':>13}"
+        print(line + f" {seconds_per_chunk * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
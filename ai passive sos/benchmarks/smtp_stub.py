@@ -0,0 +1,175 @@
+"""Local SMTP stand-in that accepts and records mail.
+
+Speaks enough SMTP for smtplib (EHLO/HELO, AUTH PLAIN and LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT), without TLS, so alert delivery can be tested and
+timed offline. --reply-delay adds a round trip to every reply, to stand in
+for a remote server; --drop-after closes connections after that many
+messages, to exercise reconnecting.
+
+    python benchmarks/smtp_stub.py --port 8025
+"""
+import argparse
+import base64
+import socketserver
+import threading
+import time
+
+
+class Message:
+    __slots__ = ("sender", "recipients", "data", "received_at")
+
+    def __init__(self, sender, recipients, data, received_at):
+        self.sender = sender
+        self.recipients = recipients
+        self.data = data
+        self.received_at = received_at  # time.monotonic() when the message was accepted
+
+
+class SMTPStub:
+    """Threaded SMTP server keeping accepted messages in .messages.
+
+    With username set, AUTH must use that username and password. Counters:
+    connections and logins.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, username=None, password=None, reply_delay=0.0, drop_after=None):
+        self.username = username
+        self.password = password
+        self.reply_delay = reply_delay
+        self.drop_after = drop_after
+        self.messages = []
+        self.connections = 0
+        self.logins = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stub._session(self)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[:2]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _session(self, handler):
+        with self._lock:
+            self.connections += 1
+
+        def reply(line):
+            if self.reply_delay:
+                time.sleep(self.reply_delay)
+            handler.wfile.write(line.encode() + b"\r\n")
+
+        def read():
+            return handler.rfile.readline().decode("utf-8", "replace").rstrip("\r\n")
+
+        reply("220 smtp-stub ESMTP ready")
+        sender, recipients, sent = None, [], 0
+        while True:
+            line = read()
+            if not line:
+                return
+            command, _, argument = line.partition(" ")
+            command = command.upper()
+            if command == "EHLO":
+                handler.wfile.write(b"250-smtp-stub\r\n250-AUTH PLAIN LOGIN\r\n")
+                reply("250 8BITMIME")
+            elif command == "HELO":
+                reply("250 smtp-stub")
+            elif command == "AUTH":
+                mechanism, _, initial = argument.partition(" ")
+                if mechanism.upper() == "PLAIN":
+                    if not initial:
+                        reply("334 ")
+                        initial = read()
+                    _, username, password = base64.b64decode(initial).decode().split("\0")
+                else:
+                    reply("334 " + base64.b64encode(b"Username:").decode())
+                    username = base64.b64decode(read()).decode()
+                    reply("334 " + base64.b64encode(b"Password:").decode())
+                    password = base64.b64decode(read()).decode()
+                if self.username is None or (username, password) == (self.username, self.password):
+                    with self._lock:
+                        self.logins += 1
+                    reply("235 2.7.0 Accepted")
+                else:
+                    reply("535 5.7.8 Username and Password not accepted")
+            elif command == "MAIL":
+                sender, recipients = argument.partition(":")[2].strip().strip("<>"), []
+                reply("250 OK")
+            elif command == "RCPT":
+                recipients.append(argument.partition(":")[2].strip().strip("<>"))
+                reply("250 OK")
+            elif command == "DATA":
+                reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = read()
+                    if data_line == ".":
+                        break
+                    lines.append(data_line[1:] if data_line.startswith("..") else data_line)
+                with self._lock:
+                    self.messages.append(Message(sender, recipients, "\n".join(lines), time.monotonic()))
+                reply("250 OK: queued")
+                sent += 1
+                if self.drop_after and sent >= self.drop_after:
+                    return  # hang up without a goodbye, as an idle-timeout would
+            elif command == "RSET":
+                sender, recipients = None, []
+                reply("250 OK")
+            elif command == "NOOP":
+                reply("250 OK")
+            elif command == "QUIT":
+                reply("221 Bye")
+                return
+            else:
+                reply("502 Command not implemented")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--reply-delay", type=float, default=0.0, help="Seconds added to every reply")
+    parser.add_argument("--drop-after", type=int, help="Close connections after this many messages")
+    args = parser.parse_args()
+
+    stub = SMTPStub(args.host, args.port, reply_delay=args.reply_delay, drop_after=args.drop_after).start()
+    print(f"SMTP stub listening on {args.host}:{stub.address[1]}")
+    shown = 0
+    try:
+        while True:
+            time.sleep(1)
+            new = stub.messages[shown:]
+            shown += len(new)
+            for message in new:
+                print(f"mail from {message.sender} to {', '.join(message.recipients)}")
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""AI Passive SOS processing core: ring-buffer capture, processing pipeline, voice activity gate,
+in-memory audio encoding, transcript completion, distress keyword matching and alert dispatch.
+
+The Streamlit app in app.py wires these pieces to AssemblyAI and email.
+"""
+from .alerts import Alert, AlertDispatcher, EmailChannel, WebhookChannel
+from .capture import AudioRingBuffer, MatchDeduplicator, Window, WindowSlicer
+from .encoding import AudioEncoder, BufferReader, encode_flac, thread_encoder
+from .keywords import Keyword, KeywordMatcher, ReloadingMatcher, load_keywords, tokenize
+from .pipeline import Chunk, SOSPipeline
+from .transcripts import (TranscriptCancelled, TranscriptClient, TranscriptError, TranscriptTimeout,
+                          WebhookReceiver)
+from .vad import VoiceActivityGate, frame_features
+
+__all__ = [
+    "Alert",
+    "AlertDispatcher",
+    "AudioEncoder",
+    "AudioRingBuffer",
+    "BufferReader",
+    "Chunk",
+    "EmailChannel",
+    "Keyword",
+    "KeywordMatcher",
+    "MatchDeduplicator",
+    "ReloadingMatcher",
+    "SOSPipeline",
+    "TranscriptCancelled",
+    "TranscriptClient",
+    "TranscriptError",
+    "TranscriptTimeout",
+    "VoiceActivityGate",
+    "WebhookChannel",
+    "WebhookReceiver",
+    "Window",
+    "WindowSlicer",
+    "encode_flac",
+    "frame_features",
+    "load_keywords",
+    "thread_encoder",
+    "tokenize",
+]
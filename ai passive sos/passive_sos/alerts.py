@@ -0,0 +1,280 @@
+import heapq
+import itertools
+import json
+import logging
+import smtplib
+import threading
+import time
+from collections import deque
+from email.mime.text import MIMEText
+
+import requests
+
+from .keywords import SEVERITIES
+
+logger = logging.getLogger(__name__)
+
+ALERT_QUEUE_SIZE = 32            # alerts waiting per channel; beyond this the least urgent is dropped
+ALERT_BATCH_SIZE = 10            # alerts already waiting for a channel go out together as one message
+SUPPRESSION_SECONDS = 300        # the same alert is not sent again within this long...
+DELIVERY_ATTEMPTS = 3            # tries per alert and channel...
+RETRY_BACKOFF = 1.0              # ...waiting this long before the second, twice that before the third
+SMTP_TIMEOUT = 15                # seconds for SMTP connects and commands
+LATENCY_WINDOW = 200             # recent enqueue-to-delivery latencies kept per channel for stats
+WEBHOOK_TIMEOUT = 10
+
+
+class Alert:
+    """A distress alert: what to say, how urgent it is, and which earlier alerts count as the same one."""
+    __slots__ = ("subject", "body", "severity", "key", "created_at")
+
+    def __init__(self, subject, body, severity="high", key=None):
+        self.subject = subject
+        self.body = body
+        self.severity = severity
+        self.key = key if key is not None else subject
+        self.created_at = time.monotonic()
+
+    @property
+    def rank(self):
+        """Higher is more urgent."""
+        return SEVERITIES.index(self.severity) if self.severity in SEVERITIES else len(SEVERITIES) - 2
+
+
+def combine(alerts):
+    """Subject and body of one message carrying alerts (most urgent first)."""
+    if len(alerts) == 1:
+        return alerts[0].subject, alerts[0].body
+    subject = f"{alerts[0].subject} (+{len(alerts) - 1} more)"
+    return subject, "\n\n---\n\n".join(f"{alert.subject}\n\n{alert.body}" for alert in alerts)
+
+
+class EmailChannel:
+    """Sends alerts over one persistent, authenticated SMTP connection, to all recipients at once.
+
+    The connection (connect, STARTTLS, login) is opened on first use and kept;
+    if the server has dropped it, sending reconnects once and retries.
+    """
+
+    def __init__(self, host, port, username, password, recipients, sender=None, starttls=True,
+                 timeout=SMTP_TIMEOUT):
+        self.name = "email"
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.recipients = list(recipients)
+        self.sender = sender or username
+        self.starttls = starttls
+        self.timeout = timeout
+        self.connections = 0
+        self._smtp = None
+
+    def _connect(self):
+        self.close()
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.connections += 1
+
+    def send(self, alerts):
+        subject, body = combine(alerts)
+        message = MIMEText(body)
+        message["Subject"] = subject
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        data = message.as_string()
+
+        if self._smtp is None:
+            self._connect()
+        try:
+            refused = self._smtp.sendmail(self.sender, self.recipients, data)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            logger.info(f"SMTP connection to {self.host} was closed; reconnecting")
+            self._connect()
+            refused = self._smtp.sendmail(self.sender, self.recipients, data)
+        if refused:
+            logger.warning(f"SOS alert not accepted for {', '.join(refused)}")
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+
+class WebhookChannel:
+    """Posts alerts as JSON ({"text", "subject", "severity"}), e.g. to a chat incoming-webhook URL."""
+
+    def __init__(self, url, name=None, session=None):
+        self.name = name or f"webhook {url}"
+        self.url = url
+        self.session = session or requests.Session()
+
+    def send(self, alerts):
+        subject, body = combine(alerts)
+        payload = {"text": f"{subject}\n\n{body}", "subject": subject, "severity": alerts[0].severity}
+        response = self.session.post(self.url, data=json.dumps(payload), timeout=WEBHOOK_TIMEOUT,
+                                     headers={"Content-Type": "application/json"})
+        response.raise_for_status()
+
+    def close(self):
+        self.session.close()
+
+
+class _AlertQueue:
+    """Bounded priority queue: most urgent first, oldest first within a severity.
+
+    When full, a new alert evicts the least urgent queued one if it is more
+    urgent than that, and is itself dropped otherwise. Returns the dropped alert.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._heap = []
+        self._order = itertools.count()
+        self._ready = threading.Condition()
+
+    def put(self, alert):
+        with self._ready:
+            entry = (-alert.rank, next(self._order), alert)
+            dropped = None
+            if len(self._heap) >= self.maxsize:
+                worst = max(self._heap)
+                if entry >= worst:
+                    return alert
+                self._heap.remove(worst)
+                heapq.heapify(self._heap)
+                dropped = worst[2]
+            heapq.heappush(self._heap, entry)
+            self._ready.notify()
+            return dropped
+
+    def get(self, timeout, limit=1):
+        """Up to limit alerts, most urgent first; empty if none arrived within timeout."""
+        with self._ready:
+            if not self._heap:
+                self._ready.wait(timeout)
+            return [heapq.heappop(self._heap)[2] for _ in range(min(limit, len(self._heap)))]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class AlertDispatcher:
+    """Delivers alerts in the background so detection never waits on SMTP.
+
+    Every alert goes to every channel; each channel has its own worker and
+    bounded priority queue, so a slow or failing channel delays nobody else.
+    Alerts that pile up while a channel is busy are sent as one message.
+    An alert with the same key as one sent (or queued) less than
+    suppression_seconds ago is suppressed, unless it is more severe. Failed
+    deliveries are retried DELIVERY_ATTEMPTS times with backoff.
+
+    on_result(alert, channel_name, latency_s, error) runs on the channel's
+    worker after each delivery (error is None) or final failure; thread_hook
+    can prepare those worker threads.
+    """
+
+    def __init__(self, channels, queue_size=ALERT_QUEUE_SIZE, suppression_seconds=SUPPRESSION_SECONDS,
+                 on_result=None, thread_hook=None):
+        self.channels = list(channels)
+        self.suppression_seconds = suppression_seconds
+        self.on_result = on_result
+        self._queues = [_AlertQueue(queue_size) for _ in self.channels]
+        self._last_sent = {}  # key -> (monotonic time, rank)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._counters = dict.fromkeys(("enqueued", "suppressed", "dropped", "delivered", "failed"), 0)
+        self._latencies = {channel.name: deque(maxlen=LATENCY_WINDOW) for channel in self.channels}
+
+        self.threads = []
+        for channel, inbox in zip(self.channels, self._queues):
+            thread = threading.Thread(target=self._work, args=(channel, inbox), name=f"sos-alert-{channel.name}",
+                                      daemon=True)
+            if thread_hook:
+                thread_hook(thread)
+            thread.start()
+            self.threads.append(thread)
+
+    def dispatch(self, alert):
+        """Queue an alert for every channel; never blocks. False if it was suppressed."""
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_sent.get(alert.key)
+            if last and now - last[0] < self.suppression_seconds and alert.rank <= last[1]:
+                self._counters["suppressed"] += 1
+                return False
+            self._last_sent[alert.key] = (now, alert.rank)
+            self._counters["enqueued"] += 1
+        for inbox in self._queues:
+            dropped = inbox.put(alert)
+            if dropped is not None:
+                with self._lock:
+                    self._counters["dropped"] += 1
+                logger.warning(f"Alert queue full; dropped alert {dropped.subject!r}")
+        return True
+
+    def _work(self, channel, inbox):
+        while True:
+            alerts = inbox.get(timeout=0.1, limit=ALERT_BATCH_SIZE)
+            if not alerts:
+                if self._stop.is_set():
+                    break
+                continue
+            error = None
+            for attempt in range(DELIVERY_ATTEMPTS):
+                if attempt:
+                    time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+                try:
+                    channel.send(alerts)
+                    error = None
+                    break
+                except Exception as e:  # keep the worker alive whatever the channel raises
+                    error = e
+                    logger.warning(f"Sending alert via {channel.name} failed (attempt {attempt + 1}): {e}")
+
+            finished = time.monotonic()
+            for alert in alerts:
+                latency = finished - alert.created_at
+                with self._lock:
+                    self._counters["failed" if error else "delivered"] += 1
+                    if error:
+                        self._last_sent.pop(alert.key, None)  # a repeat of an alert that never went out is not noise
+                    else:
+                        self._latencies[channel.name].append(latency)
+                if self.on_result:
+                    try:
+                        self.on_result(alert, channel.name, latency, error)
+                    except Exception as e:
+                        logger.error(f"Error handling alert result: {e}")
+        channel.close()
+
+    def close(self, timeout=None):
+        """Deliver what is queued (waiting up to timeout seconds), then stop and close the channels."""
+        self._stop.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        """Counters and enqueue-to-delivery latency (seconds) per channel."""
+        with self._lock:
+            stats = dict(self._counters)
+            latencies = {name: sorted(values) for name, values in self._latencies.items()}
+        stats["queued"] = {channel.name: len(inbox) for channel, inbox in zip(self.channels, self._queues)}
+        stats["latency_s"] = {
+            name: {"p50": values[len(values) // 2], "p95": values[min(len(values) - 1, int(0.95 * len(values)))],
+                   "max": values[-1]}
+            for name, values in latencies.items() if values
+        }
+        return stats
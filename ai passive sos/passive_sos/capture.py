@@ -0,0 +1,157 @@
+import threading
+
+import numpy as np
+
+DEFAULT_RING_SECONDS = 60       # audio kept for windows still waiting in the pipeline
+MATCH_TOLERANCE_SECONDS = 1.0   # the same keyword this close in time is the same utterance
+MATCH_MEMORY_SECONDS = 60.0     # how long reported matches are remembered
+
+
+class AudioRingBuffer:
+    """Preallocated capture buffer written by the audio callback and read as zero-copy windows.
+
+    One producer (the sounddevice callback) and one consumer, no locks: the
+    producer copies a block in and then advances a frame counter, which the
+    consumer only reads. The first max_window frames are mirrored past the
+    end of the array, so every window of up to max_window frames is one
+    contiguous slice even when it wraps around.
+
+    A window is a view, not a copy: it is overwritten once capacity more
+    frames have been captured. Window.intact() says whether it still holds
+    the audio it was cut from.
+    """
+
+    def __init__(self, capacity, channels=1, max_window=None, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = channels
+        self.mirror = min(self.capacity, int(max_window or self.capacity))
+        self._buffer = np.zeros((self.capacity + self.mirror, channels), dtype=dtype)
+        self._writing = 0    # frames the producer has started writing
+        self.written = 0     # frames fully written and readable
+
+    def write(self, block):
+        """Append a block of captured frames (called from the audio callback).
+
+        Of a block longer than the ring only the last capacity frames are kept,
+        but the frame counter still advances past all of it.
+        """
+        dropped = max(0, len(block) - self.capacity)
+        block = block[dropped:]
+        n = len(block)
+        start = self.written + dropped
+        self._writing = start + n
+        slot = start % self.capacity
+        first = min(n, self.capacity - slot)
+        self._put(slot, block[:first])
+        if first < n:
+            self._put(0, block[first:])
+        self.written = start + n
+
+    def _put(self, slot, frames):
+        end = slot + len(frames)
+        self._buffer[slot:end] = frames
+        if slot < self.mirror:
+            mirrored = min(end, self.mirror)
+            self._buffer[self.capacity + slot:self.capacity + mirrored] = frames[:mirrored - slot]
+
+    def view(self, start, frames):
+        """Frames [start, start + frames) of the capture as a view (no copy)."""
+        if frames > self.mirror:
+            raise ValueError(f"window of {frames} frames is longer than the ring's max_window ({self.mirror})")
+        slot = start % self.capacity
+        return self._buffer[slot:slot + frames]
+
+    def intact(self, start):
+        """True while frame start has not been overwritten (or started to be)."""
+        return self._writing <= start + self.capacity
+
+
+class Window:
+    """A span of captured audio: a view into the ring buffer plus where it sits in the capture.
+
+    Behaves as an array (np.asarray(window) is the view), so pipeline stages
+    that expect audio can take it directly.
+    """
+    __slots__ = ("ring", "start", "data", "sample_rate")
+
+    def __init__(self, ring, start, frames, sample_rate):
+        self.ring = ring
+        self.start = start
+        self.data = ring.view(start, frames)
+        self.sample_rate = sample_rate
+
+    @property
+    def start_seconds(self):
+        """Seconds since capture began at which the window starts."""
+        return self.start / self.sample_rate
+
+    def intact(self):
+        return self.ring.intact(self.start)
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self.data, dtype=dtype)
+        return self.data if dtype is None else self.data.astype(dtype, copy=False)
+
+    def __len__(self):
+        return len(self.data)
+
+
+class WindowSlicer:
+    """Cuts overlapping windows of window_frames every hop_frames out of a ring buffer.
+
+    If the consumer falls so far behind that the next window has been
+    overwritten, it skips ahead to the oldest intact window (counted in
+    overruns) rather than returning corrupted audio.
+    """
+
+    def __init__(self, ring, sample_rate, window_frames, hop_frames):
+        if not 0 < hop_frames <= window_frames:
+            raise ValueError("hop must be positive and no longer than the window")
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.window_frames = int(window_frames)
+        self.hop_frames = int(hop_frames)
+        self.next_start = 0
+        self.overruns = 0
+
+    def next_window(self):
+        """The next complete window, or None until enough audio has been captured."""
+        written = self.ring.written
+        oldest = written - self.ring.capacity
+        if self.next_start < oldest:
+            skipped = -(-(oldest - self.next_start) // self.hop_frames)
+            self.next_start += skipped * self.hop_frames
+            self.overruns += skipped
+        if self.next_start + self.window_frames > written:
+            return None
+        window = Window(self.ring, self.next_start, self.window_frames, self.sample_rate)
+        self.next_start += self.hop_frames
+        return window
+
+
+class MatchDeduplicator:
+    """Drops keyword matches already reported from an overlapping window.
+
+    Speech in the overlap of two windows is transcribed twice, and the two
+    transcriptions may finish in either order; a match counts once per
+    keyword per utterance, judged by when in the capture it was spoken.
+    """
+
+    def __init__(self, tolerance=MATCH_TOLERANCE_SECONDS, memory=MATCH_MEMORY_SECONDS):
+        self.tolerance = tolerance
+        self.memory = memory
+        self._reported = []  # (capture seconds, keyword)
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def first_report(self, keyword, at):
+        """True if this is the first report of keyword spoken at capture time at (seconds)."""
+        with self._lock:
+            latest = max([at] + [seen for seen, _ in self._reported])
+            self._reported = [(seen, kw) for seen, kw in self._reported if seen >= latest - self.memory]
+            if any(kw == keyword and abs(seen - at) <= self.tolerance for seen, kw in self._reported):
+                self.duplicates += 1
+                return False
+            self._reported.append((at, keyword))
+            return True
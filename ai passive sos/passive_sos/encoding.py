@@ -0,0 +1,245 @@
+import io
+import struct
+import threading
+
+import numpy as np
+
+WAV_HEADER_BYTES = 44
+FLAC_BLOCK_SIZE = 4096           # samples per FLAC frame (the reference encoder's default)
+FLAC_MAX_FIXED_ORDER = 4
+FLAC_MAX_RICE_PARAMETER = 14     # 15 is the escape code
+DEFAULT_MAX_SECONDS = 10         # initial buffer capacity; grows if a longer chunk arrives
+
+CONTENT_TYPES = {"wav": "audio/wav", "flac": "audio/flac"}
+
+
+def _crc_table(poly, width):
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    table = []
+    for byte in range(256):
+        crc = byte << (width - 8)
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) if crc & top else crc << 1
+        table.append(crc & mask)
+    return table
+
+
+_CRC8_TABLE = _crc_table(0x07, 8)
+_CRC16_TABLE = _crc_table(0x8005, 16)
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def crc16(data):
+    crc = 0
+    table = _CRC16_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+
+def _bits(values, widths):
+    """Big-endian bit array (uint8 0/1) of each value written in its own width."""
+    values = np.asarray(values, dtype=np.int64)
+    widths = np.asarray(widths, dtype=np.int64)
+    owner = np.repeat(np.arange(len(values)), widths)
+    position = np.arange(int(widths.sum())) - np.repeat(np.cumsum(widths) - widths, widths)
+    shift = widths[owner] - 1 - position
+    return ((values[owner] >> shift) & 1).astype(np.uint8)
+
+
+def _utf8_number(n):
+    """FLAC's UTF-8-style variable length coding of frame numbers."""
+    if n < 0x80:
+        return bytes([n])
+    length = 2
+    while n >= 1 << (5 * length + 1):
+        length += 1
+    out = [0x80 | ((n >> (6 * i)) & 0x3F) for i in range(length - 1)][::-1]
+    lead = ((0xFF << (8 - length)) & 0xFF) | (n >> (6 * (length - 1)))
+    return bytes([lead] + out)
+
+
+def _subframe_header(kind):
+    """Zero pad bit, 6-bit subframe type, no wasted bits."""
+    return _bits([kind << 1], [8])
+
+
+def _subframe_bits(samples):
+    """One channel of a FLAC frame: constant, fixed-predictor with Rice-coded residuals, or verbatim."""
+    samples = samples.astype(np.int64)
+    n = len(samples)
+    if n and (samples == samples[0]).all():
+        return np.concatenate([_subframe_header(0b000000), _bits([samples[0] & 0xFFFF], [16])])
+
+    # Fixed predictors of order k are the k-th differences; keep the order with the smallest residuals
+    best = None
+    residual = samples
+    for order in range(min(FLAC_MAX_FIXED_ORDER, n - 1) + 1):
+        if order:
+            residual = np.diff(residual)
+        cost = np.abs(residual).sum()
+        if best is None or cost < best[0]:
+            best = (cost, order, residual)
+    _, order, residual = best
+
+    folded = np.where(residual >= 0, residual << 1, ((-residual) << 1) - 1)  # zigzag to unsigned
+    k, cost = _rice_parameter(folded)
+    if cost + 16 * order + 18 >= 16 * n:
+        return np.concatenate([_subframe_header(0b000001), _bits(samples & 0xFFFF, np.full(n, 16))])
+
+    return np.concatenate([
+        _subframe_header(0b001000 | order),
+        _bits(samples[:order] & 0xFFFF, np.full(order, 16)),   # warm-up samples
+        _bits([0, 0, k], [2, 4, 4]),                            # Rice coding, partition order 0, parameter
+        _rice_bits(folded, k),
+    ])
+
+
+def _rice_parameter(folded):
+    """Cheapest Rice parameter near log2 of the mean residual, with its cost in bits."""
+    guess = int(np.log2(max(float(folded.mean()), 1.0)))
+    best = None
+    for k in range(max(0, guess - 1), min(FLAC_MAX_RICE_PARAMETER, guess + 1) + 1):
+        cost = int((folded >> k).sum()) + len(folded) * (k + 1)
+        if best is None or cost < best[1]:
+            best = (k, cost)
+    return best
+
+
+def _rice_bits(folded, k):
+    """Rice codes as a bit array: quotient in unary (zeros), a stop bit, then k remainder bits."""
+    ends = np.cumsum((folded >> k) + 1 + k)
+    stops = ends - k - 1
+    bits = np.zeros(int(ends[-1]) if len(ends) else 0, dtype=np.uint8)
+    bits[stops] = 1
+    if k:
+        bits[stops[:, None] + 1 + np.arange(k)] = (folded[:, None] >> np.arange(k - 1, -1, -1)) & 1
+    return bits
+
+
+def encode_flac(pcm, sample_rate, channels=1, block_size=FLAC_BLOCK_SIZE):
+    """Encode interleaved int16 samples as a FLAC stream (lossless)."""
+    samples = np.asarray(pcm, dtype=np.int16).reshape(-1, channels)
+    total = len(samples)
+    frame_size = max(16, min(block_size, total))
+
+    streaminfo = struct.pack(">HH3s3s", frame_size, frame_size, b"\0\0\0", b"\0\0\0")
+    streaminfo += ((sample_rate << 44) | ((channels - 1) << 41) | (15 << 36) | total).to_bytes(8, "big")
+    streaminfo += bytes(16)  # MD5 of the audio; zero means not computed
+    out = [b"fLaC", bytes([0x80]) + len(streaminfo).to_bytes(3, "big"), streaminfo]
+
+    for number, start in enumerate(range(0, total, block_size)):
+        block = samples[start:start + block_size]
+        header = bytearray(b"\xff\xf8")
+        header.append(0b0111 << 4)                        # block size in 16 bits at the end; rate from STREAMINFO
+        header.append(((channels - 1) << 4) | (0b100 << 1))  # independent channels, 16 bits per sample
+        header += _utf8_number(number)
+        header += struct.pack(">H", len(block) - 1)
+        header.append(crc8(header))
+
+        frame = bytes(header) + np.packbits(np.concatenate([_subframe_bits(block[:, c]) for c in range(channels)])).tobytes()
+        out.append(frame + struct.pack(">H", crc16(frame)))
+    return b"".join(out)
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file object over a bytes-like buffer, so uploads stream it without copying it first."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._position, io.SEEK_END: len(self._view)}[whence]
+        self._position = min(max(0, base + offset), len(self._view))
+        return self._position
+
+    def readinto(self, target):
+        size = min(len(target), len(self._view) - self._position)
+        target[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+class AudioEncoder:
+    """Encodes float audio chunks (-1..1) as 16-bit WAV or FLAC in memory.
+
+    Samples are converted into an int16 array that lives inside a preallocated
+    WAV buffer, right after the header, so a WAV encode is one scaled copy and
+    no allocation. The returned WAV view is overwritten by the next encode; use
+    one encoder per thread (see thread_encoder).
+    """
+
+    def __init__(self, sample_rate, channels=1, max_seconds=DEFAULT_MAX_SECONDS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self._allocate(int(sample_rate * max_seconds) * channels)
+
+    def _allocate(self, capacity):
+        self._wav = bytearray(WAV_HEADER_BYTES + 2 * capacity)
+        self._pcm = np.frombuffer(self._wav, dtype="<i2", offset=WAV_HEADER_BYTES)
+        self._scratch = np.empty(capacity, dtype=np.float32)
+
+    def pcm16(self, audio):
+        """Scale, clip and convert audio to int16 in the preallocated buffer; returns a view of it."""
+        audio = np.asarray(audio).reshape(-1)
+        n = audio.size
+        if n > len(self._pcm):
+            self._allocate(n)
+        scratch = self._scratch[:n]
+        np.multiply(audio, 32767, out=scratch, casting="unsafe")
+        np.clip(scratch, -32768, 32767, out=scratch)
+        pcm = self._pcm[:n]
+        np.copyto(pcm, scratch, casting="unsafe")
+        return pcm
+
+    def wav(self, audio):
+        """WAV file bytes as a memoryview into the encoder's buffer."""
+        pcm = self.pcm16(audio)
+        data_bytes = 2 * len(pcm)
+        struct.pack_into("<4sI4s4sIHHIIHH4sI", self._wav, 0,
+                         b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1, self.channels, self.sample_rate,
+                         self.sample_rate * self.channels * 2, self.channels * 2, 16, b"data", data_bytes)
+        return memoryview(self._wav)[:WAV_HEADER_BYTES + data_bytes]
+
+    def flac(self, audio):
+        """FLAC file bytes (lossless; typically well under the WAV size for room audio)."""
+        return encode_flac(self.pcm16(audio), self.sample_rate, self.channels)
+
+    def encode(self, audio, codec="wav"):
+        """Return (encoded bytes-like, content type) for codec "wav" or "flac"."""
+        if codec == "flac":
+            return self.flac(audio), CONTENT_TYPES["flac"]
+        if codec == "wav":
+            return self.wav(audio), CONTENT_TYPES["wav"]
+        raise ValueError(f"unknown audio codec: {codec}")
+
+
+_local = threading.local()
+
+
+def thread_encoder(sample_rate, channels=1, max_seconds=DEFAULT_MAX_SECONDS):
+    """AudioEncoder owned by the calling thread, created on first use."""
+    encoder = getattr(_local, "encoder", None)
+    if encoder is None or encoder.sample_rate != sample_rate or encoder.channels != channels:
+        encoder = _local.encoder = AudioEncoder(sample_rate, channels, max_seconds)
+    return encoder
@@ -0,0 +1,279 @@
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("low", "medium", "high", "critical")
+DEFAULT_WEIGHT = 1.0
+DEFAULT_SEVERITY = "high"
+FUZZY_MIN_LENGTH = 8          # a one-word keyword matches misspelled only from this long ("emergency", not "danger")
+FUZZY_PHRASE_MIN_LENGTH = 5   # ...and a word of a longer phrase from this long ("call the polise")
+FUZZY_WEIGHT = 0.5            # share of its weight a keyword counts for when only heard misspelled
+FUZZY_CACHE_SIZE = 65536      # unknown transcript words remembered with their fuzzy lookup result
+RELOAD_CHECK_INTERVAL = 2.0   # seconds between checks of a keyword file's modification time
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lower-cased word tokens; punctuation and spacing never affect matching."""
+    return _TOKEN.findall(text.casefold())
+
+
+class Keyword:
+    """A distress phrase with its alert weight, severity and alternative spellings."""
+    __slots__ = ("phrase", "weight", "severity", "variants")
+
+    def __init__(self, phrase, weight=DEFAULT_WEIGHT, severity=DEFAULT_SEVERITY, variants=()):
+        if severity not in SEVERITIES:
+            raise ValueError(f"unknown severity {severity!r} for {phrase!r}; expected one of {SEVERITIES}")
+        self.phrase = phrase
+        self.weight = float(weight)
+        self.severity = severity
+        self.variants = tuple(variants)
+
+    def __repr__(self):
+        return f"Keyword({self.phrase!r}, weight={self.weight}, severity={self.severity!r})"
+
+
+class Match:
+    """A keyword found in a token sequence: tokens[start:end] spelled it (fuzzy if approximately)."""
+    __slots__ = ("keyword", "start", "end", "fuzzy")
+
+    def __init__(self, keyword, start, end, fuzzy=False):
+        self.keyword = keyword
+        self.start = start
+        self.end = end
+        self.fuzzy = fuzzy
+
+    def __repr__(self):
+        return f"Match({self.keyword.phrase!r}, {self.start}, {self.end}{', fuzzy' if self.fuzzy else ''})"
+
+
+def _deletions(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+def _within_one_edit(a, b):
+    """Damerau-Levenshtein distance of at most one (a substitution, insertion, deletion or swap)."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+
+
+class KeywordMatcher:
+    """Finds every keyword in a transcript in one pass, however many keywords there are.
+
+    Phrases are compiled once into an Aho-Corasick automaton over word tokens,
+    so matches always start and end on word boundaries ("helpful" is not
+    "help") and multi-word phrases match across any spacing or punctuation.
+    Words the automaton does not know are looked up, symmetric-delete style,
+    against the keyword words, so a one-letter misspelling ("emergancy") still
+    matches; such matches are marked fuzzy. Short words are too easily one
+    edit from ordinary speech ("danger" and "dancer", "trapped" and
+    "wrapped"), so a one-word keyword must be FUZZY_MIN_LENGTH letters long to
+    match misspelled, and a word of a longer phrase FUZZY_PHRASE_MIN_LENGTH,
+    where the rest of the phrase has to match exactly around it.
+    """
+
+    def __init__(self, keywords, fuzzy=True):
+        self.keywords = [k if isinstance(k, Keyword) else Keyword(k) for k in keywords]
+        self.fuzzy = fuzzy
+        self._symbols = {}         # word -> symbol id
+        self._goto = [{}]          # state -> {symbol: state}
+        self._outputs = [[]]       # state -> [(keyword, phrase length in words)]
+        self._deletion_index = {}  # one-letter deletion (or the word itself) -> keyword words
+
+        for keyword in self.keywords:
+            for spelling in (keyword.phrase,) + keyword.variants:
+                words = tokenize(spelling)
+                if words:
+                    self._add(words, keyword)
+        self._link()
+        self._words = list(self._symbols)  # symbol id -> word
+        if fuzzy:
+            for word in self._symbols:
+                if len(word) >= FUZZY_PHRASE_MIN_LENGTH:
+                    for key in _deletions(word) | {word}:
+                        self._deletion_index.setdefault(key, []).append(word)
+        self._fuzzy_symbol = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._nearest_symbol)
+
+    def _add(self, words, keyword):
+        state = 0
+        for word in words:
+            symbol = self._symbols.setdefault(word, len(self._symbols))
+            following = self._goto[state].get(symbol)
+            if following is None:
+                following = self._goto[state][symbol] = len(self._goto)
+                self._goto.append({})
+                self._outputs.append([])
+            state = following
+        self._outputs[state].append((keyword, len(words)))
+
+    def _link(self):
+        """Breadth-first failure links; each state also reports the phrases its fallback state ends."""
+        fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for symbol, following in self._goto[state].items():
+                queue.append(following)
+                fallback = fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = fail[fallback]
+                fail[following] = self._goto[fallback].get(symbol, 0)
+                self._outputs[following] = self._outputs[following] + self._outputs[fail[following]]
+        self._fail = fail
+
+    def _step(self, state, symbol):
+        while state and symbol not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(symbol, 0)
+
+    def _nearest_symbol(self, word):
+        if len(word) < FUZZY_PHRASE_MIN_LENGTH - 1:
+            return None
+        for key in _deletions(word) | {word}:
+            for candidate in self._deletion_index.get(key, ()):
+                if _within_one_edit(word, candidate):
+                    return self._symbols[candidate]
+        return None
+
+    def find_tokens(self, tokens):
+        """Matches in a list of tokens (see tokenize), in order of where they end."""
+        matches = []
+        symbols = self._symbols
+        state = 0
+        fuzzy_run = []  # positions of fuzzy-matched tokens, to flag the matches that used them
+        fuzzy_word = None
+        for position, token in enumerate(tokens):
+            symbol = symbols.get(token)
+            if symbol is None and self.fuzzy:
+                symbol = self._fuzzy_symbol(token)
+                if symbol is not None:
+                    fuzzy_run.append(position)
+                    fuzzy_word = self._words[symbol]
+            if symbol is None:
+                state = 0
+                continue
+            state = self._step(state, symbol)
+            for keyword, length in self._outputs[state]:
+                start = position + 1 - length
+                fuzzy = bool(fuzzy_run) and fuzzy_run[-1] >= start
+                if fuzzy and length == 1 and len(fuzzy_word) < FUZZY_MIN_LENGTH:
+                    continue
+                matches.append(Match(keyword, start, position + 1, fuzzy))
+        return matches
+
+    def find(self, text):
+        """Matches in free text; start and end index its tokenize() words."""
+        return self.find_tokens(tokenize(text))
+
+    @staticmethod
+    def score(matches):
+        """Total weight of the distinct keywords matched, and the highest severity among them.
+
+        A keyword only heard misspelled counts for FUZZY_WEIGHT of its weight.
+        """
+        heard = {}  # id(keyword) -> [keyword, heard exactly at least once]
+        for m in matches:
+            entry = heard.setdefault(id(m.keyword), [m.keyword, False])
+            entry[1] = entry[1] or not m.fuzzy
+        weight = sum(k.weight * (1 if exact else FUZZY_WEIGHT) for k, exact in heard.values())
+        severity = max((k.severity for k, _ in heard.values()), key=SEVERITIES.index, default=None)
+        return weight, severity
+
+
+def parse_keywords(lines):
+    """Keywords from lines of "phrase | weight | severity | variant, variant"; only the phrase is required.
+
+    Blank lines and lines starting with # are ignored.
+    """
+    keywords = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = [field.strip() for field in line.split("|")]
+        try:
+            keywords.append(Keyword(
+                fields[0],
+                weight=float(fields[1]) if len(fields) > 1 and fields[1] else DEFAULT_WEIGHT,
+                severity=fields[2].lower() if len(fields) > 2 and fields[2] else DEFAULT_SEVERITY,
+                variants=[v.strip() for v in fields[3].split(",") if v.strip()] if len(fields) > 3 else (),
+            ))
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+    return keywords
+
+
+def load_keywords(path):
+    with open(path, encoding="utf-8") as f:
+        return parse_keywords(f)
+
+
+class ReloadingMatcher:
+    """KeywordMatcher compiled from a keyword file and recompiled when the file changes.
+
+    The file's modification time is checked at most every check_interval
+    seconds, on use. If the file is missing the fallback keywords are used; if
+    an edit does not parse, the previous keyword set stays in force and the
+    error is logged.
+    """
+
+    def __init__(self, path, fallback=(), check_interval=RELOAD_CHECK_INTERVAL, fuzzy=True):
+        self.path = path
+        self.check_interval = check_interval
+        self.fuzzy = fuzzy
+        self._fallback = KeywordMatcher(fallback, fuzzy)
+        self._matcher = self._fallback
+        self._mtime = None
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self._refresh()
+
+    @property
+    def matcher(self):
+        if time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        return self._matcher
+
+    def _refresh(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                if self._mtime is not None:
+                    logger.warning(f"Keyword file {self.path} is gone; using the built-in keywords")
+                self._matcher, self._mtime = self._fallback, None
+                return
+            if mtime == self._mtime:
+                return
+            try:
+                self._matcher = KeywordMatcher(load_keywords(self.path), self.fuzzy)
+            except (OSError, ValueError) as e:
+                logger.error(f"Keeping the previous distress keywords; could not load {self.path}: {e}")
+            else:
+                self.reloads += 1
+                logger.info(f"Loaded {len(self._matcher.keywords)} distress keywords from {self.path}")
+            self._mtime = mtime
+
+    def find_tokens(self, tokens):
+        return self.matcher.find_tokens(tokens)
+
+    def find(self, text):
+        return self.matcher.find(text)
+
+    score = staticmethod(KeywordMatcher.score)
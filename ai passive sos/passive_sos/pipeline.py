@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_QUEUE_SIZE = 4     # captured chunks waiting for the first stage; the oldest is dropped beyond this
+STAGE_QUEUE_SIZE = 2       # chunks waiting between later stages; a full queue holds up the stage before it
+LATENCY_WINDOW = 500       # recent capture-to-detection latencies kept for stats
+POLL_INTERVAL = 0.1        # seconds workers wait on a queue before re-checking for shutdown
+
+
+class Chunk:
+    """One captured audio window moving through the pipeline.
+
+    payload starts as the audio and is replaced by each stage's return value;
+    captured_at is the monotonic time the window finished recording.
+    """
+    __slots__ = ("seq", "payload", "captured_at", "stage_seconds")
+
+    def __init__(self, seq, audio, captured_at):
+        self.seq = seq
+        self.payload = audio
+        self.captured_at = captured_at
+        self.stage_seconds = {}
+
+
+class SOSPipeline:
+    """Staged worker pipeline between the microphone and distress detection.
+
+    stages is a list of (name, fn, workers); every stage has its own worker
+    threads, so the next chunk uploads while the previous one is still being
+    transcribed. A stage returning None drops the chunk (nothing further to do).
+    on_result(chunk, latency_s) is called after the last stage and
+    on_error(chunk, stage_name, exception) when a stage raises; both run on
+    worker threads, which thread_hook(thread) can prepare before they start.
+
+    Backpressure: later stage queues are bounded and block the stage feeding
+    them, so a slow transcription service backs work up towards capture.
+    submit() itself never blocks the capture loop: when the capture queue is
+    full the oldest waiting chunk is dropped, since fresh audio matters most.
+    """
+
+    def __init__(self, stages, on_result=None, on_error=None, capture_queue_size=CAPTURE_QUEUE_SIZE,
+                 stage_queue_size=STAGE_QUEUE_SIZE, thread_hook=None):
+        self.stages = stages
+        self.on_result = on_result
+        self.on_error = on_error
+        self._queues = [queue.Queue(capture_queue_size)] + [queue.Queue(stage_queue_size) for _ in stages[1:]]
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stage_totals = {name: [0, 0.0] for name, _, _ in stages}
+        self._counters = dict.fromkeys(("submitted", "completed", "dropped", "skipped", "failed"), 0)
+
+        self.threads = []
+        for index, (name, fn, workers) in enumerate(stages):
+            for i in range(workers):
+                thread = threading.Thread(target=self._work, args=(index, name, fn), name=f"sos-{name}-{i}",
+                                          daemon=True)
+                if thread_hook:
+                    thread_hook(thread)
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, audio, captured_at=None):
+        """Queue a captured chunk for processing; never blocks."""
+        with self._lock:
+            self._seq += 1
+            chunk = Chunk(self._seq, audio, captured_at if captured_at is not None else time.monotonic())
+            self._counters["submitted"] += 1
+        inbox = self._queues[0]
+        while True:
+            try:
+                inbox.put_nowait(chunk)
+                return chunk
+            except queue.Full:
+                try:
+                    dropped = inbox.get_nowait()
+                except queue.Empty:
+                    continue
+                self._count("dropped")
+                logger.warning(f"Pipeline backed up; dropped audio chunk {dropped.seq}")
+
+    def close(self, wait=True, timeout=None):
+        """Stop the workers; chunks still queued are discarded."""
+        self._stop.set()
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in self.threads:
+                if thread is not threading.current_thread():
+                    thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    @property
+    def closed(self):
+        return self._stop.is_set()
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _work(self, index, name, fn):
+        inbox = self._queues[index]
+        outbox = self._queues[index + 1] if index + 1 < len(self._queues) else None
+        while not self._stop.is_set():
+            try:
+                chunk = inbox.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+            started = time.monotonic()
+            try:
+                chunk.payload = fn(chunk.payload)
+            except Exception as e:  # one bad chunk must not take the worker down
+                self._count("failed")
+                logger.error(f"Error in {name} stage for chunk {chunk.seq}: {e}")
+                if self.on_error:
+                    self.on_error(chunk, name, e)
+                continue
+            elapsed = time.monotonic() - started
+            chunk.stage_seconds[name] = elapsed
+            with self._lock:
+                totals = self._stage_totals[name]
+                totals[0] += 1
+                totals[1] += elapsed
+
+            if chunk.payload is None:
+                self._count("skipped")
+            elif outbox is not None:
+                self._put(outbox, chunk)
+            else:
+                self._finish(chunk)
+
+    def _put(self, outbox, chunk):
+        while not self._stop.is_set():
+            try:
+                outbox.put(chunk, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _finish(self, chunk):
+        latency = time.monotonic() - chunk.captured_at
+        with self._lock:
+            self._counters["completed"] += 1
+            self._latencies.append(latency)
+        if self.on_result:
+            try:
+                self.on_result(chunk, latency)
+            except Exception as e:
+                logger.error(f"Error handling result of chunk {chunk.seq}: {e}")
+
+    def stats(self):
+        """Counters, queue depths and capture-to-detection latency (seconds) of recent chunks."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            stats = dict(self._counters)
+            stats["stage_mean_s"] = {name: total / count if count else 0.0
+                                     for name, (count, total) in self._stage_totals.items()}
+        stats["queue_depths"] = {name: q.qsize() for (name, _, _), q in zip(self.stages, self._queues)}
+        if latencies:
+            stats["latency_s"] = {
+                "mean": sum(latencies) / len(latencies),
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))],
+                "max": latencies[-1],
+            }
+        return stats
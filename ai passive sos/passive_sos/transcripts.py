@@ -0,0 +1,241 @@
+import json
+import logging
+import secrets
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+POLL_INITIAL_INTERVAL = 0.5    # first status check this soon after requesting; short chunks finish in seconds
+POLL_BACKOFF = 1.5             # each further wait is this much longer...
+POLL_MAX_INTERVAL = 3.0        # ...up to this
+TRANSCRIPT_TIMEOUT = 120.0     # give up on a transcription after this long
+WEBHOOK_FALLBACK_INTERVAL = 10.0  # with a webhook, still check this often in case a callback is lost
+CANCEL_CHECK_INTERVAL = 0.1    # how quickly a wait notices cancellation
+EARLY_CALLBACK_TTL = 60.0      # callbacks for transcripts nobody waits on yet are kept this long
+WEBHOOK_PATH = "/assemblyai/webhook"
+WEBHOOK_AUTH_HEADER = "X-Passive-SOS-Token"
+REQUEST_TIMEOUT = 10           # seconds per HTTP request to the transcription service
+
+
+class TranscriptError(Exception):
+    """The transcription failed, timed out or was cancelled."""
+
+
+class TranscriptTimeout(TranscriptError):
+    pass
+
+
+class TranscriptCancelled(TranscriptError):
+    pass
+
+
+def poll_intervals(initial=POLL_INITIAL_INTERVAL, backoff=POLL_BACKOFF, maximum=POLL_MAX_INTERVAL):
+    """Endless waits between status checks: initial, growing by backoff, capped at maximum."""
+    interval = initial
+    while True:
+        yield interval
+        interval = min(maximum, interval * backoff)
+
+
+class WebhookReceiver:
+    """Embedded HTTP server that receives the transcription service's completion callbacks.
+
+    public_url is where the service can reach this server (for example a tunnel
+    forwarding to port; defaults to the local address); callbacks must carry the random token in
+    WEBHOOK_AUTH_HEADER. expect(transcript_id) returns a Future resolved with
+    the status in the callback. A callback can arrive before anyone expects it
+    (the service may finish before the request's response is handled), so
+    unclaimed callbacks are kept for EARLY_CALLBACK_TTL seconds.
+    """
+
+    def __init__(self, public_url=None, host="0.0.0.0", port=0, token=None):
+        self.token = token or secrets.token_urlsafe(24)
+        self.callbacks = 0
+        self._futures = {}
+        self._lock = threading.Lock()
+
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                receiver._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+        self.public_url = (public_url or f"http://{host}:{self.port}").rstrip("/")
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def callback_url(self):
+        return self.public_url + WEBHOOK_PATH
+
+    def request_fields(self):
+        """Fields to add to a transcription request so the service calls back here."""
+        return {"webhook_url": self.callback_url, "webhook_auth_header_name": WEBHOOK_AUTH_HEADER,
+                "webhook_auth_header_value": self.token}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="sos-webhook", daemon=True)
+        self._thread.start()
+        logger.info(f"Listening for transcription callbacks on port {self.port} ({self.callback_url})")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def expect(self, transcript_id):
+        """Future for the callback of transcript_id (already resolved if the callback came first)."""
+        with self._lock:
+            self._expire()
+            entry = self._futures.get(transcript_id)
+            if entry is None:
+                entry = self._futures[transcript_id] = (Future(), time.monotonic())
+            return entry[0]
+
+    def forget(self, transcript_id):
+        with self._lock:
+            self._futures.pop(transcript_id, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - EARLY_CALLBACK_TTL
+        for transcript_id, (future, created) in list(self._futures.items()):
+            if future.done() and created < cutoff:
+                del self._futures[transcript_id]
+
+    def _handle(self, handler):
+        status = 200
+        if handler.path.split("?")[0] != WEBHOOK_PATH:
+            status = 404
+        elif not secrets.compare_digest(handler.headers.get(WEBHOOK_AUTH_HEADER, ""), self.token):
+            status = 401
+        else:
+            try:
+                length = int(handler.headers.get("Content-Length") or 0)
+                body = json.loads(handler.rfile.read(length))
+                transcript_id, transcript_status = body["transcript_id"], body["status"]
+            except (ValueError, KeyError, TypeError):
+                status = 400
+            else:
+                future = self.expect(transcript_id)
+                with self._lock:
+                    self.callbacks += 1
+                if not future.done():
+                    future.set_result(transcript_status)
+        handler.send_response(status)
+        handler.send_header("Content-Length", "0")
+        handler.end_headers()
+
+
+class TranscriptClient:
+    """Requests transcriptions and waits for them to complete.
+
+    Without a receiver, waiting polls with adaptive intervals: a short first
+    check, then backing off to POLL_MAX_INTERVAL. With a WebhookReceiver, the
+    request asks the service to call back and waiting sleeps until the callback
+    (still checking every WEBHOOK_FALLBACK_INTERVAL in case it is lost). Either
+    way a wait ends after timeout seconds, or as soon as the cancel event is set.
+    """
+
+    def __init__(self, api_key, transcript_url, receiver=None, timeout=TRANSCRIPT_TIMEOUT,
+                 initial_interval=POLL_INITIAL_INTERVAL, backoff=POLL_BACKOFF, max_interval=POLL_MAX_INTERVAL,
+                 session=None):
+        self.transcript_url = transcript_url.rstrip("/")
+        self.receiver = receiver
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.session = session or requests.Session()
+        self.session.headers["authorization"] = api_key
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(("requested", "completed", "failed", "timed_out", "cancelled", "polls"), 0)
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def request(self, audio_url):
+        """Start transcribing audio_url; returns the transcript id."""
+        body = {"audio_url": audio_url}
+        if self.receiver:
+            body.update(self.receiver.request_fields())
+        response = self.session.post(self.transcript_url, json=body, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        self._count("requested")
+        return response.json()["id"]
+
+    def fetch(self, transcript_id):
+        self._count("polls")
+        response = self.session.get(f"{self.transcript_url}/{transcript_id}", timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        return response.json()
+
+    def wait(self, transcript_id, cancel=None, timeout=None):
+        """The completed transcript; raises TranscriptError, TranscriptTimeout or TranscriptCancelled."""
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        callback = self.receiver.expect(transcript_id) if self.receiver else None
+        if callback:
+            intervals = poll_intervals(WEBHOOK_FALLBACK_INTERVAL, 1, WEBHOOK_FALLBACK_INTERVAL)
+        else:
+            intervals = poll_intervals(self.initial_interval, self.backoff, self.max_interval)
+        try:
+            while True:
+                interval = next(intervals)  # the current schedule; a callback switches it below
+                woken_by_callback = self._sleep(min(interval, deadline - time.monotonic()), callback, cancel)
+                if woken_by_callback:
+                    callback = None  # then poll adaptively if the transcript is somehow not final yet
+                    intervals = poll_intervals(self.initial_interval, self.backoff, self.max_interval)
+
+                transcript = self.fetch(transcript_id)
+                if transcript["status"] == "completed":
+                    self._count("completed")
+                    return transcript
+                if transcript["status"] == "error":
+                    self._count("failed")
+                    raise TranscriptError(f"transcription {transcript_id} failed: {transcript.get('error')}")
+                if time.monotonic() >= deadline:
+                    self._count("timed_out")
+                    raise TranscriptTimeout(f"transcription {transcript_id} not completed within "
+                                            f"{self.timeout if timeout is None else timeout:.0f}s")
+        finally:
+            if self.receiver:
+                self.receiver.forget(transcript_id)
+
+    def _sleep(self, seconds, callback, cancel):
+        """Wait up to seconds; True if the callback arrived. Raises TranscriptCancelled."""
+        wake_at = time.monotonic() + max(0.0, seconds)
+        while True:
+            if cancel is not None and cancel.is_set():
+                self._count("cancelled")
+                raise TranscriptCancelled("stopped waiting for the transcription")
+            remaining = wake_at - time.monotonic()
+            if remaining <= 0:
+                return False
+            step = min(remaining, CANCEL_CHECK_INTERVAL if cancel is not None else remaining)
+            if callback is not None:
+                try:
+                    callback.result(timeout=step)
+                    return True
+                except FutureTimeout:
+                    continue
+            time.sleep(step)
+
+    def transcribe(self, audio_url, cancel=None):
+        return self.wait(self.request(audio_url), cancel)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
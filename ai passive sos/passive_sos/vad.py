@@ -0,0 +1,132 @@
+import threading
+
+import numpy as np
+
+VAD_FRAME_MS = 20               # analysis frame length
+VAD_MARGIN_DB = 9.0             # frame energy above the noise floor that counts as activity
+VAD_ABSOLUTE_FLOOR_DB = -65.0   # frames quieter than this (dBFS) are never speech
+VAD_MAX_ZCR = 0.25              # zero-crossing rate above which quiet frames look like hiss, not voice
+VAD_MIN_SPEECH_MS = 120         # active audio a chunk needs before it is uploaded
+VAD_HANGOVER_MS = 400           # after speech ends near a chunk boundary, the next chunk passes on any speech this soon
+VAD_FLOOR_PERCENTILE = 10       # a chunk's noise estimate is this percentile of its frame energies
+VAD_FLOOR_RISE = 0.1            # per-chunk step towards a louder noise floor (it drops immediately)
+
+
+def frame_features(audio, sample_rate, frame_ms=VAD_FRAME_MS):
+    """Per-frame RMS energy (dBFS) and zero-crossing rate of a float audio chunk.
+
+    Multi-channel audio is mixed down; a trailing partial frame is ignored.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+    frame_length = max(1, int(sample_rate * frame_ms / 1000))
+    frames = audio[:len(audio) // frame_length * frame_length].reshape(-1, frame_length)
+
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+    energy_db = 20 * np.log10(np.maximum(rms, 1e-10))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(1, frame_length - 1)
+    return energy_db, zcr
+
+
+class VoiceActivityGate:
+    """Energy and zero-crossing voice activity detector deciding which chunks are worth transcribing.
+
+    Frames count as speech when they are margin_db above the noise floor and
+    either look voiced (low zero-crossing rate) or are loud enough to be a
+    fricative. The noise floor adapts across chunks: it follows a quieter room
+    at once and creeps up slowly when the room gets louder, so a long stretch of
+    talking never becomes the new floor. Chunks are expected in capture order.
+
+    Chunks may overlap: with hop_seconds (the time between chunk starts) the
+    frames a chunk shares with the previous one are not fed to the noise floor
+    again, and the hangover runs on from where the previous chunk ended.
+    """
+
+    def __init__(self, sample_rate, frame_ms=VAD_FRAME_MS, margin_db=VAD_MARGIN_DB,
+                 min_speech_ms=VAD_MIN_SPEECH_MS, hangover_ms=VAD_HANGOVER_MS, max_zcr=VAD_MAX_ZCR,
+                 hop_seconds=None):
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self.frame_length = max(1, int(sample_rate * frame_ms / 1000))
+        self.hop_frames = None if hop_seconds is None else int(round(hop_seconds * 1000 / frame_ms))
+        self.margin_db = margin_db
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+        self.hangover_frames = int(round(hangover_ms / frame_ms))
+        self.max_zcr = max_zcr
+
+        self.noise_floor_db = None
+        self._hangover_left = 0
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.skipped = 0
+        self.skipped_seconds = 0.0
+
+    def seen_frames(self, audio):
+        """Frames at the start of a chunk already seen at the end of the previous one."""
+        if self.hop_frames is None or not self.chunks:
+            return 0
+        return max(0, len(audio) // self.frame_length - self.hop_frames)
+
+    def speech_frames(self, audio, seen=0):
+        """Boolean speech decision per frame; updates the adaptive noise floor from the unseen frames."""
+        energy_db, zcr = frame_features(audio, self.sample_rate, self.frame_ms)
+        if not len(energy_db):
+            return np.zeros(0, dtype=bool)
+
+        new_energy_db = energy_db[seen:] if seen < len(energy_db) else energy_db
+        chunk_floor = float(np.percentile(new_energy_db, VAD_FLOOR_PERCENTILE))
+        if self.noise_floor_db is None or chunk_floor < self.noise_floor_db:
+            self.noise_floor_db = chunk_floor
+        else:
+            self.noise_floor_db += VAD_FLOOR_RISE * (chunk_floor - self.noise_floor_db)
+
+        above = energy_db - self.noise_floor_db
+        # Loud frames count whatever their ZCR (fricatives); quieter ones must look voiced
+        speech = ((above > self.margin_db) & (zcr < self.max_zcr)) | (above > 2 * self.margin_db)
+        return speech & (energy_db > VAD_ABSOLUTE_FLOOR_DB)
+
+    def is_voice(self, audio):
+        """True when the chunk holds enough speech to be worth transcribing.
+
+        A chunk whose new audio starts within the hangover of speech at the end of
+        the previous one passes on any speech in that stretch: it holds the end of
+        a phrase.
+        """
+        with self._lock:
+            seen = self.seen_frames(audio)
+            speech = self.speech_frames(audio, seen)
+            carried = speech[seen:seen + self._hangover_left].any()
+            voiced = carried or int(speech.sum()) >= self.min_speech_frames
+
+            spoken = np.flatnonzero(speech)
+            since_speech = len(speech) - 1 - spoken[-1] if len(spoken) else None
+            if since_speech is not None and since_speech < self.hangover_frames:
+                self._hangover_left = self.hangover_frames - since_speech
+            else:
+                self._hangover_left = max(0, self._hangover_left - (len(speech) - seen))
+
+            self.chunks += 1
+            if not voiced:
+                self.skipped += 1
+                self.skipped_seconds += len(audio) / self.sample_rate
+        return voiced
+
+    def __call__(self, audio):
+        """Pipeline stage: pass voiced chunks through, drop silent ones (returns None)."""
+        return audio if self.is_voice(audio) else None
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.chunks if self.chunks else 0.0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "chunks": self.chunks,
+                "skipped": self.skipped,
+                "skip_ratio": self.skip_ratio,
+                "skipped_seconds": self.skipped_seconds,
+                "noise_floor_db": self.noise_floor_db,
+            }
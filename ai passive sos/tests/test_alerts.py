@@ -0,0 +1,33 @@
+import os
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [APP_DIR, os.path.join(APP_DIR, "benchmarks")]
+
+from passive_sos.alerts import Alert, AlertDispatcher, EmailChannel, WebhookChannel  # noqa: E402
+from smtp_stub import SMTPStub  # noqa: E402
+
+
+def test_webhooks_on_one_host_are_separate_channels():
+    first = WebhookChannel("https://hooks.example.com/services/team-a")
+    second = WebhookChannel("https://hooks.example.com/services/team-b")
+    dispatcher = AlertDispatcher([first, second])
+    try:
+        assert first.name != second.name
+        assert len({thread.name for thread in dispatcher.threads}) == 2
+    finally:
+        dispatcher.close(timeout=1)
+
+
+def test_repeats_are_suppressed_unless_more_severe():
+    with SMTPStub(username="sos@example.com", password="pw") as stub:
+        channel = EmailChannel(*stub.address, "sos@example.com", "pw", ["a@example.com", "b@example.com"],
+                               starttls=False)
+        dispatcher = AlertDispatcher([channel], suppression_seconds=60)
+        sent = [dispatcher.dispatch(Alert("SOS", "help", severity, key="help"))
+                for severity in ("high", "high", "critical", "high")]
+        dispatcher.close(timeout=5)
+        assert sent == [True, False, True, False]
+        assert dispatcher.stats()["delivered"] == 2
+        assert sum(len(m.recipients) for m in stub.messages) == 2 * len(stub.messages)
+        assert channel.connections == 1
@@ -0,0 +1,117 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passive_sos.capture import AudioRingBuffer, MatchDeduplicator, WindowSlicer  # noqa: E402
+from passive_sos.vad import VoiceActivityGate  # noqa: E402
+
+CAPACITY = 100
+WINDOW = 30
+HOP = 20
+
+
+def capture(frames, channels=2):
+    """Frames numbered so every sample is unique: frame i is [i, -i, ...]."""
+    index = np.arange(frames, dtype=np.float32)[:, None]
+    return np.hstack([index * (1 if c % 2 == 0 else -1) for c in range(channels)])
+
+
+def ring_and_slicer():
+    ring = AudioRingBuffer(CAPACITY, channels=2, max_window=WINDOW)
+    return ring, WindowSlicer(ring, 1000, WINDOW, HOP)
+
+
+def test_windows_are_bit_exact_across_wraparound():
+    ring, slicer = ring_and_slicer()
+    audio = capture(1000)
+    written = 0
+    starts = []
+    rng = np.random.default_rng(3)
+    while written < len(audio):
+        # Odd block sizes so blocks and windows straddle the end of the ring at every offset
+        block = audio[written:written + int(rng.integers(1, 37))]
+        ring.write(block)
+        written += len(block)
+        while (window := slicer.next_window()) is not None:
+            np.testing.assert_array_equal(np.asarray(window), audio[window.start:window.start + WINDOW])
+            assert window.intact()
+            starts.append(window.start)
+
+    assert starts == list(range(0, len(audio) - WINDOW + 1, HOP))
+    assert slicer.overruns == 0
+
+
+def test_window_stops_being_intact_after_a_lap():
+    ring, slicer = ring_and_slicer()
+    audio = capture(200)
+    ring.write(audio[:WINDOW])
+    window = slicer.next_window()
+    before = np.array(window)
+
+    ring.write(audio[WINDOW:CAPACITY])
+    assert window.intact()
+    np.testing.assert_array_equal(np.asarray(window), before)
+
+    ring.write(audio[CAPACITY:CAPACITY + 1])  # overwrites frame 0, the window's first
+    assert not window.intact()
+
+
+def test_overruns_skip_to_the_oldest_intact_window():
+    ring, slicer = ring_and_slicer()
+    audio = capture(300)
+    for start in range(0, 250, 50):
+        ring.write(audio[start:start + 50])
+
+    window = slicer.next_window()
+    # Frames before 150 are gone: windows at 0..140 are skipped, 160 is the first intact one
+    assert slicer.overruns == 8
+    assert window.start == 160
+    assert window.intact()
+    np.testing.assert_array_equal(np.asarray(window), audio[160:160 + WINDOW])
+
+
+def test_block_longer_than_the_ring_counts_every_frame():
+    ring, slicer = ring_and_slicer()
+    audio = capture(260)
+    ring.write(audio[:10])
+    ring.write(audio[10:])  # 250 frames into a 100 frame ring: only the last 100 are kept
+
+    assert ring.written == 260
+    np.testing.assert_array_equal(ring.view(230, WINDOW), audio[230:260])
+    window = slicer.next_window()
+    assert window.start == 160
+    np.testing.assert_array_equal(np.asarray(window), audio[160:160 + WINDOW])
+
+
+def test_duplicate_matches_out_of_order_count_once():
+    dedup = MatchDeduplicator(tolerance=1.0, memory=60.0)
+    # The later window's transcript arrives first
+    assert dedup.first_report("help", 12.4)
+    assert not dedup.first_report("help", 11.9)
+    assert dedup.first_report("fire", 12.0)
+    assert dedup.first_report("help", 20.0)
+    assert not dedup.first_report("help", 19.5)
+    assert dedup.duplicates == 2
+
+    # Forgotten once far enough behind the newest match
+    assert dedup.first_report("help", 100.0)
+    assert dedup.first_report("help", 12.4)
+
+
+def test_vad_hangover_runs_from_the_end_of_the_previous_chunk():
+    # 1 s chunks every 0.9 s. Speech too short to pass on its own ends at 0.88 s;
+    # a blip at 1.22-1.26 s is inside the 400 ms hangover counted in capture time,
+    # though more than 400 ms into the second chunk
+    rate = 8000
+    t = np.arange(2 * rate) / rate
+    audio = (0.001 * np.random.default_rng(0).standard_normal(len(t))).astype(np.float32)
+    for begin, end in ((0.80, 0.88), (1.22, 1.26)):
+        span = (t >= begin) & (t < end)
+        audio[span] += 0.3 * np.sin(2 * np.pi * 200 * t[span]).astype(np.float32)
+
+    gate = VoiceActivityGate(rate, hop_seconds=0.9)
+    assert not gate.is_voice(audio[:rate])
+    assert gate.is_voice(audio[int(0.9 * rate):int(1.9 * rate)])
@@ -0,0 +1,56 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from passive_sos.encoding import FLAC_BLOCK_SIZE, AudioEncoder, encode_flac  # noqa: E402
+
+soundfile = pytest.importorskip("soundfile")  # libsndfile is the reference decoder
+
+SAMPLE_RATE = 16000
+
+
+def room_audio(frames, channels, seed=0):
+    """Tone plus noise, like speech in a quiet room, as int16."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)[:, None] + 0.02 * rng.standard_normal((frames, channels))
+    return (np.clip(tone, -1, 1) * 32767).astype(np.int16)
+
+
+def decode(data):
+    samples, rate = soundfile.read(io.BytesIO(bytes(data)), dtype="int16", always_2d=True)
+    return samples, rate
+
+
+@pytest.mark.parametrize("channels", [1, 2])
+@pytest.mark.parametrize("frames", [1, 15, FLAC_BLOCK_SIZE, FLAC_BLOCK_SIZE + 1, 5 * SAMPLE_RATE])
+def test_flac_decodes_bit_exactly(frames, channels):
+    pcm = room_audio(frames, channels)
+    samples, rate = decode(encode_flac(pcm.reshape(-1), SAMPLE_RATE, channels))
+    assert rate == SAMPLE_RATE
+    np.testing.assert_array_equal(samples, pcm)
+
+
+@pytest.mark.parametrize("pcm", [
+    np.zeros(3000, dtype=np.int16),                                                   # constant subframes
+    np.random.default_rng(1).integers(-32768, 32768, 5000).astype(np.int16),          # verbatim fallback
+    np.tile(np.array([32767, -32768], dtype=np.int16), 2500),                         # full-scale extremes
+], ids=["silence", "white-noise", "full-scale"])
+def test_flac_subframe_kinds_decode_bit_exactly(pcm):
+    samples, _ = decode(encode_flac(pcm, SAMPLE_RATE))
+    np.testing.assert_array_equal(samples[:, 0], pcm)
+
+
+@pytest.mark.parametrize("codec", ["wav", "flac"])
+def test_encoder_round_trip_clips_float_audio(codec):
+    audio = np.concatenate([np.linspace(-1.5, 1.5, 4000), np.zeros(100)]).astype(np.float32)
+    data, _ = AudioEncoder(SAMPLE_RATE).encode(audio, codec)
+    samples, _ = decode(data)
+    expected = (np.clip(audio * 32767, -32768, 32767)).astype(np.int16)
+    np.testing.assert_array_equal(samples[:, 0], expected)
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+from passive_sos.keywords import FUZZY_WEIGHT, KeywordMatcher, load_keywords  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return KeywordMatcher(load_keywords(os.path.join(APP_DIR, "distress_keywords.txt")))
+
+
+def phrases(matches):
+    return sorted({m.keyword.phrase for m in matches})
+
+
+@pytest.mark.parametrize("text", [
+    "this helps a lot",
+    "she is a dancer",
+    "the park ranger came",
+    "put it on the coat hanger",
+    "I wrapped the gift",
+    "he tripped over the cable",
+    "that was really helpful",
+    "the sosa family called",
+    "save money on assisted living",
+])
+def test_ordinary_speech_matches_nothing(matcher, text):
+    assert matcher.find(text) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Please HELP me!", ["help"]),
+    ("we are trapped, call the police", ["call the police", "trapped"]),
+    ("it's an emergency", ["emergency"]),
+    ("socorro", ["socorro"]),
+])
+def test_exact_keywords(matcher, text, expected):
+    matches = matcher.find(text)
+    assert phrases(matches) == expected
+    assert not any(m.fuzzy for m in matches)
+
+
+def test_long_word_misspelling_matches_fuzzy_at_reduced_weight(matcher):
+    matches = matcher.find("this is an emergancy")
+    assert phrases(matches) == ["emergency"] and matches[0].fuzzy
+    assert matcher.score(matches) == (FUZZY_WEIGHT, "critical")
+
+
+def test_phrase_word_misspelling_matches_fuzzy(matcher):
+    matches = matcher.find("someone call the polise")
+    assert phrases(matches) == ["call the police"] and matches[0].fuzzy
+
+
+def test_short_word_misspellings_do_not_match(matcher):
+    assert matcher.find("danget trappd helpp") == []
+
+
+def test_exact_hit_counts_in_full(matcher):
+    assert matcher.score(matcher.find("emergancy, it is an emergency")) == (1.0, "critical")
@@ -0,0 +1,140 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from passive_sos.pipeline import SOSPipeline  # noqa: E402
+
+TIMEOUT = 5.0
+
+
+def wait_for(condition, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the pipeline")
+        time.sleep(0.005)
+
+
+class Results:
+    """on_result callback collecting (seq, payload) and signalling after expected results."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.items = []
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, chunk, latency):
+        with self._lock:
+            self.items.append((chunk.seq, chunk.payload))
+            if len(self.items) >= self.expected:
+                self.done.set()
+
+    def wait(self):
+        assert self.done.wait(TIMEOUT)
+        return self.items
+
+
+def test_chunks_pass_every_stage_in_order():
+    results = Results(20)
+    pipeline = SOSPipeline([("double", lambda x: x * 2, 1), ("increment", lambda x: x + 1, 1)],
+                           on_result=results, capture_queue_size=20)
+    try:
+        for value in range(20):
+            pipeline.submit(value)
+        assert results.wait() == [(value + 1, value * 2 + 1) for value in range(20)]
+        stats = pipeline.stats()
+        assert stats["submitted"] == stats["completed"] == 20
+        assert stats["dropped"] == stats["skipped"] == stats["failed"] == 0
+        assert set(stats["stage_mean_s"]) == {"double", "increment"}
+        assert stats["latency_s"]["max"] >= stats["latency_s"]["p50"] >= 0
+    finally:
+        pipeline.close()
+
+
+def test_capture_queue_drops_the_oldest_chunks_when_a_stage_stalls():
+    started, release = threading.Event(), threading.Event()
+
+    def stall(payload):
+        started.set()
+        release.wait(TIMEOUT)
+        return payload
+
+    results = Results(3)
+    pipeline = SOSPipeline([("stall", stall, 1)], on_result=results, capture_queue_size=2)
+    try:
+        pipeline.submit("first")
+        assert started.wait(TIMEOUT)  # the worker holds chunk 1; the queue is empty
+        for i in range(2, 8):
+            pipeline.submit(f"chunk {i}")
+        assert pipeline.stats()["dropped"] == 4
+
+        release.set()
+        assert results.wait() == [(1, "first"), (6, "chunk 6"), (7, "chunk 7")]
+    finally:
+        release.set()
+        pipeline.close()
+
+
+def test_none_result_counts_as_skipped():
+    results = Results(3)
+    pipeline = SOSPipeline([("gate", lambda x: x if x % 2 == 0 else None, 1), ("next", lambda x: x, 1)],
+                           on_result=results, capture_queue_size=10)
+    try:
+        for value in range(6):
+            pipeline.submit(value)
+        assert [payload for _, payload in results.wait()] == [0, 2, 4]
+        wait_for(lambda: pipeline.stats()["skipped"] == 3)
+        assert pipeline.stats()["completed"] == 3
+    finally:
+        pipeline.close()
+
+
+def test_errors_are_reported_and_the_worker_keeps_going():
+    errors = []
+
+    def fragile(value):
+        if value == 2:
+            raise ValueError("bad chunk")
+        return value
+
+    results = Results(2)
+    pipeline = SOSPipeline([("fragile", fragile, 1)], on_result=results, capture_queue_size=10,
+                           on_error=lambda chunk, stage, e: errors.append((chunk.seq, stage, str(e))))
+    try:
+        for value in (1, 2, 3):
+            pipeline.submit(value)
+        assert [payload for _, payload in results.wait()] == [1, 3]
+        assert errors == [(2, "fragile", "bad chunk")]
+        assert pipeline.stats()["failed"] == 1
+        assert all(thread.is_alive() for thread in pipeline.threads)
+    finally:
+        pipeline.close()
+
+
+def test_close_returns_while_a_stage_is_blocked_on_a_full_queue():
+    handed_on = []
+
+    def fast(payload):
+        handed_on.append(payload)
+        return payload
+
+    def until_closed(payload):
+        pipeline._stop.wait()  # a stage that only finishes when the pipeline shuts down
+        return payload
+
+    pipeline = SOSPipeline([("fast", fast, 1), ("slow", until_closed, 1)], capture_queue_size=10,
+                           stage_queue_size=1)
+    for value in range(3):
+        pipeline.submit(value)
+    # Chunk 0 is in the slow stage, chunk 1 fills its queue, chunk 2 waits in _put
+    wait_for(lambda: len(handed_on) == 3)
+
+    started = time.monotonic()
+    pipeline.close(timeout=TIMEOUT)
+    assert time.monotonic() - started < TIMEOUT / 2
+    assert not any(thread.is_alive() for thread in pipeline.threads)
+    assert pipeline.closed
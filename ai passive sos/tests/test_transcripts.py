@@ -0,0 +1,25 @@
+import os
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [APP_DIR, os.path.join(APP_DIR, "benchmarks")]
+
+from assemblyai_stub import AssemblyAIStub  # noqa: E402
+from passive_sos.transcripts import TranscriptClient, WebhookReceiver  # noqa: E402
+
+
+def test_polls_adaptively_after_a_callback_that_came_too_early():
+    # The callback arrives a second before the transcript is final; waiting out the
+    # webhook fallback interval instead of polling would take over 10 seconds
+    with AssemblyAIStub(latency=1.5, latency_sigma=0, callback_delay=-1.0) as stub:
+        receiver = WebhookReceiver(host="127.0.0.1").start()
+        try:
+            client = TranscriptClient("stub", stub.url + "/v2/transcript", receiver=receiver)
+            transcript_id = client.request(f"{stub.url}/files/1")
+            started = time.monotonic()
+            assert client.wait(transcript_id)["status"] == "completed"
+            assert time.monotonic() - started < 4
+            assert stub.callbacks == 1
+        finally:
+            receiver.stop()